@@ -2,13 +2,17 @@
 Implements the common base classes utilities
 """
 import abc
+import logging
 import math
 import typing
+import uuid
 from typing import Any
 from typing import Dict
 from uuid import uuid4
 
 from metagrim_common.base.context_vars import get_current_user_uuid
+from metagrim_common.base.context_vars import get_identity_map
+from metagrim_common.base.tracing import traced
 from metagrim_common.domains import BaseDomain
 from metagrim_common.enums import SearchFieldOperatorEnum
 from metagrim_common.model.base import CoreModel
@@ -16,11 +20,21 @@ from metagrim_common.model.types.uuid import UUID
 from sqlalchemy import and_
 from sqlalchemy import Column
 from sqlalchemy import distinct
+from sqlalchemy import false
 from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import inspect
 from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import text
 from sqlalchemy import update
+from sqlalchemy.engine import Connectable
+from sqlalchemy.exc import NoSuchTableError
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
+
 
 class Singleton(type):
     """Singleton Metaclass"""
@@ -66,6 +80,40 @@ class BaseBackend(metaclass=Singleton):
     def delete(self, *keys):
         raise NotImplementedError
 
+    def mget(self, *keys) -> typing.List[typing.Any]:
+        raise NotImplementedError
+
+    def rate_limit(self, keys: typing.Sequence[str], interval_ms: float, tolerance_ms: float) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        raise NotImplementedError
+
+    def stream_add(self, entries: typing.Sequence[typing.Tuple[str, dict]], maxlen: int | None = None) -> list:
+        raise NotImplementedError
+
+    def stream_create_group(self, stream: str, group: str, start: str = "0") -> bool:
+        raise NotImplementedError
+
+    def stream_read_group(
+        self,
+        group: str,
+        consumer: str,
+        streams: typing.Dict[str, str],
+        count: int | None = None,
+        block: int | None = None,
+    ) -> list:
+        raise NotImplementedError
+
+    def stream_ack(self, stream: str, group: str, *ids) -> int:
+        raise NotImplementedError
+
+    def stream_claim(self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int = 100) -> list:
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        raise NotImplementedError
+
 
 class AbstractRepository(abc.ABC):
     @abc.abstractmethod
@@ -84,27 +132,49 @@ class AbstractRepository(abc.ABC):
 class SqlAlchemyRepository(AbstractRepository):
     model: typing.Type[CoreModel] = None
     search_fields: typing.List[Column] = None
+    # Names of the indexes the queries of the repository rely on, see `check_repository_indexes`
+    indexes: typing.Tuple[str, ...] = ()
+    # Relationships loaded along with the records by the reads of the full model, with one `SELECT ... IN`
+    # per read instead of one lazy load per record, see `load_options`
+    eager_load: typing.Tuple[str, ...] = ()
 
     def __init__(self, session: Session):
         super().__init__()
         self.session = session
 
+    @classmethod
+    def missing_indexes(cls, bind: Connectable) -> typing.List[str]:
+        """
+        Returns the declared indexes which do not exist in the database
+        :param bind: Engine or Connection
+        :return:
+        """
+        if not cls.indexes:
+            return []
+        existing = _index_names(bind, cls.model.__tablename__)
+        return [name for name in cls.indexes if name not in existing]
+
+    def load_options(self, eager_load: typing.Sequence[str] | None = None) -> typing.List[typing.Any]:
+        """
+        Returns the `selectinload` options of the relationships to load along with the records
+        :param eager_load: Relationship names, defaults to `eager_load` of the repository
+        :return:
+        """
+        names = self.eager_load if eager_load is None else eager_load
+        if not names:
+            return []
+        # Inspecting configures the mappers, the relationships declared as backref exist only after that
+        relationships = inspect(self.model).relationships
+        return [selectinload(relationships[name].class_attribute) for name in names]
+
+    @traced()
     async def add(self, model: CoreModel | Dict[str, Any] | BaseDomain):
         if isinstance(model, BaseDomain):
             # If domain is passed, then copy all the column values from domain itself
-            inp_model = model.model_dump()
-            model_data = {}
-            for column in self.model.get_columns():
-                if column in inp_model:
-                    model_data[column] = inp_model[column]
-            model = self.model(**model_data)
+            model = self.model(**model.model_dump(include=self.model.get_column_set()))
         elif isinstance(model, dict):
             # Create the model from only given specific columns
-            model_data = {}
-            for column in self.model.get_columns():
-                if column in model:
-                    model_data[column] = model[column]
-            model = self.model(**model_data)
+            model = self.model(**self.model.project(model))
 
         model.created_by = get_current_user_uuid()
         model.modified_by = model.created_by
@@ -113,15 +183,44 @@ class SqlAlchemyRepository(AbstractRepository):
         self.session.add(model)
         return model
 
-    async def get(self, id_: UUID, is_deleted: bool = False) -> typing.Union[CoreModel, None]:
+    @traced()
+    async def get(
+        self, id_: UUID, is_deleted: bool = False, eager_load: typing.Sequence[str] | None = None
+    ) -> typing.Union[CoreModel, None]:
         """
         Returns the record matching with given id_
         :param id_: int:
         :param is_deleted: bool:
+        :param eager_load: Relationships to load with the record, defaults to `eager_load` of the repository
         :return:
         """
-        return self.session.query(self.model).filter_by(id=id_, is_deleted=is_deleted).first()
+        identity_map = get_identity_map()
+        if identity_map is not None and not is_deleted:
+            record = identity_map.get(self.model, id_)
+            if record is not None and record in self.session:
+                # Already loaded within current request and still attached to this session
+                return record
+
+        record = self._query(eager_load=eager_load).filter_by(id=id_, is_deleted=is_deleted).first()
+        if record is not None and identity_map is not None and not is_deleted:
+            identity_map.add(self.model, id_, record)
+        return record
+
+    def _forget(self, id_: UUID | str | None = None) -> None:
+        """
+        Drop the records from the request identity map after a write
+        :param id_: Record id, if not given all the records of the model are dropped
+        :return:
+        """
+        identity_map = get_identity_map()
+        if identity_map is None:
+            return
+        if id_ is None:
+            identity_map.discard_model(self.model)
+        else:
+            identity_map.discard(self.model, id_)
 
+    @traced()
     def update(self, values: Dict[str, Any] | BaseDomain, where: typing.Tuple):
         """
         Update the dictionary values with given where clause in the form of tuples
@@ -134,19 +233,15 @@ class SqlAlchemyRepository(AbstractRepository):
         model_data = {}  # It will hold data which needs to be updated in DB
         if isinstance(values, BaseDomain):
             # If domain is passed, then copy all the column values from domain itself
-            inp_model = values.model_dump()
-            model_data = {}
-            for column in self.model.get_columns():
-                if column in inp_model:
-                    model_data[column] = inp_model[column]
+            model_data = values.model_dump(include=self.model.get_column_set())
         elif isinstance(values, dict):
-            model_data = {}
-            for column in self.model.get_columns():
-                if column in values:
-                    model_data[column] = values[column]
+            model_data = self.model.project(values)
         model_data["modified_by"] = get_current_user_uuid()
+        model_data["version"] = self.model.version + 1
         self.session.query(self.model).filter(*where).update(model_data)
+        self._forget()
 
+    @traced()
     async def update_by(self, values: Dict[str, Any] | BaseDomain, where: Dict[str, Any]):
         """
         Update the dictionary values with given where clause in the form of dictionary
@@ -159,22 +254,157 @@ class SqlAlchemyRepository(AbstractRepository):
         model_data = {}  # It will hold data which needs to be updated in DB
         if isinstance(values, BaseDomain):
             # If domain is passed, then copy all the column values from domain itself
-            inp_model = values.model_dump()
-            model_data = {}
-            for column in self.model.get_columns():
-                if column == "id":
-                    # do not copy the primary key to update
-                    continue
-                if column in inp_model:
-                    model_data[column] = inp_model[column]
+            # do not copy the primary key to update
+            model_data = values.model_dump(include=self.model.get_column_set(updatable=True))
         elif isinstance(values, dict):
-            model_data = {}
-            for column in self.model.get_columns():
-                if column in values:
-                    model_data[column] = values[column]
+            model_data = self.model.project(values)
         model_data["modified_by"] = get_current_user_uuid()
+        model_data["version"] = self.model.version + 1
         self.session.query(self.model).filter_by(**where).update(model_data)
+        self._forget(where.get("id"))
+
+    @traced()
+    async def insert_returning(
+        self, values: Dict[str, Any] | BaseDomain, projection: typing.Sequence[str] | None = None
+    ) -> Dict[str, Any]:
+        """
+        Insert the record and return its columns, server defaults included, with the same statement
+        :param values: Column values, the id is generated if not given
+        :param projection: Column names to return, all the columns by default
+        :return:
+        """
+        if isinstance(values, BaseDomain):
+            values = values.model_dump(include=self.model.get_column_set())
+        model_data = self.model.project(values)
+        model_data["created_by"] = get_current_user_uuid()
+        model_data["modified_by"] = model_data["created_by"]
+        model_data["version"] = 1
+        if not model_data.get("id"):
+            model_data["id"] = uuid4()
+
+        table = self.model.__table__
+        statement = insert(table).values(**model_data)
+        return self._execute_returning(statement, "insert", projection, table.c.id == model_data["id"])
+
+    @traced()
+    async def update_returning(
+        self,
+        id_: UUID | str,
+        values: Dict[str, Any] | BaseDomain,
+        projection: typing.Sequence[str] | None = None,
+        **criteria,
+    ) -> Dict[str, Any] | None:
+        """
+        Update the live record, bump its version and return its updated columns with the same statement
+        :param id_: Record id
+        :param values: Columns to update, SQL expressions are accepted, the primary key and the version are ignored
+        :param projection: Column names to return, all the columns by default
+        :param criteria: Other column values the record must match, e.g. its version
+        :return: `None` when no live record matched
+        """
+        if isinstance(values, BaseDomain):
+            values = values.model_dump(include=self.model.get_column_set(updatable=True))
+        model_data = self.model.project(values, updatable=True)
+        model_data.pop("version", None)
+        model_data["modified_by"] = get_current_user_uuid()
+        return await self._update_returning(id_, model_data, projection, criteria)
+
+    @traced()
+    async def soft_delete_returning(
+        self, id_: UUID | str, projection: typing.Sequence[str] | None = ("id",), **criteria
+    ) -> Dict[str, Any] | None:
+        """
+        Mark the live record as deleted and return its columns with the same statement
+        :param id_: Record id
+        :param projection: Column names to return, the id by default
+        :param criteria: Other column values the record must match
+        :return: `None` when no live record matched, e.g. it is already deleted
+        """
+        model_data = {"is_deleted": True, "modified_by": get_current_user_uuid()}
+        return await self._update_returning(id_, model_data, projection, criteria)
 
+    @traced()
+    async def update_version(
+        self,
+        id_: UUID | str,
+        values: Dict[str, Any] | BaseDomain,
+        version: int | None = None,
+        projection: typing.Sequence[str] | None = None,
+    ) -> Dict[str, Any] | None:
+        """
+        Update the record only if it is still at the given version, the version is bumped and the updated
+        columns are returned by the same `UPDATE ... WHERE id = ? AND version = ? RETURNING` statement
+        :param id_: Record id
+        :param values: Columns to update, the primary key and the version are ignored
+        :param version: Version the changes are based on, the record is updated whatever its version if not given
+        :param projection: Column names to return, all the columns by default
+        :return: Returned columns, `None` when no live record matched: missing, deleted or changed by another
+        """
+        criteria = {"version": version} if version is not None else {}
+        return await self.update_returning(id_, values, projection=projection, **criteria)
+
+    async def _update_returning(
+        self,
+        id_: UUID | str,
+        model_data: Dict[str, Any],
+        projection: typing.Sequence[str] | None,
+        criteria: Dict[str, Any],
+    ) -> Dict[str, Any] | None:
+        table = self.model.__table__
+        where = [table.c.id == id_, table.c.is_deleted == false()]
+        where.extend(table.c[name] == value for name, value in criteria.items())
+        statement = update(table).where(*where).values(**model_data, version=table.c.version + 1)
+        row = self._execute_returning(statement, "update", projection, table.c.id == id_)
+        self._expire(id_)
+        self._forget(id_)
+        return row
+
+    def _returning_supported(self, kind: str) -> bool:
+        """
+        Tells whether the dialect renders RETURNING for the statements of given kind
+        :param kind: "insert", "update" or "delete"
+        :return:
+        """
+        dialect = self.session.get_bind().dialect
+        # SQLAlchemy 2 tells it per kind of statement, SQLite >= 3.35 included, 1.4 only for PostgreSQL and alike
+        return getattr(dialect, f"{kind}_returning", getattr(dialect, "full_returning", False))
+
+    def _execute_returning(
+        self, statement: typing.Any, kind: str, projection: typing.Sequence[str] | None, reselect: typing.Any
+    ) -> Dict[str, Any] | None:
+        """
+        Execute the write statement and return the projected columns of the single written row
+        :param statement: INSERT or UPDATE of the model table
+        :param kind: "insert" or "update"
+        :param projection: Column names to return, all the columns if not given
+        :param reselect: Criteria of the written row, selected again when the dialect does not support RETURNING
+        :return: `None` when no row is written
+        """
+        projection = projection or self.model.get_columns()
+        table = self.model.__table__
+        columns = [table.c[name] for name in projection]
+        if self._returning_supported(kind):
+            row = self.session.execute(statement.returning(*columns)).first()
+        else:
+            # Row is read by the same transaction right after the write
+            if self.session.execute(statement).rowcount != 1:
+                return None
+            row = self.session.execute(select(*columns).where(reselect)).first()
+        return dict(zip(projection, row)) if row is not None else None
+
+    def _expire(self, id_: UUID | str) -> None:
+        """
+        Expire the record of the session updated by a statement of the table, reloaded when accessed
+        :param id_:
+        :return:
+        """
+        if not isinstance(id_, uuid.UUID):
+            id_ = uuid.UUID(str(id_))
+        instance = self.session.identity_map.get(self.session.identity_key(self.model, id_))
+        if instance is not None:
+            self.session.expire(instance)
+
+    @traced()
     async def update_multiple(self, values: dict, where: tuple):
         """
         Update multiple records
@@ -182,22 +412,69 @@ class SqlAlchemyRepository(AbstractRepository):
         :param where:
         :return:
         """
-        stmt = update(self.model).where(*where).values(**values)
+        stmt = update(self.model).where(*where).values(**values, version=self.model.version + 1)
         self.session.execute(stmt)
+        self._forget()
 
-    async def get_single(self, **kwargs) -> typing.Union[typing.Type[CoreModel], None]:
+    @traced()
+    async def get_single(
+        self, eager_load: typing.Sequence[str] | None = None, **kwargs
+    ) -> typing.Union[typing.Type[CoreModel], None]:
         """
         Return the Single record matching with given criteria
+        :param eager_load: Relationships to load with the record, defaults to `eager_load` of the repository
         :param kwargs:
         :return:
         """
-        return self.session.query(self.model).filter_by(**kwargs).first()
+        return self._query(eager_load=eager_load).filter_by(**kwargs).first()
 
-    def filter(self, order_by: str = None, order: str = None, **kwargs):
+    def _query(
+        self,
+        projection: typing.Sequence[str] | None = None,
+        order_by: str | None = None,
+        eager_load: typing.Sequence[str] | None = None,
+    ):
+        """
+        Returns the query of the full model or, if projection is given, of the given columns only.
+        Projected queries return plain rows, they are not tracked in the session identity map.
+        :param projection: Column names to select
+        :param order_by: Column used for ordering, selected as well if missing in projection
+        :param eager_load: Relationships to load with the full model, defaults to `eager_load` of the repository
+        :return:
+        """
+        if not projection:
+            return self.session.query(self.model).options(*self.load_options(eager_load))
+        columns = [getattr(self.model, column) for column in projection]
+        if order_by and order_by not in projection:
+            # Ordering column has to be in the select list of a DISTINCT query
+            columns.append(getattr(self.model, order_by))
+        return self.session.query(*columns)
+
+    @staticmethod
+    def _project_rows(rows: typing.Iterable[typing.Any], projection: typing.Sequence[str]) -> typing.List[dict]:
+        """
+        Convert the rows of a projected query into dictionaries of the projected columns
+        :param rows:
+        :param projection:
+        :return:
+        """
+        return [dict(zip(projection, row)) for row in rows]
+
+    @traced()
+    def filter(
+        self,
+        order_by: str = None,
+        order: str = None,
+        projection: typing.Sequence[str] | None = None,
+        eager_load: typing.Sequence[str] | None = None,
+        **kwargs,
+    ):
         """
         Filter records with given keyword arguments
         :param order_by:
         :param order:
+        :param projection: Column names to load, if given dictionaries are returned instead of the models
+        :param eager_load: Relationships to load with the models, defaults to `eager_load` of the repository
         :param kwargs:
         :return:
         """
@@ -208,16 +485,15 @@ class SqlAlchemyRepository(AbstractRepository):
         if kwargs.get("is_deleted", False) is None:
             # If `is_deleted` set to `None` then ignore the `is_deleted` filter
             del kwargs["is_deleted"]
-        query = self.session.query(self.model)
+        query = self._query(projection, eager_load=eager_load)
         if kwargs:
             query = query.filter_by(**kwargs)
 
         if order_by:
             # Apply orderby clause
             order = order or "desc"
-            return query.order_by(getattr(getattr(self.model, order_by), order.lower())()).all()
-        else:
-            return query.all()
+            query = query.order_by(getattr(getattr(self.model, order_by), order.lower())())
+        return self._project_rows(query, projection) if projection else query.all()
 
     def refresh(self, instance_):
         """
@@ -227,22 +503,29 @@ class SqlAlchemyRepository(AbstractRepository):
         """
         self.session.refresh(instance_)
 
+    @traced()
     async def delete(self, record: typing.Union[CoreModel, str, int]):
         """
         Mark the record as deleted
         :param record:
         :return:
         """
+        values = {"is_deleted": True, "version": self.model.version + 1}
         if isinstance(record, CoreModel):
-            self.session.query(self.model).filter(self.model.id == record.id).update({"is_deleted": True})
+            self.session.query(self.model).filter(self.model.id == record.id).update(values)
+            self._forget(record.id)
         elif type(record) == UUID or type(record) == str:
-            self.session.query(self.model).filter(self.model.id == record).update({"is_deleted": True})
+            self.session.query(self.model).filter(self.model.id == record).update(values)
+            self._forget(record)
 
+    @traced()
     async def hard_delete(self, **kwargs):
         if not kwargs:
             raise Exception(f"Cannot delete all record from {self.model.__tablename__}")
         self.session.query(self.model).filter_by(**kwargs).delete()
+        self._forget()
 
+    @traced()
     async def get_paginated_result(
         self,
         search: str = None,
@@ -250,6 +533,7 @@ class SqlAlchemyRepository(AbstractRepository):
         order: str = "DESC",
         page: int = 1,
         page_size: int = 10,
+        projection: typing.Sequence[str] | None = None,
         **kwargs,
     ):
         """
@@ -259,11 +543,15 @@ class SqlAlchemyRepository(AbstractRepository):
         :param order:
         :param page:
         :param page_size:
+        :param projection: Column names to load, if given the page holds dictionaries instead of the models
         :return:
         """
-        query, total_count = await self.get_list_filter_query(search=search, order_by=order_by, order=order, **kwargs)
+        query, total_count = await self.get_list_filter_query(
+            search=search, order_by=order_by, order=order, projection=projection, **kwargs
+        )
         offset_value = page * page_size - page_size
-        result = query.offset(offset_value).limit(page_size).all()
+        query = query.offset(offset_value).limit(page_size)
+        result = self._project_rows(query, projection) if projection else query.all()
         total_pages = math.ceil(total_count / page_size)
         return {
             "page": page,
@@ -282,6 +570,10 @@ class SqlAlchemyRepository(AbstractRepository):
         order: str = "desc",
         excluded_ids: typing.List[str | UUID] | None = None,
         exact_search: bool = False,
+        projection: typing.Sequence[str] | None = None,
+        with_count: bool = True,
+        distinct_: bool = True,
+        eager_load: typing.Sequence[str] | None = None,
         **kwargs,
     ):
         """
@@ -291,6 +583,10 @@ class SqlAlchemyRepository(AbstractRepository):
         :param order: str:
         :param excluded_ids: List[ids]:
         :param exact_search: boolean:
+        :param projection: Sequence[str]: Column names to select instead of the full model
+        :param with_count: boolean: If False then the count query is not executed and None is returned as count
+        :param distinct_: boolean: If False then DISTINCT is not applied to the projections without primary key
+        :param eager_load: Sequence[str]: Relationships to load with the full model
         :param kwargs:
         :return:
         """
@@ -301,7 +597,11 @@ class SqlAlchemyRepository(AbstractRepository):
         if kwargs.get("is_deleted", False) is None:
             # If `is_deleted` set to `None` then ignore the `is_deleted` filter
             del kwargs["is_deleted"]
-        query = self.session.query(self.model).distinct()
+        query = self._query(projection, order_by=order_by, eager_load=eager_load)
+        if distinct_ and projection and "id" not in projection:
+            # Rows selecting the primary key of a single model are unique already, DISTINCT over them
+            # only makes the database sort or hash the whole result before applying the limit
+            query = query.distinct()
 
         # Use separate Count query for performance
         count_query = self.session.query(func.count(distinct(self.model.id)))
@@ -337,12 +637,51 @@ class SqlAlchemyRepository(AbstractRepository):
                 query = query.filter(self.search_fields[0].like(f"{search}"))
                 count_query = count_query.filter(self.search_fields[0].like(f"{search}"))
 
+        total_count = count_query.scalar() if with_count else None
         if order_by:
             # Build the order by clause
-            return query.order_by(getattr(getattr(self.model, order_by), order.lower())()), count_query.scalar()
+            return query.order_by(getattr(getattr(self.model, order_by), order.lower())()), total_count
         else:
-            return query, count_query.scalar()
+            return query, total_count
 
+    async def stream(
+        self,
+        projection: typing.Sequence[str],
+        batch_size: int = 1000,
+        search: str = None,
+        order_by: str = "created_at",
+        order: str = "desc",
+        **kwargs,
+    ) -> typing.AsyncIterator[typing.List[typing.Tuple]]:
+        """
+        Stream the filtered records in batches of rows through a server side cursor,
+        so only one batch is held in memory at a time.
+        Rows are tuples in the order of given projection, the ordering column may be appended at the end.
+        :param projection: Column names to select
+        :param batch_size: Number of rows fetched per batch
+        :param search:
+        :param order_by:
+        :param order:
+        :param kwargs: Filters accepted by `get_list_filter_query`
+        :return:
+        """
+        query, _ = await self.get_list_filter_query(
+            search=search,
+            order_by=order_by,
+            order=order,
+            projection=projection,
+            with_count=False,
+            distinct_=False,
+            **kwargs,
+        )
+        result = self.session.execute(query.statement.execution_options(stream_results=True, yield_per=batch_size))
+        try:
+            for rows in result.partitions(batch_size):
+                yield rows
+        finally:
+            result.close()
+
+    @traced()
     def count_records(self, **kwargs) -> int:
         """
         Returns the count of records with given filter of current object
@@ -404,3 +743,49 @@ class SqlAlchemyRepository(AbstractRepository):
             if item in kwargs:
                 del kwargs[item]
         return query, count_query, kwargs
+
+
+# Catalog queries of the index names, the inspector of SQLAlchemy 1.4 skips the expression based indexes
+_INDEX_NAMES = {
+    "postgresql": text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+    "sqlite": text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+}
+
+
+def _index_names(bind: Connectable, table: str) -> typing.Set[str]:
+    """
+    Returns the names of the indexes of given table
+    :param bind: Engine or Connection
+    :param table:
+    :return:
+    """
+    statement = _INDEX_NAMES.get(bind.dialect.name)
+    if statement is not None:
+        with bind.connect() as conn:
+            return set(conn.execute(statement, {"table": table}).scalars())
+    try:
+        return {index["name"] for index in inspect(bind).get_indexes(table)}
+    except NoSuchTableError:
+        return set()
+
+
+def check_repository_indexes(bind: Connectable) -> typing.Dict[str, typing.List[str]]:
+    """
+    Warns about the indexes declared by the repositories which are missing in the database,
+    usually because the migrations are not applied
+    :param bind: Engine or Connection
+    :return: Missing index names keyed by the table name
+    """
+    missing = {}
+    repositories = SqlAlchemyRepository.__subclasses__()
+    while repositories:
+        repository = repositories.pop()
+        repositories.extend(repository.__subclasses__())
+        names = repository.missing_indexes(bind)
+        if names:
+            table = repository.model.__tablename__
+            missing.setdefault(table, [])
+            missing[table].extend(name for name in names if name not in missing[table])
+    for table, names in missing.items():
+        logger.warning(f"Missing indexes on {table}: {', '.join(names)}, run the database migrations")
+    return missing
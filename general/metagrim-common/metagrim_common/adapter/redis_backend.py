@@ -9,6 +9,9 @@ from logging import getLogger
 
 import redis
 from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.base import metrics
+from metagrim_common.base import tracing
+from opentelemetry.trace import SpanKind
 
 logger = getLogger(__name__)
 
@@ -24,9 +27,46 @@ class DecimalJSONEncoder(json.JSONEncoder):
         return super(DecimalJSONEncoder, self).default(o)
 
 
+# GCRA over all the keys of a request: allowed only when each key is within its limit, the theoretical arrival
+# times are then moved by the emission interval. Uses the clock of the server so all the workers agree.
+# KEYS: limit keys, ARGV[1]: emission interval, ARGV[2]: burst tolerance, both in milliseconds.
+# Returns 0 when allowed, the milliseconds to wait otherwise.
+GCRA_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local arrivals = {}
+local wait = 0
+for index, key in ipairs(KEYS) do
+    -- Whole milliseconds, the numbers are stored as text with 14 significant digits
+    local arrival = math.ceil(math.max(tonumber(redis.call("GET", key)) or now, now) + interval)
+    wait = math.max(wait, arrival - tolerance - now)
+    arrivals[index] = arrival
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+for index, key in ipairs(KEYS) do
+    redis.call("SET", key, arrivals[index], "PX", arrivals[index] - now)
+end
+return 0
+"""
+
+
+def _instrumented(operation: str):
+    """Records the latency, the errors and the span of the Redis operation"""
+    timed = metrics.timed(metrics.REDIS_DURATION.labels(operation), metrics.REDIS_ERRORS.labels(operation))
+    traced = tracing.traced(f"redis.{operation}", kind=SpanKind.CLIENT)
+    return lambda func: timed(traced(func))
+
+
 class RedisBackend(BaseBackend):
     """Implements Backend as redis serer"""
 
+    _rate_limit_script = None
+
     def __init__(self, **con_settings):
         super().__init__()
         try:
@@ -34,6 +74,7 @@ class RedisBackend(BaseBackend):
         except redis.ConnectionError as ce:
             logger.fatal(f"Unable to connect with Redis : {ce}")
 
+    @_instrumented("set_str")
     def set_str(self, key, data, **kwargs) -> bool:
         try:
             data = self._serialize(data)
@@ -43,6 +84,7 @@ class RedisBackend(BaseBackend):
             return False
         return True
 
+    @_instrumented("get_str")
     def get_str(self, key, **kwargs) -> str:
         tmp = None
         try:
@@ -52,6 +94,7 @@ class RedisBackend(BaseBackend):
         logger.debug(f"For key {key} value {tmp}")
         return tmp.decode("utf-8") if tmp else ""
 
+    @_instrumented("set_dict")
     def set_dict(self, key, data, **kwargs) -> bool:
         """Sets the dictionary to the redis server
         :param: key: unique string to identify dictionary :type: str
@@ -66,6 +109,7 @@ class RedisBackend(BaseBackend):
             return False
         return True
 
+    @_instrumented("get_dict")
     def get_dict(self, key: str) -> typing.Union[None, dict]:
         """Retrieves dictionary with given key
 
@@ -87,6 +131,7 @@ class RedisBackend(BaseBackend):
         logger.debug(f"For key {key} value {tmp}")
         return tmp
 
+    @_instrumented("set_list")
     def set_list(self, key: str, data: list, **kwargs) -> bool:
         """
 
@@ -103,6 +148,7 @@ class RedisBackend(BaseBackend):
             return False
         return True
 
+    @_instrumented("get_list")
     def get_list(self, key: str) -> typing.Union[None, list]:
         """
 
@@ -166,5 +212,135 @@ class RedisBackend(BaseBackend):
         for val in self.conn.scan_iter(match_, **kwargs):
             yield val
 
+    @_instrumented("delete")
     def delete(self, *keys):
         self.conn.delete(*keys)
+
+    @_instrumented("mget")
+    def mget(self, *keys) -> typing.List[typing.Any]:
+        """
+        Retrieves the values of all given keys in a single round trip
+        :param keys:
+        :return: List of values in the order of keys, `None` for the missing keys
+        """
+        result = []
+        try:
+            values = self.conn.mget(keys)
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while retrieving data for {keys} to redis: {str(de)}")
+            return [None] * len(keys)
+        for value in values:
+            if value is None:
+                result.append(None)
+                continue
+            try:
+                result.append(self._deserialize(value))
+            except json.decoder.JSONDecodeError:
+                result.append(value.decode("utf-8") if type(value) in [bytes, bytearray] else value)
+        return result
+
+    @_instrumented("incr")
+    def incr(self, key: str, amount: int = 1) -> int:
+        """
+        Atomically increments the counter stored at key
+        :param key:
+        :param amount:
+        :return: Value after the increment
+        """
+        return self.conn.incr(key, amount)
+
+    @_instrumented("rate_limit")
+    def rate_limit(self, keys: typing.Sequence[str], interval_ms: float, tolerance_ms: float) -> int:
+        """
+        Atomically counts a request against the rate limit of each key (GCRA), in a single round trip
+        :param keys: Limit keys, all of them must be within their limit
+        :param interval_ms: Emission interval, the period of the limit divided by its number of requests
+        :param tolerance_ms: Burst tolerance, the requests allowed at once times the emission interval
+        :return: Milliseconds to wait before the request is allowed, `0` when it is allowed and counted
+        """
+        if self._rate_limit_script is None:
+            # Sent with EVALSHA, loaded on the first call of each server
+            self._rate_limit_script = self.conn.register_script(GCRA_SCRIPT)
+        return int(self._rate_limit_script(keys=list(keys), args=[interval_ms, tolerance_ms]))
+
+    @_instrumented("stream_add")
+    def stream_add(self, entries: typing.Sequence[typing.Tuple[str, dict]], maxlen: int | None = None) -> list:
+        """
+        Appends the entries to their streams in a single round trip
+        :param entries: Pairs of the stream name and the fields of the entry
+        :param maxlen: Approximate number of the entries kept by each stream, unbounded if not given
+        :return: Ids of the added entries
+        """
+        pipeline = self.conn.pipeline(transaction=False)
+        for stream, fields in entries:
+            pipeline.xadd(stream, fields, maxlen=maxlen, approximate=True)
+        return pipeline.execute()
+
+    @_instrumented("stream_create_group")
+    def stream_create_group(self, stream: str, group: str, start: str = "0") -> bool:
+        """
+        Creates the consumer group and the stream if they do not exist
+        :param stream:
+        :param group:
+        :param start: Id of the last entry considered delivered, "0" delivers the whole stream and "$" the new entries
+        :return: `False` when the group already exists
+        """
+        try:
+            self.conn.xgroup_create(stream, group, id=start, mkstream=True)
+        except redis.exceptions.ResponseError as re:
+            if "BUSYGROUP" not in str(re):
+                raise
+            return False
+        return True
+
+    @_instrumented("stream_read_group")
+    def stream_read_group(
+        self,
+        group: str,
+        consumer: str,
+        streams: typing.Dict[str, str],
+        count: int | None = None,
+        block: int | None = None,
+    ) -> list:
+        """
+        Reads the entries of the streams for the consumer of the group
+        :param group:
+        :param consumer:
+        :param streams: Id to read after keyed by the stream, ">" for the entries never delivered to the group
+        :param count: Maximum number of the entries read from each stream
+        :param block: Milliseconds to wait for the new entries, returns at once if not given
+        :return: List of `[stream, [(id, fields), ...]]`
+        """
+        return self.conn.xreadgroup(group, consumer, streams, count=count, block=block)
+
+    @_instrumented("stream_ack")
+    def stream_ack(self, stream: str, group: str, *ids) -> int:
+        """
+        Acknowledges the processed entries, they are removed from the pending entries of the group
+        :param stream:
+        :param group:
+        :param ids:
+        :return: Number of the acknowledged entries
+        """
+        return self.conn.xack(stream, group, *ids) if ids else 0
+
+    @_instrumented("stream_claim")
+    def stream_claim(self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int = 100) -> list:
+        """
+        Transfers the entries pending for longer than `min_idle_ms`, left by the stopped consumers, to the consumer
+        :param stream:
+        :param group:
+        :param consumer:
+        :param min_idle_ms:
+        :param count:
+        :return: List of the claimed `(id, fields)`
+        """
+        return self.conn.xautoclaim(stream, group, consumer, min_idle_ms, count=count)[1]
+
+    @_instrumented("ping")
+    def ping(self) -> bool:
+        """
+        Checks the connection with the server, opens the first pooled connection
+        :return:
+        """
+        return self.conn.ping()
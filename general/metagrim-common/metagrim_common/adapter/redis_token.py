@@ -1,13 +1,12 @@
 import typing
 
-import inject
-from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base import app_context
 from metagrim_common.repository import RedisRepository
 
 
 class TokenRedisRepository(RedisRepository):
     def __init__(self, *args, **kwargs):
-        settings = inject.instance(CoreSettings)
+        settings = app_context.current.settings
         self.token_time_exp = settings.access_token_expire_minutes * 60
         super(TokenRedisRepository, self).__init__(*args, **kwargs)
 
@@ -0,0 +1,59 @@
+"""
+Application context resolved once at the startup.
+
+The hot paths (response building, token handling, repositories) read the settings and the error configuration
+through the plain module attribute `app_context.current` instead of asking the injector on every call::
+
+    from metagrim_common.base import app_context
+
+    settings = app_context.current.settings
+
+`create_app` configures the context, if it is accessed before that (scripts, tests) it is resolved lazily
+from the injector on the first access.
+"""
+import dataclasses
+import typing
+
+import inject
+from metagrim_common.base.error_conf import ErrorConfig
+from metagrim_common.base.settings import CoreSettings
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class AppContext:
+    settings: CoreSettings
+    error_config: ErrorConfig
+    # Derived values which are otherwise computed on each request
+    is_prod_env: bool
+
+
+# Set by `configure`, intentionally not assigned here so the first access is resolved by `__getattr__`
+current: AppContext
+
+
+def configure(settings: CoreSettings | None = None, error_config: ErrorConfig | None = None) -> AppContext:
+    """
+    Resolve the application context, must be called after the injector is configured
+    :param settings:
+    :param error_config:
+    :return:
+    """
+    settings = settings or inject.instance(CoreSettings)
+    context = AppContext(
+        settings=settings,
+        error_config=error_config or inject.instance(ErrorConfig),
+        is_prod_env=settings.current_env == "PROD",
+    )
+    globals()["current"] = context
+    return context
+
+
+def reset() -> None:
+    """Forget the resolved context, next access will resolve it again"""
+    globals().pop("current", None)
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name == "current":
+        return configure()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
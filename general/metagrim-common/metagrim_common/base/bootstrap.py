@@ -1,3 +1,4 @@
+from fastapi import APIRouter as _APIRouter
 from fastapi import FastAPI
 from fastapi import Request
 from fastapi.encoders import jsonable_encoder
@@ -7,24 +8,41 @@ from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+from metagrim_common.base import app_context
 from metagrim_common.base import constants as core_constants
 from metagrim_common.base.error import BaseError
 from metagrim_common.base.error import InternalServerError
+from metagrim_common.base.health import HealthCheck
+from metagrim_common.base.lifespan import ResourceRegistry
 from metagrim_common.base.logger import setup_logging
+from metagrim_common.base.metrics import MetricsMiddleware
+from metagrim_common.base.metrics import render as render_metrics
+from metagrim_common.base.metrics import RouteMetricsTable
 from metagrim_common.base.middlewares import RequestContextLogMiddleware
+from metagrim_common.base.query_budget import QueryBudgetMiddleware
 from metagrim_common.base.router import APIRouter
+from metagrim_common.base.tracing import configure_tracing
+from metagrim_common.base.tracing import flush_tracing
+from metagrim_common.base.tracing import TracingMiddleware
 from metagrim_common.base.utils import respond
+from metagrim_common.enums import HealthStatusEnum
 from metagrim_common.schema import ApiInfoSchema
+from metagrim_common.schema import HealthSchema
 
 
-def create_app(settings) -> FastAPI:
+def create_app(settings, resources: ResourceRegistry | None = None) -> FastAPI:
     """
     Creates the App
     :param settings:
+    :param resources: Resources created, warmed up and closed in the lifespan of the App
     :return:
     """
     # First setup logging
     setup_logging()
+    # Resolve the settings and error configuration once for the hot paths
+    app_context.configure(settings=settings)
+    resources = resources or ResourceRegistry()
     # Creating app
     api = FastAPI(
         title=settings.app_title,
@@ -32,7 +50,9 @@ def create_app(settings) -> FastAPI:
         version=settings.app_version,
         root_path=settings.root_path,
         openapi_url=settings.openapi_url,
+        lifespan=resources.lifespan,
     )
+    api.state.resources = resources
 
     if settings.force_https:
         api.add_middleware(HTTPSRedirectMiddleware)
@@ -47,6 +67,23 @@ def create_app(settings) -> FastAPI:
         allow_headers=["*"],
     )
 
+    if settings.query_budget_mode != "off":
+        api.add_middleware(
+            QueryBudgetMiddleware,
+            mode=settings.query_budget_mode,
+            default_budget=settings.query_budget_default,
+            threshold=settings.query_repeat_threshold,
+        )
+
+    route_metrics = RouteMetricsTable()
+    if settings.metrics_enabled:
+        # Wraps all the middlewares but the tracing one, so their time is included except the tracing time
+        api.add_middleware(MetricsMiddleware, table=route_metrics)
+
+    if configure_tracing(settings) is not None:
+        api.add_middleware(TracingMiddleware)
+        resources.register("tracing", shutdown=flush_tracing)
+
     # Add the error handlers
     @api.exception_handler(HTTPException)
     async def http_exc_handler(request: Request, exc: HTTPException) -> JSONResponse:
@@ -63,7 +100,8 @@ def create_app(settings) -> FastAPI:
         exc_ = InternalServerError(message=f"Caught {exc} in exc_handler")
         return respond(exc=exc_)
 
-    router = APIRouter()
+    # Default routes are bound to this App, so they are not tracked with the application routers
+    router = _APIRouter()
 
     # Adding the Global default routes
     @router.get("/info", summary="Information", description="Obtain API information", response_model=ApiInfoSchema)
@@ -77,10 +115,43 @@ def create_app(settings) -> FastAPI:
 
     @router.get("/healthz")
     async def healthz():
+        if not resources.ready:
+            # Still warming up
+            return respond(core_constants.HTTP_503_SERVICE_UNAVAILABLE)
         return f"{settings.api_version}: {settings.app_title}"
 
+    health = HealthCheck(
+        resources,
+        cache_ttl=settings.health_cache_ttl,
+        probe_timeout=settings.health_probe_timeout,
+        degraded_latency_ms=settings.health_degraded_latency_ms,
+    )
+    api.state.health = health
+
+    @router.get("/livez", summary="Liveness", description="Worker process is running", response_model=HealthSchema)
+    async def livez():
+        # Never depends on the external services, restarting the worker would not fix them
+        return HealthSchema(status=HealthStatusEnum.ok, ready=resources.ready)
+
+    @router.get("/readyz", summary="Readiness", description="Probes of the dependencies", response_model=HealthSchema)
+    async def readyz():
+        result = await health.check()
+        http_code = core_constants.HTTP_200_OK
+        if result.status == HealthStatusEnum.down:
+            http_code = core_constants.HTTP_503_SERVICE_UNAVAILABLE
+        return JSONResponse(status_code=http_code, content=jsonable_encoder(result))
+
+    if settings.metrics_enabled:
+
+        @router.get("/metrics", include_in_schema=False)
+        async def metrics():
+            content, media_type = render_metrics()
+            return Response(content=content, media_type=media_type)
+
     # Adding all routes to the api
+    api.include_router(router)
     for r in APIRouter.get_routes():
         api.include_router(r)
+    route_metrics.bind(api.routes)
 
     return api
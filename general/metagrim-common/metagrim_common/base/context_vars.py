@@ -1,6 +1,9 @@
+import contextlib
 import typing
 from contextvars import ContextVar
 
+from metagrim_common.base.identity_map import IdentityMap
+
 CURRENT_USER_UUID_CTX_KEY = "current_user_uuid"
 _current_user_uuid_ctx_var: ContextVar[typing.Union[str, None]] = ContextVar(CURRENT_USER_UUID_CTX_KEY, default=None)
 
@@ -17,3 +20,36 @@ def set_current_user_uuid(user_uuid: typing.Union[str, None]) -> typing.Any:
 def reset_current_user_uuid(_token) -> None:
     if _token:
         _current_user_uuid_ctx_var.reset(_token)
+
+
+@contextlib.contextmanager
+def current_user(user_uuid: typing.Union[str, None]) -> typing.Iterator[None]:
+    """
+    Sets the user the enclosed work is done for, read by the audit fields of the repositories.
+    Entered by the authentication dependency for the duration of the request, use it for the work done
+    outside of a request (tasks, scripts). The context var is copied by the tasks created within.
+    :param user_uuid:
+    :return:
+    """
+    token = _current_user_uuid_ctx_var.set(str(user_uuid) if user_uuid else None)
+    try:
+        yield
+    finally:
+        _current_user_uuid_ctx_var.reset(token)
+
+
+IDENTITY_MAP_CTX_KEY = "identity_map"
+_identity_map_ctx_var: ContextVar[typing.Union[IdentityMap, None]] = ContextVar(IDENTITY_MAP_CTX_KEY, default=None)
+
+
+def get_identity_map() -> IdentityMap | None:
+    return _identity_map_ctx_var.get()
+
+
+def set_identity_map(identity_map: typing.Union[IdentityMap, None] = None) -> typing.Any:
+    return _identity_map_ctx_var.set(identity_map if identity_map is not None else IdentityMap())
+
+
+def reset_identity_map(_token) -> None:
+    if _token:
+        _identity_map_ctx_var.reset(_token)
@@ -1,17 +1,23 @@
+import typing
+from functools import lru_cache
 from logging import getLogger
 
-import inject
 from fastapi import Depends
 from jose import ExpiredSignatureError
-from jose import jwt
 from jose import JWTError
+from metagrim_common.base import app_context
 from metagrim_common.base import constants
+from metagrim_common.base import metrics
+from metagrim_common.base.context_vars import current_user
 from metagrim_common.base.error import ApplicationError
 from metagrim_common.base.error import InternalServerError
 from metagrim_common.base.error import JWTTokenError
 from metagrim_common.base.error import JWTTokenExpiredError
+from metagrim_common.base.scopes import compile_actions
 from metagrim_common.base.settings import CoreSettings
-from metagrim_common.base.utils import extract_authenticated_user
+from metagrim_common.base.utils import decode_token
+from metagrim_common.base.utils import extract_token_payload
+from metagrim_common.enums import UserTypeEnum
 from metagrim_common.repository import RedisRepository
 from metagrim_common.schema import AuthenticationSchema
 from metagrim_common.schema import JWTUser
@@ -19,19 +25,68 @@ from metagrim_common.schema import JWTUser
 logger = getLogger(__name__)
 
 
-async def get_authorised_user(token: str = Depends(AuthenticationSchema())):
-    """
+@lru_cache
+def get_token_store() -> RedisRepository:
+    """Stateless repository over the shared backend, built once per process"""
+    return RedisRepository()
+
 
+async def get_token_payload(token: str = Depends(AuthenticationSchema())) -> dict:
+    """
+    Verified payload of the access token, FastAPI caches it so the token is decoded once per request
     :param token:
     :return:
     """
+    return extract_token_payload(token)
+
+
+async def get_token_user(payload: dict = Depends(get_token_payload)) -> JWTUser:
+    """
+    User of the access token, its granted actions are parsed once and reused by all the checks of the request
+    :param payload:
+    :return:
+    """
+    return JWTUser(**payload)
+
+
+async def get_authorised_user(payload: dict = Depends(get_token_payload)) -> typing.AsyncIterator[str]:
+    """
+    Id of the logged-in user, the current user of the request until the response is sent
+    :param payload:
+    :return:
+    """
+
+    public_id = payload["sub"]
+    token_data = get_token_store().get(public_id)
+    if not token_data:
+        metrics.TOKEN_STORE_MISSES.inc()
+        raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="User already logout.")
+    metrics.TOKEN_STORE_HITS.inc()
+    with current_user(public_id):
+        yield public_id
+
+
+def require_actions(*actions: str, bypass_user_types: typing.Iterable[str] = (UserTypeEnum.admin,)):
+    """
+    Dependency allowing the request only when the access token grants all the given actions::
+
+        @router.get("", dependencies=[Depends(require_actions(UserActionEnum.user_list))])
+
+    The required actions are compiled once when the route is defined, the check only compares them with the actions
+    of the token, without any DB or Redis access. The actions granted afterwards apply from the next login.
+    :param actions: Required actions, `UserActionEnum` members or names
+    :param bypass_user_types: User types allowed without the actions, the admins have no action assigned
+    :return:
+    """
+    required = compile_actions(actions)
+    bypass = frozenset(getattr(user_type, "value", user_type) for user_type in bypass_user_types)
+
+    async def check_actions(user: JWTUser = Depends(get_token_user)) -> JWTUser:
+        if user.user_type in bypass or user.granted_actions.covers(required):
+            return user
+        raise ApplicationError(response_code=constants.HTTP_403_FORBIDDEN)
 
-    public_id = extract_authenticated_user(token)
-    repo = RedisRepository()
-    token_data = repo.get(public_id)
-    if token_data:
-        return public_id
-    raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="User already logout.")
+    return check_actions
 
 
 async def get_token(
@@ -47,11 +102,11 @@ async def get_token(
     Returns:
         decoded_token: the decoded token wrapped in our internal pydantic schema format
     """
-    config: CoreSettings = inject.instance(CoreSettings)
+    config: CoreSettings = app_context.current.settings
     decoded_token: JWTUser | None = None
     if token:
         try:
-            payload = jwt.decode(token=token, key=config.shared_secret_key, algorithms=[config.algorithm])
+            payload = decode_token(token, config)
             decoded_token = JWTUser(**payload)
             return decoded_token
         except ExpiredSignatureError:
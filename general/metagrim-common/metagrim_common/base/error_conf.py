@@ -55,6 +55,12 @@ ErrorConfig.extend(
             "response_type": ResponseTypeEnum.error,
             "message": "Request limit reached.",
         },
+        constants.HTTP_503_SERVICE_UNAVAILABLE: {  # type: ignore [attr-defined]
+            "response_code": constants.HTTP_503_SERVICE_UNAVAILABLE,  # type: ignore [attr-defined]
+            "http_code": constants.HTTP_503_SERVICE_UNAVAILABLE,  # type: ignore [attr-defined]
+            "response_type": ResponseTypeEnum.error,
+            "message": "Service is not ready",
+        },
         constants.HTTP_404_NOT_FOUND: {  # type: ignore [attr-defined]
             "response_code": constants.HTTP_404_NOT_FOUND,  # type: ignore [attr-defined]
             "http_code": constants.HTTP_404_NOT_FOUND,  # type: ignore [attr-defined]
@@ -0,0 +1,62 @@
+"""
+Encoders of the streamed exports.
+
+Both encoders take the batches of row tuples produced by `SqlAlchemyRepository.stream`
+and yield one chunk of bytes per batch, rows are never collected into a list of dictionaries.
+"""
+import csv
+import io
+import json
+import typing
+
+from metagrim_common.enums import ExportFormatEnum
+
+MEDIA_TYPES = {
+    ExportFormatEnum.ndjson: "application/x-ndjson",
+    ExportFormatEnum.csv: "text/csv",
+}
+
+_json_encoder = json.JSONEncoder(default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+async def encode_ndjson(
+    batches: typing.AsyncIterator[typing.Sequence[typing.Tuple]], columns: typing.Sequence[str]
+) -> typing.AsyncIterator[bytes]:
+    """
+    Encode the rows as newline delimited JSON objects
+    :param batches:
+    :param columns: Names of the leading values of each row, any further values are dropped
+    :return:
+    """
+    async for rows in batches:
+        chunk = "".join(_json_encoder.encode(dict(zip(columns, row))) + "\n" for row in rows)
+        yield chunk.encode()
+
+
+async def encode_csv(
+    batches: typing.AsyncIterator[typing.Sequence[typing.Tuple]], columns: typing.Sequence[str]
+) -> typing.AsyncIterator[bytes]:
+    """
+    Encode the rows as CSV with the header line
+    :param batches:
+    :param columns: Names of the leading values of each row, any further values are dropped
+    :return:
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    width = len(columns)
+    writer.writerow(columns)
+    async for rows in batches:
+        writer.writerows(row[:width] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Only the header is written when there are no rows
+        yield buffer.getvalue().encode()
+
+
+ENCODERS = {
+    ExportFormatEnum.ndjson: encode_ndjson,
+    ExportFormatEnum.csv: encode_csv,
+}
@@ -0,0 +1,110 @@
+"""
+Readiness of the worker based on the probes of its dependencies.
+
+`/readyz` runs the `probe` hooks of the registered resources concurrently, each of them bounded by
+`health_probe_timeout`. The results are cached for `health_cache_ttl` seconds and the concurrent requests
+share one run of the probes, so frequent probing by the load balancers does not add load on the dependencies.
+
+The status of a dependency is
+
+* `DOWN` when its probe raises or times out,
+* `DEGRADED` when the probe is slower than `health_degraded_latency_ms` or reports `degraded` in its details
+  (e.g. the connection pool is exhausted),
+* `OK` otherwise.
+
+The worker is `DOWN` (HTTP 503) while warming up or when a critical dependency is down and `DEGRADED` (HTTP 200)
+when any dependency is degraded or a non critical one is down, so the load balancer can shift the traffic
+before the requests start to time out.
+"""
+import asyncio
+import time
+from datetime import datetime
+from datetime import timezone
+
+from metagrim_common.base.lifespan import call_hook
+from metagrim_common.base.lifespan import Resource
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.enums import HealthStatusEnum
+from metagrim_common.schema import DependencyHealthSchema
+from metagrim_common.schema import HealthSchema
+
+
+class HealthCheck:
+    """Runs and caches the dependency probes of the registered resources"""
+
+    def __init__(
+        self,
+        resources: ResourceRegistry,
+        cache_ttl: float = 2.0,
+        probe_timeout: float = 1.0,
+        degraded_latency_ms: float = 250.0,
+    ):
+        self.resources = resources
+        self.cache_ttl = cache_ttl
+        self.probe_timeout = probe_timeout
+        self.degraded_latency_ms = degraded_latency_ms
+        self._result: HealthSchema | None = None
+        self._checked = 0.0
+        self._pending: asyncio.Future | None = None
+
+    async def _probe(self, resource: Resource) -> DependencyHealthSchema:
+        start = time.perf_counter()
+        status = HealthStatusEnum.ok
+        error = None
+        details = None
+        try:
+            details = await asyncio.wait_for(call_hook(resource.probe), timeout=self.probe_timeout)
+        except asyncio.TimeoutError:
+            status = HealthStatusEnum.down
+            error = f"Probe timed out after {self.probe_timeout} s"
+        except Exception as ex:
+            status = HealthStatusEnum.down
+            error = str(ex) or ex.__class__.__name__
+        latency_ms = (time.perf_counter() - start) * 1000
+        if status == HealthStatusEnum.ok:
+            details = dict(details) if isinstance(details, dict) else None
+            if latency_ms >= self.degraded_latency_ms or (details and details.pop("degraded", False)):
+                status = HealthStatusEnum.degraded
+        return DependencyHealthSchema(
+            name=resource.name,
+            status=status,
+            critical=resource.critical,
+            latency_ms=round(latency_ms, 3),
+            error=error,
+            details=details,
+        )
+
+    async def _run(self) -> HealthSchema:
+        try:
+            dependencies = await asyncio.gather(*(self._probe(r) for r in self.resources.resources if r.probe))
+            status = HealthStatusEnum.ok
+            for dependency in dependencies:
+                if dependency.status == HealthStatusEnum.down and dependency.critical:
+                    status = HealthStatusEnum.down
+                    break
+                if dependency.status != HealthStatusEnum.ok:
+                    status = HealthStatusEnum.degraded
+            self._result = HealthSchema(
+                status=status,
+                ready=True,
+                checked_at=datetime.now(timezone.utc),
+                dependencies=list(dependencies),
+            )
+            self._checked = time.monotonic()
+            return self._result
+        finally:
+            self._pending = None
+
+    async def check(self) -> HealthSchema:
+        """
+        Returns the readiness of the worker, the probes are run at most once per `cache_ttl`
+        :return:
+        """
+        if not self.resources.ready:
+            return HealthSchema(status=HealthStatusEnum.down, ready=False)
+        if self._result is not None and time.monotonic() - self._checked < self.cache_ttl:
+            return self._result
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._run())
+        # Disconnected client must not cancel the probes shared with the other requests
+        return await asyncio.shield(self._pending)
@@ -0,0 +1,62 @@
+"""Request scoped identity map
+
+Keeps the rows and domains already loaded while serving the current request, so the repeated reads
+of the same record within the request do not hit the database again.
+"""
+import typing
+
+T = typing.TypeVar("T")
+
+
+class IdentityMap:
+    """
+    Holds the loaded records keyed by the model class and record id
+    and the domains built from them keyed by the domain class and record id
+    """
+
+    __slots__ = ("_records", "_domains")
+
+    def __init__(self) -> None:
+        self._records: typing.Dict[typing.Tuple[type, str], typing.Any] = {}
+        self._domains: typing.Dict[typing.Tuple[type, str], typing.Any] = {}
+
+    def get(self, model: type, id_: typing.Any) -> typing.Any:
+        return self._records.get((model, str(id_)))
+
+    def add(self, model: type, id_: typing.Any, record: typing.Any) -> None:
+        self._records[(model, str(id_))] = record
+
+    def get_domain(self, domain: typing.Type[T], id_: typing.Any) -> T | None:
+        return self._domains.get((domain, str(id_)))
+
+    def add_domain(self, id_: typing.Any, domain: typing.Any) -> None:
+        self._domains[(type(domain), str(id_))] = domain
+
+    def discard(self, model: type, id_: typing.Any) -> None:
+        """
+        Forget the record and every domain built for the given id
+        :param model:
+        :param id_:
+        :return:
+        """
+        key = str(id_)
+        self._records.pop((model, key), None)
+        for domain_key in [k for k in self._domains if k[1] == key]:
+            del self._domains[domain_key]
+
+    def discard_model(self, model: type) -> None:
+        """
+        Forget all the records of given model, used when a write can not be narrowed down to ids
+        :param model:
+        :return:
+        """
+        keys = {k[1] for k in self._records if k[0] is model}
+        for key in keys:
+            self.discard(model, key)
+
+    def clear(self) -> None:
+        self._records.clear()
+        self._domains.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,152 @@
+"""
+Lifespan of the application resources.
+
+The components register their resources (database engine, Redis client, caches, ...) with hooks run by the
+lifespan of the worker process instead of creating them at import time::
+
+    resources = ResourceRegistry()
+    resources.register("database", startup=get_engine, warmup=warm_up_pool, shutdown=dispose_engine)
+    api = create_app(settings, resources=resources)
+
+* `startup` hooks run in the registration order before the worker accepts the requests.
+* `warmup` hooks run concurrently in the background once the worker is started (open the pool connections,
+  ping Redis, prime the caches). Until all of them finish `/healthz` reports the worker as not ready,
+  so the orchestrator does not route the first requests to a cold replica.
+* `shutdown` hooks run in the reverse order when the worker stops.
+* `probe` hooks check the resource for `/readyz` (see `metagrim_common.base.health`), the worker is not ready
+  when a `critical` resource is down.
+
+The hooks can be plain functions or coroutine functions, the plain ones are run in the thread pool
+so the blocking I/O does not stall the event loop. Failing warmup is logged and does not keep the worker
+unready forever, the failure is kept in `ResourceRegistry.errors`.
+"""
+import asyncio
+import contextlib
+import dataclasses
+import functools
+import inspect
+import logging
+import time
+import typing
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+Hook = typing.Callable[[], typing.Any]
+
+
+@dataclasses.dataclass
+class Resource:
+    name: str
+    startup: Hook | None = None
+    warmup: Hook | None = None
+    shutdown: Hook | None = None
+    probe: Hook | None = None
+    critical: bool = True
+
+
+def is_async(hook: Hook) -> bool:
+    while isinstance(hook, functools.partial):
+        hook = hook.func
+    return inspect.iscoroutinefunction(hook) or inspect.iscoroutinefunction(getattr(hook, "__call__", None))
+
+
+async def call_hook(hook: Hook) -> typing.Any:
+    if is_async(hook):
+        return await hook()
+    return await run_in_threadpool(hook)
+
+
+class ResourceRegistry:
+    """Keeps the resources of the application and runs their hooks in the lifespan of the worker"""
+
+    def __init__(self):
+        self.resources: typing.List[Resource] = []
+        self.ready = False
+        # Name of the resource -> error of its failed hook
+        self.errors: typing.Dict[str, str] = {}
+        self._warmup_task: asyncio.Task | None = None
+
+    def register(
+        self,
+        name: str,
+        startup: Hook | None = None,
+        warmup: Hook | None = None,
+        shutdown: Hook | None = None,
+        probe: Hook | None = None,
+        critical: bool = True,
+    ) -> Resource:
+        """
+        Register the resource hooks
+        :param name: Name of the resource, used in the logs and `errors`
+        :param startup: Creates the resource before the worker accepts the requests
+        :param warmup: Warms up the resource in the background, `/healthz` waits for it
+        :param shutdown: Releases the resource when the worker stops
+        :param probe: Checks the resource for `/readyz`, returns optional details or raises
+        :param critical: If False the resource being down only degrades the worker
+        :return:
+        """
+        resource = Resource(
+            name=name, startup=startup, warmup=warmup, shutdown=shutdown, probe=probe, critical=critical
+        )
+        self.resources.append(resource)
+        return resource
+
+    async def startup(self) -> None:
+        """Run the startup hooks and schedule the warmup"""
+        self.ready = False
+        self.errors.clear()
+        for resource in self.resources:
+            if resource.startup is not None:
+                logger.info(f"Starting resource {resource.name}")
+                await call_hook(resource.startup)
+        self._warmup_task = asyncio.create_task(self.warmup())
+
+    async def _warmup(self, resource: Resource) -> None:
+        start = time.perf_counter()
+        try:
+            await call_hook(resource.warmup)
+        except Exception as ex:
+            logger.warning(f"Unable to warm up resource {resource.name}: {ex}")
+            self.errors[resource.name] = str(ex)
+        else:
+            logger.info(f"Resource {resource.name} warmed up in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    async def warmup(self) -> None:
+        """Run the warmup hooks concurrently and mark the application ready"""
+        await asyncio.gather(*(self._warmup(r) for r in self.resources if r.warmup is not None))
+        self.ready = True
+        logger.info("Application is ready")
+
+    async def wait_until_ready(self) -> None:
+        """Wait for the warmup scheduled by the startup"""
+        if self._warmup_task is not None:
+            await asyncio.shield(self._warmup_task)
+
+    async def shutdown(self) -> None:
+        """Stop the warmup and run the shutdown hooks in the reverse order"""
+        self.ready = False
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._warmup_task
+        self._warmup_task = None
+        for resource in reversed(self.resources):
+            if resource.shutdown is None:
+                continue
+            logger.info(f"Closing resource {resource.name}")
+            try:
+                await call_hook(resource.shutdown)
+            except Exception as ex:
+                # Keep closing the other resources
+                logger.error(f"Unable to close resource {resource.name}: {ex}", exc_info=True)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app) -> typing.AsyncIterator[None]:
+        """Lifespan handler of the FastAPI application"""
+        await self.startup()
+        try:
+            yield
+        finally:
+            await self.shutdown()
@@ -0,0 +1,288 @@
+"""
+Prometheus metrics of the application, exposed by `/metrics`.
+
+* HTTP request duration and count per route, the label children of the routes registered through
+  the `APIRouter` registry are bound once when the App is created.
+* SQL query duration and the number of queries and time spent in the database per request,
+  recorded by the engine events (see `instrument_engine`).
+* Redis operation latency and errors of `RedisBackend`.
+* bcrypt password verification time, JWT decode time and the hits/misses of the token store
+  and of the user read cache, the hit ratio is `rate(hits) / rate(hits + misses)`.
+* Requests rejected by the rate limits, by the local pre-filter or by the shared limit in Redis.
+* Audit events written or lost by the write-behind audit trail.
+
+The hot paths only call `observe`/`inc` on the pre-bound children, nothing is allocated per request
+except the small `RequestStats` holder. With multiple worker processes set `PROMETHEUS_MULTIPROC_DIR`
+to a directory shared by the workers, `/metrics` then aggregates the metrics of all of them.
+"""
+import contextvars
+import functools
+import os
+import time
+import typing
+
+from prometheus_client import CollectorRegistry
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import Counter
+from prometheus_client import generate_latest
+from prometheus_client import Histogram
+from prometheus_client import REGISTRY
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+UNMATCHED_ROUTE = "<unmatched>"
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Duration of the HTTP requests", ["method", "route"])
+REQUESTS = Counter("http_requests_total", "HTTP requests by the response status", ["method", "route", "status"])
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of the SQL queries",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "Failed SQL queries")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL queries run by a HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in the SQL queries by a HTTP request",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+REDIS_DURATION = Histogram(
+    "redis_operation_duration_seconds",
+    "Duration of the Redis operations",
+    ["operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+REDIS_ERRORS = Counter("redis_operation_errors_total", "Failed Redis operations", ["operation"])
+
+PASSWORD_VERIFY_DURATION = Histogram(
+    "password_verify_duration_seconds",
+    "Duration of the password hash verification",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+JWT_DECODE_DURATION = Histogram(
+    "jwt_decode_duration_seconds",
+    "Duration of the JWT decoding and signature verification",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+
+TOKEN_STORE_LOOKUPS = Counter("token_store_lookups_total", "Lookups of the issued tokens", ["result"])
+TOKEN_STORE_HITS = TOKEN_STORE_LOOKUPS.labels("hit")
+TOKEN_STORE_MISSES = TOKEN_STORE_LOOKUPS.labels("miss")
+
+USER_CACHE_LOOKUPS = Counter("user_cache_lookups_total", "Lookups of the user read cache", ["result"])
+USER_CACHE_LOCAL_HITS = USER_CACHE_LOOKUPS.labels("local_hit")
+USER_CACHE_REDIS_HITS = USER_CACHE_LOOKUPS.labels("redis_hit")
+USER_CACHE_MISSES = USER_CACHE_LOOKUPS.labels("miss")
+
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected by the rate limits", ["limit", "source"])
+
+AUDIT_EVENTS = Counter("audit_events_total", "Audit events by the result of their write", ["result"])
+AUDIT_EVENTS_WRITTEN = AUDIT_EVENTS.labels("written")
+AUDIT_EVENTS_FAILED = AUDIT_EVENTS.labels("failed")
+
+OUTBOX_EVENTS = Counter("outbox_events_total", "Outbox events by the result of their publishing", ["result"])
+OUTBOX_EVENTS_PUBLISHED = OUTBOX_EVENTS.labels("published")
+OUTBOX_EVENTS_FAILED = OUTBOX_EVENTS.labels("failed")
+
+
+class RequestStats:
+    """Database usage of the current request"""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_request_stats_ctx_var: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+def get_request_stats() -> RequestStats | None:
+    return _request_stats_ctx_var.get()
+
+
+def timed(histogram, errors=None):
+    """
+    Decorator observing the duration of the calls in given (bound) histogram and counting the raised errors
+    :param histogram:
+    :param errors:
+    :return:
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine) -> None:
+    """
+    Record the duration of the queries run by the engine and their number per request
+    :param engine: SQLAlchemy engine
+    :return:
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = _request_stats_ctx_var.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        DB_QUERY_ERRORS.inc()
+
+
+class RouteMetrics:
+    """Label children of a route and method"""
+
+    __slots__ = ("method", "route", "duration", "queries", "db_time", "responses")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.duration = REQUEST_DURATION.labels(method, route)
+        self.queries = DB_QUERIES_PER_REQUEST.labels(route)
+        self.db_time = DB_TIME_PER_REQUEST.labels(route)
+        # Status code -> counter child, filled on the first response with the status
+        self.responses: typing.Dict[int, typing.Any] = {}
+
+    def observe(self, status: int, duration: float, stats: RequestStats) -> None:
+        responses = self.responses.get(status)
+        if responses is None:
+            responses = self.responses[status] = REQUESTS.labels(self.method, self.route, str(status))
+        responses.inc()
+        self.duration.observe(duration)
+        self.queries.observe(stats.queries)
+        self.db_time.observe(stats.db_time)
+
+
+class RouteMetricsTable:
+    """Endpoint -> method label -> `RouteMetrics` of the App"""
+
+    def __init__(self):
+        self._routes: typing.Dict[typing.Any, typing.Dict[str, RouteMetrics]] = {}
+        self._paths: typing.Dict[typing.Any, str] = {}
+        # Requests matching no route, one entry per method label whatever the clients send
+        self._unmatched = {label: RouteMetrics(label, UNMATCHED_ROUTE) for label in (*HTTP_METHODS, "OTHER")}
+
+    def bind(self, routes: typing.Iterable[typing.Any]) -> None:
+        """
+        Bind the label children of the routes up front
+        :param routes: Routes of the App
+        :return:
+        """
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is None:
+                continue
+            self._paths.setdefault(endpoint, route.path)
+            for method in getattr(route, "methods", None) or ():
+                self.get(endpoint, method)
+
+    def __len__(self) -> int:
+        return len(self._unmatched) + sum(len(methods) for methods in self._routes.values())
+
+    def get(self, endpoint: typing.Any, method: str, path: str | None = None) -> RouteMetrics:
+        """
+        Returns the metrics of the endpoint matched by the routing
+        :param endpoint: Matched endpoint, `None` when no route matched
+        :param method:
+        :param path: Path of the route, used if the route was added after the App was created
+        :return:
+        """
+        # Keep the label values and the table bounded, the method is whatever the client sent
+        label = method if method in HTTP_METHODS else "OTHER"
+        if endpoint is None:
+            return self._unmatched[label]
+        methods = self._routes.get(endpoint)
+        if methods is None:
+            methods = self._routes[endpoint] = {}
+        metrics = methods.get(label)
+        if metrics is None:
+            metrics = methods[label] = RouteMetrics(label, self._paths.get(endpoint) or path or UNMATCHED_ROUTE)
+        return metrics
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording the request metrics of the matched route"""
+
+    def __init__(self, app: ASGIApp, table: RouteMetricsTable):
+        self.app = app
+        self.table = table
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats_ctx_var.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats_ctx_var.reset(token)
+            # Routing stores the matched endpoint in the scope
+            metrics = self.table.get(scope.get("endpoint"), scope["method"], getattr(scope.get("route"), "path", None))
+            metrics.observe(status, time.perf_counter() - start, stats)
+
+
+def render() -> typing.Tuple[bytes, str]:
+    """
+    Returns the metrics in the Prometheus text format and its content type
+    :return:
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
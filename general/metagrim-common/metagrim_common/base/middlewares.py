@@ -1,11 +1,15 @@
 from contextvars import ContextVar
 from uuid import uuid4
 
+from metagrim_common.base.context_vars import reset_identity_map
+from metagrim_common.base.context_vars import set_identity_map
+from opentelemetry import trace
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.base import RequestResponseEndpoint
 from starlette.requests import Request
 
 REQUEST_ID_CTX_KEY = "request_id"
+REQUEST_ID_HEADER = "X-Request-ID"
 _request_id_ctx_var: ContextVar[str] = ContextVar(REQUEST_ID_CTX_KEY, default=None)
 
 
@@ -13,13 +17,27 @@ def get_request_id() -> str:
     return _request_id_ctx_var.get()
 
 
+def _incoming_request_id(request: Request) -> str | None:
+    """Request id given by the caller, e.g. the gateway or the other microservice"""
+    request_id = request.headers.get(REQUEST_ID_HEADER)
+    if request_id and len(request_id) <= 128 and request_id.isprintable():
+        return request_id
+    return None
+
+
 class RequestContextLogMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
-        request_id = _request_id_ctx_var.set(str(uuid4()))
+        request_id = _request_id_ctx_var.set(_incoming_request_id(request) or str(uuid4()))
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attribute("http.request_id", get_request_id())
+        # Records loaded while serving this request are shared through the identity map
+        identity_map = set_identity_map()
 
         response = await call_next(request)
-        response.headers["X-Request-ID"] = get_request_id()
+        response.headers[REQUEST_ID_HEADER] = get_request_id()
 
+        reset_identity_map(identity_map)
         _request_id_ctx_var.reset(request_id)
 
         return response
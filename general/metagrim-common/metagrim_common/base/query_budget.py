@@ -0,0 +1,196 @@
+"""
+Query budget of the requests, a development and test mode catching the N+1 queries.
+
+With `QUERY_BUDGET_MODE` set to `warn` or `raise` the unit of work watches the engine of its session and every
+SQL statement run while serving a request is recorded in the `QueryLog` of the request (see `QueryBudgetMiddleware`).
+When the request completes
+
+* the number of statements is checked against the budget of the route, declared on the endpoint with
+  `query_budget` or `QUERY_BUDGET_DEFAULT` for the routes without one,
+* the statements of the same shape (SQL text with the bound parameters, the `IN` lists collapsed) run
+  `QUERY_REPEAT_THRESHOLD` times or more are reported as N+1, usually a relationship lazy loaded per record
+  which the repository should eager load instead (see `SqlAlchemyRepository.eager_load`)::
+
+    @router.get("", response_model=user.UserPaginationResponseSchema)
+    @query_budget(4)
+    async def get_users(...):
+
+`warn` logs the violations, `raise` raises `QueryBudgetExceeded` so the test sending the request fails.
+The unit of work used outside of a request checks its own statements for N+1. `off` (default) adds nothing.
+"""
+import collections
+import contextvars
+import functools
+import logging
+import re
+import typing
+
+from sqlalchemy import event
+from starlette.types import ASGIApp
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "warn", "raise")
+
+# Bound parameter of the DBAPI paramstyles: qmark, format, pyformat, named and numeric
+_PARAMETER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+# Expanded `IN` list, its length depends on the values and not on the statement
+_PARAMETER_LIST = re.compile(rf"\(\s*{_PARAMETER}(?:\s*,\s*{_PARAMETER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Request ran more statements than its budget or the same statement repeatedly"""
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """
+    Returns the statement with the whitespace normalized and the expanded `IN` lists collapsed
+    :param statement: SQL statement as sent to the database
+    :return:
+    """
+    return _PARAMETER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryLog:
+    """Statements run by the current request or unit of work"""
+
+    __slots__ = ("count", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.shapes: typing.Counter[str] = collections.Counter()
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> typing.List[typing.Tuple[str, int]]:
+        """
+        Returns the shapes run at least `threshold` times with their counts, the most repeated first
+        :param threshold:
+        :return:
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def violations(self, budget: int | None, threshold: int) -> typing.List[str]:
+        """
+        Returns the description of the exceeded budget and of the repeated statements
+        :param budget: Statements allowed, `None` for no limit
+        :param threshold: Repetitions of the same shape reported as N+1
+        :return:
+        """
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} statements over the budget of {budget}")
+        for shape, count in self.repeated(threshold):
+            problems.append(f"N+1, {count} times: {shape}")
+        return problems
+
+
+_query_log_ctx_var: contextvars.ContextVar[QueryLog | None] = contextvars.ContextVar("query_log", default=None)
+
+
+def get_query_log() -> QueryLog | None:
+    return _query_log_ctx_var.get()
+
+
+def set_query_log(query_log: QueryLog | None = None) -> contextvars.Token:
+    return _query_log_ctx_var.set(query_log if query_log is not None else QueryLog())
+
+
+def reset_query_log(token: contextvars.Token) -> None:
+    _query_log_ctx_var.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    query_log = _query_log_ctx_var.get()
+    if query_log is not None:
+        query_log.record(statement)
+
+
+def watch(bind) -> None:
+    """
+    Record the statements run by the engine in the query log of the current request, once per engine
+    :param bind: Engine or Connection of the session
+    :return:
+    """
+    engine = getattr(bind, "engine", bind)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def unwatch(bind) -> None:
+    """
+    Stop recording the statements run by the engine, the reverse of `watch`
+    :param bind: Engine or Connection
+    :return:
+    """
+    engine = getattr(bind, "engine", bind)
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def query_budget(max_queries: int):
+    """
+    Declare the number of statements the endpoint is allowed to run per request
+    :param max_queries:
+    :return:
+    """
+
+    def decorator(func):
+        func.__query_budget__ = max_queries
+        return func
+
+    return decorator
+
+
+def report(query_log: QueryLog, name: str, mode: str, budget: int | None = None, threshold: int = 3) -> None:
+    """
+    Log or raise the violations of the query log
+    :param query_log:
+    :param name: Route or unit of work the statements were run by
+    :param mode: `warn` or `raise`
+    :param budget: Statements allowed, `None` for no limit
+    :param threshold: Repetitions of the same shape reported as N+1
+    :return:
+    """
+    problems = query_log.violations(budget, threshold)
+    if not problems:
+        return
+    message = f"{name} ran {query_log.count} statements: " + "; ".join(problems)
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryBudgetMiddleware:
+    """Pure ASGI middleware checking the statements of the request against the budget of its route"""
+
+    def __init__(self, app: ASGIApp, mode: str = "warn", default_budget: int | None = None, threshold: int = 3):
+        if mode not in MODES:
+            raise ValueError(f"Query budget mode must be one of {', '.join(MODES)}, got {mode!r}")
+        self.app = app
+        self.mode = mode
+        self.default_budget = default_budget
+        self.threshold = threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        query_log = QueryLog()
+        token = _query_log_ctx_var.set(query_log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _query_log_ctx_var.reset(token)
+        # Routing stores the matched endpoint in the scope
+        budget = getattr(scope.get("endpoint"), "__query_budget__", self.default_budget)
+        route = getattr(scope.get("route"), "path", scope["path"])
+        report(query_log, f"{scope['method']} {route}", self.mode, budget=budget, threshold=self.threshold)
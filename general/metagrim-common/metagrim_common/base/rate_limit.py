@@ -0,0 +1,171 @@
+"""
+Rate limits of the routes, shared by all the workers through Redis.
+
+`RateLimit` is a dependency counting the request against the limit of each of its keys (client IP, login e-mail,
+...) for the route, with the Generic Cell Rate Algorithm run by a Lua script of the backend, so a request costs a
+single atomic round trip whatever the number of keys. It is declared on the route so it runs before the endpoint,
+e.g. before the password hash of a login attempt is verified::
+
+    @router.post("/auth", dependencies=[Depends(RateLimit("auth", keys=(client_ip, login_identity)))])
+
+Each worker also keeps a token bucket per key with the same limit. The requests over the limit of the worker alone
+are over the shared limit too, they are rejected without calling Redis, so a burst costs Redis a single call per
+allowed request. When Redis is unavailable the limit of the worker still applies.
+
+Rejected requests answer `429` with the `Retry-After` header.
+"""
+import hashlib
+import logging
+import math
+import time
+import typing
+from collections import OrderedDict
+
+import inject
+from fastapi import Request
+from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.base import app_context
+from metagrim_common.base import constants
+from metagrim_common.base import metrics
+from metagrim_common.base.error import ApplicationError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "rate-limit"
+
+KeyFunction = typing.Callable[[Request], typing.Awaitable[str | None]]
+
+
+async def client_ip(request: Request) -> str | None:
+    """Address of the client, set by the server from `X-Forwarded-For` behind the trusted proxies"""
+    return request.client.host if request.client else None
+
+
+async def login_identity(request: Request) -> str | None:
+    """E-mail of the login attempt, from the JSON body (`email`) or the OAuth2 form (`username`)"""
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            body = await request.json()
+            identity = body.get("email") if isinstance(body, dict) else None
+        else:
+            identity = (await request.form()).get("username")
+    except Exception:
+        # Malformed bodies are rejected by the validation of the endpoint
+        return None
+    return identity.strip().lower() if isinstance(identity, str) and identity.strip() else None
+
+
+class TokenBuckets:
+    """In-process token buckets of the most recently used keys"""
+
+    def __init__(self, capacity: float, rate: float, size: int = 4096):
+        """
+        :param capacity: Requests allowed at once
+        :param rate: Requests allowed per second
+        :param size: Buckets kept, the least recently used are dropped
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self.size = size
+        self._buckets: "OrderedDict[str, typing.List[float]]" = OrderedDict()
+
+    def _bucket(self, key: str, now: float) -> typing.List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.capacity, now]
+            while len(self._buckets) > self.size:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def take(self, keys: typing.Sequence[str], now: float | None = None) -> float:
+        """
+        Takes a token from the bucket of each key when all of them have one
+        :param keys:
+        :param now: Monotonic time in seconds
+        :return: Seconds to wait for the tokens, `0` when they were taken
+        """
+        now = time.monotonic() if now is None else now
+        buckets = [self._bucket(key, now) for key in keys]
+        wait = max([(1 - tokens) / self.rate for tokens, _ in buckets if tokens < 1], default=0.0)
+        if wait:
+            return wait
+        for bucket in buckets:
+            bucket[0] -= 1
+        return 0.0
+
+
+class RateLimit:
+    """Dependency allowing `limit` requests per `period` seconds for each key of the route"""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int | None = None,
+        period: float | None = None,
+        keys: typing.Sequence[KeyFunction] = (client_ip,),
+    ):
+        """
+        :param name: Name of the limit, usually the route, part of the Redis keys
+        :param limit: Requests allowed per period and at once, `RATE_LIMIT_LOGIN_ATTEMPTS` by default
+        :param period: Period in seconds, `RATE_LIMIT_LOGIN_PERIOD` by default
+        :param keys: Coroutine functions returning the keys of the request, the requests without a key are not
+            counted for it
+        """
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.keys = tuple(keys)
+        self._local: TokenBuckets | None = None
+        self._rejected_local = metrics.RATE_LIMITED.labels(name, "local")
+        self._rejected_shared = metrics.RATE_LIMITED.labels(name, "redis")
+
+    def _configure(self) -> TokenBuckets:
+        # Resolved on the first request, the routes are defined before the settings are configured
+        settings = app_context.current.settings
+        self.limit = self.limit or settings.rate_limit_login_attempts
+        self.period = self.period or settings.rate_limit_login_period
+        self._local = TokenBuckets(self.limit, self.limit / self.period, size=settings.rate_limit_local_size)
+        return self._local
+
+    async def request_keys(self, request: Request) -> typing.List[str]:
+        keys = []
+        for key_function in self.keys:
+            value = await key_function(request)
+            if value is not None:
+                # Bounded and anonymous keys, the braces keep the keys of the limit in the same cluster slot
+                digest = hashlib.blake2b(value.encode(), digest_size=12).hexdigest()
+                keys.append(f"{KEY_PREFIX}:{{{self.name}}}:{key_function.__name__}:{digest}")
+        return keys
+
+    async def __call__(self, request: Request) -> None:
+        if not app_context.current.settings.rate_limit_enabled:
+            return
+        local = self._local or self._configure()
+        keys = await self.request_keys(request)
+        if not keys:
+            return
+
+        wait = local.take(keys)
+        if wait:
+            self._rejected_local.inc()
+            self.reject(wait)
+
+        interval_ms = self.period * 1000 / self.limit
+        try:
+            wait_ms = inject.instance(BaseBackend).rate_limit(keys, interval_ms, interval_ms * self.limit)
+        except Exception as ex:
+            # The limit of the worker still applies
+            logger.warning(f"Rate limit {self.name} not checked with the backend: {ex}")
+            return
+        if wait_ms:
+            self._rejected_shared.inc()
+            self.reject(wait_ms / 1000)
+
+    def reject(self, wait: float) -> typing.NoReturn:
+        raise ApplicationError(
+            response_code=constants.HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": str(math.ceil(wait))}
+        )
@@ -0,0 +1,96 @@
+"""
+Compact encoding of the user actions in the access token scopes.
+
+The actions registered in `UserActionEnum` are packed into a single `mask:<hex>` scope, bit `n` standing for the
+`n`-th member of the enum, so the size of the token does not grow with the number of granted actions::
+
+    >>> encode_scopes(["USER_READ", "USER_LIST"])
+    ['mask:3']
+    >>> decode_scopes(["mask:3"])
+    ['USER_LIST', 'USER_READ']
+
+Actions not registered in the enum are kept as plain scopes.
+
+The authorization checks compare `ActionSet`s, the required one compiled once when the route is defined and the
+granted one parsed once per token, so a check is a mask comparison and at most a small set inclusion.
+"""
+import typing
+
+from metagrim_common.enums import UserActionEnum
+
+MASK_PREFIX = "mask:"
+
+_ACTION_BITS: typing.Dict[str, int] = {action.value: 1 << index for index, action in enumerate(UserActionEnum)}
+
+
+class ActionSet(typing.NamedTuple):
+    """Actions as the bitmask of the registered ones and the set of the others"""
+
+    mask: int = 0
+    others: typing.FrozenSet[str] = frozenset()
+
+    def covers(self, required: "ActionSet") -> bool:
+        """
+        Returns whether all the required actions are in this set
+        :param required:
+        :return:
+        """
+        return self.mask & required.mask == required.mask and required.others <= self.others
+
+    def names(self) -> typing.List[str]:
+        return sorted([action for action, bit in _ACTION_BITS.items() if self.mask & bit] + list(self.others))
+
+
+def compile_actions(actions: typing.Iterable[str]) -> ActionSet:
+    """
+    Returns the set of given actions
+    :param actions: Action names, `UserActionEnum` members included
+    :return:
+    """
+    mask = 0
+    others = set()
+    for action in actions:
+        action = getattr(action, "value", action)
+        bit = _ACTION_BITS.get(action)
+        if bit is None:
+            others.add(action)
+        else:
+            mask |= bit
+    return ActionSet(mask, frozenset(others))
+
+
+def parse_scopes(scopes: typing.Iterable[str]) -> ActionSet:
+    """
+    Returns the set of the actions granted by the scopes of the access token
+    :param scopes:
+    :return:
+    """
+    mask = 0
+    others = set()
+    for scope in scopes:
+        if scope.startswith(MASK_PREFIX):
+            mask |= int(scope[len(MASK_PREFIX) :], 16)
+        else:
+            others.add(scope)
+    return ActionSet(mask, frozenset(others))
+
+
+def encode_scopes(actions: typing.Iterable[str]) -> typing.List[str]:
+    """
+    Returns the scopes of the access token granting given actions
+    :param actions:
+    :return:
+    """
+    action_set = compile_actions(actions)
+    scopes = [f"{MASK_PREFIX}{action_set.mask:x}"] if action_set.mask else []
+    scopes.extend(sorted(action_set.others))
+    return scopes
+
+
+def decode_scopes(scopes: typing.Iterable[str]) -> typing.List[str]:
+    """
+    Returns the actions granted by the scopes of the access token
+    :param scopes:
+    :return:
+    """
+    return parse_scopes(scopes).names()
@@ -21,6 +21,14 @@ class CoreSettings(BaseSettings):
     app_env: str = "LOCAL"
     app_port: int = 8080
     app_host: str = "127.0.0.1"
+    # Production server, see `auth_service.app.server`
+    app_server: str = "uvicorn"  # uvicorn or gunicorn
+    app_workers: int = 1
+    app_loop: str = "auto"  # auto, asyncio or uvloop
+    app_http: str = "auto"  # auto, h11 or httptools
+    app_preload: bool = True  # Import the application once before forking the gunicorn workers
+    app_graceful_timeout: int = 30  # Seconds given to the in-flight requests on SIGTERM
+    app_keepalive: int = 5
     app_base_url: str | None = None
     base_url: str | None = None
     root_path: str = ""
@@ -43,12 +51,23 @@ class CoreSettings(BaseSettings):
     db_host_type: str = "ipv4"
     db_port: int | None = 5432
     sqlalchemy_uri: str | None = None
+    # Connection pool of each worker process
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_warmup_connections: int = 2  # Opened by the warmup, at most db_pool_size
 
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_user: str | None = None
     redis_pass: str | None = None
 
+    user_cache_ttl: int = 300
+    user_cache_local_ttl: float = 5.0
+    user_cache_local_size: int = 1024
+
+    # Number of rows fetched from the server side cursor per chunk of a streamed export
+    export_batch_size: int = 1000
+
     ms_sso_client_id: str | None = None
     ms_sso_client_secret: str | None = None
     ms_sso_tenant_id: str | None = None
@@ -59,6 +78,43 @@ class CoreSettings(BaseSettings):
     event_service_base_url: str | None = None
     requests_timeout: float | None = None
 
+    # OpenTelemetry tracing, see `metagrim_common.base.tracing`
+    tracing_exporter: str = "none"  # none, otlp, file or console
+    tracing_file: str = "traces.jsonl"
+    tracing_otlp_endpoint: str | None = None  # Defaults to the OTEL_EXPORTER_OTLP_TRACES_ENDPOINT
+    tracing_sample_ratio: float = 1.0
+
+    # Prometheus metrics exposed by /metrics
+    metrics_enabled: bool = True
+
+    # Development and test mode catching the N+1 queries, see `metagrim_common.base.query_budget`
+    query_budget_mode: str = "off"  # off, warn or raise
+    query_budget_default: int | None = None  # Statements allowed per request of the routes without declared budget
+    query_repeat_threshold: int = 3  # Statements of the same shape run as many times per request are N+1
+
+    # Dependency probes of /readyz
+    health_cache_ttl: float = 2.0  # Seconds the probe results are reused
+    health_probe_timeout: float = 1.0  # Probe taking longer marks the dependency down
+    health_degraded_latency_ms: float = 250.0  # Probe taking longer marks the dependency degraded
+
+    # Rate limits of the login attempts, see `metagrim_common.base.rate_limit`
+    rate_limit_enabled: bool = True
+    rate_limit_login_attempts: int = 10  # Per client IP and per e-mail, at once or spread over the period
+    rate_limit_login_period: float = 60.0  # Seconds
+    rate_limit_local_size: int = 4096  # Keys tracked by the local pre-filter of each worker
+
+    # Write-behind audit trail, see `metagrim_common.service.audit`
+    audit_batch_size: int = 100  # Events written by a single executemany
+    audit_queue_size: int = 10000  # Events waiting for the writer, the recording waits beyond
+    audit_flush_interval: float = 1.0  # Seconds an incomplete batch waits for more events
+
+    # Transactional outbox relayed to the Redis Streams, see `metagrim_common.service.outbox`
+    outbox_enabled: bool = True
+    outbox_batch_size: int = 100  # Events published by a single pipeline
+    outbox_poll_interval: float = 1.0  # Seconds between the reads of the events committed by the other workers
+    outbox_stream_prefix: str = "events"  # Stream of each topic is `{prefix}:{topic}`
+    outbox_stream_maxlen: int = 100000  # Approximate number of the entries kept by each stream
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     @property
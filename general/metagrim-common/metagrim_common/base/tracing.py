@@ -0,0 +1,268 @@
+"""
+OpenTelemetry tracing of the application.
+
+Spans are recorded for the HTTP requests (`TracingMiddleware`), the unit of work, the repository calls
+(`traced`), the SQL statements (`instrument_engine`), the Redis operations and the calls to the other
+microservices. The W3C `traceparent` header of the incoming request continues its trace and is sent
+with the outgoing requests together with the `X-Request-ID` (see `outgoing_headers`).
+
+`TRACING_EXPORTER` selects where the finished spans go:
+
+* `none` (default) nothing is recorded, the tracer is the no-op one of the OpenTelemetry API,
+* `otlp` to the collector at `TRACING_OTLP_ENDPOINT`, needs `opentelemetry-exporter-otlp-proto-http`,
+* `file` as JSON lines to `TRACING_FILE`, used by the tests and for a quick look at a local run,
+* `console` to the standard output.
+
+Only `TRACING_SAMPLE_RATIO` of the new traces is sampled, the incoming sampled traces are always continued.
+"""
+import functools
+import inspect
+import json
+import logging
+import time
+import typing
+
+from metagrim_common.base.middlewares import get_request_id
+from metagrim_common.base.middlewares import REQUEST_ID_HEADER
+from opentelemetry import context
+from opentelemetry import propagate
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
+from opentelemetry.trace import Status
+from opentelemetry.trace import StatusCode
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("metagrim_common")
+
+
+class FileSpanExporter:
+    """Writes the finished spans as JSON lines to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans) -> typing.Any:
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        with open(self.path, "a") as file:
+            for span in spans:
+                file.write(json.dumps(json.loads(span.to_json()), separators=(",", ":")) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def create_exporter(settings) -> typing.Any:
+    """
+    Returns the span exporter selected by the settings, `None` if the tracing is disabled
+    :param settings:
+    :return:
+    """
+    exporter = (settings.tracing_exporter or "none").lower()
+    if exporter == "file":
+        return FileSpanExporter(settings.tracing_file)
+    if exporter == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    if exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.error("OTLP exporter is not installed, install opentelemetry-exporter-otlp-proto-http")
+            return None
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    return None
+
+
+def configure_tracing(settings) -> typing.Any:
+    """
+    Set up the tracer provider of the process, must be called before the first span is recorded
+    :param settings:
+    :return: The tracer provider, `None` if the tracing is disabled
+    """
+    exporter = create_exporter(settings)
+    if exporter is None:
+        return None
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased
+    from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.app_title, "service.version": settings.app_version}),
+            sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+        )
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+def flush_tracing() -> None:
+    """Export the spans still waiting in the batch, called on shutdown of the worker"""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "force_flush"):
+        provider.force_flush()
+
+
+def outgoing_headers(headers: typing.Dict[str, str] | None = None) -> typing.Dict[str, str]:
+    """
+    Headers propagating the current trace and request id to the other microservices
+    :param headers: Headers of the request, updated in place
+    :return:
+    """
+    headers = {} if headers is None else headers
+    propagate.inject(headers)
+    request_id = get_request_id()
+    if request_id:
+        headers[REQUEST_ID_HEADER] = request_id
+    return headers
+
+
+def traced(name: str | None = None, kind: SpanKind = SpanKind.INTERNAL):
+    """
+    Decorator recording a span around the function or method (plain or coroutine),
+    only within a sampled trace so the calls outside of the requests and the unsampled ones cost a single check
+    :param name: Name of the span, defaults to `<class>.<method>` of the called method
+    :param kind:
+    :return:
+    """
+
+    def decorator(func):
+        qualname = func.__qualname__
+
+        def span_name(args) -> str:
+            if name:
+                return name
+            if args and hasattr(args[0], func.__name__):
+                # Name after the class of the instance, e.g. the concrete repository
+                return f"{type(args[0]).__name__}.{func.__name__}"
+            return qualname
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not trace.get_current_span().is_recording():
+                    return await func(*args, **kwargs)
+                with tracer.start_as_current_span(span_name(args), kind=kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not trace.get_current_span().is_recording():
+                return func(*args, **kwargs)
+            with tracer.start_as_current_span(span_name(args), kind=kind):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine) -> None:
+    """
+    Record a span for each SQL statement run by the engine
+    :param engine: SQLAlchemy engine
+    :return:
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context_, executemany):
+        if context_ is None or not trace.get_current_span().is_recording():
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "SQL"
+        span = tracer.start_span(
+            operation,
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": engine.dialect.name, "db.statement": statement},
+        )
+        context_._tracing_span = span
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context_, executemany):
+        span = getattr(context_, "_tracing_span", None)
+        if span is not None:
+            span.end()
+            context_._tracing_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        span = getattr(exception_context.execution_context, "_tracing_span", None)
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+            exception_context.execution_context._tracing_span = None
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware recording the server span of the request, continues the trace of the caller"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {}
+        for key, value in scope["headers"]:
+            if key in (b"traceparent", b"tracestate"):
+                carrier[key.decode("latin-1")] = value.decode("latin-1")
+        parent = propagate.extract(carrier) if carrier else None
+        method = scope["method"]
+        start = time.time_ns()
+        span = tracer.start_span(method, context=parent, kind=SpanKind.SERVER, start_time=start)
+        if not span.is_recording():
+            token = context.attach(trace.set_span_in_context(span, parent))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                context.detach(token)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = context.attach(trace.set_span_in_context(span, parent))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as ex:
+            span.record_exception(ex)
+            raise
+        finally:
+            context.detach(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.update_name(f"{method} {route}")
+                span.set_attribute("http.route", route)
+            span.set_attribute("http.method", method)
+            span.set_attribute("http.target", scope.get("path", ""))
+            span.set_attribute("http.status_code", status)
+            if status >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            span.end()
@@ -1,19 +1,19 @@
 import logging
+import time
 import traceback
 import typing
 from datetime import datetime
 from datetime import timedelta
 
-import inject
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from jose import jwt
 from jose import JWTError
+from metagrim_common.base import app_context
 from metagrim_common.base import constants
+from metagrim_common.base import metrics
 from metagrim_common.base.error import ApplicationError
 from metagrim_common.base.error import BaseError
-from metagrim_common.base.error_conf import ErrorConfig
-from metagrim_common.base.settings import CoreSettings
 from metagrim_common.schema import ResponseSchema
 from passlib.context import CryptContext
 
@@ -33,8 +33,8 @@ def respond(
     :return:
     """
     logger.info(f"Generate response for Code: {code!r} or Exc:{exc!r} with Message:{message!r}")
-    error_conf = inject.instance(ErrorConfig)
-    settings = inject.instance(CoreSettings)
+    context = app_context.current
+    error_conf = context.error_config
     headers = getattr(exc, "headers", None) if exc else None
 
     if not code:
@@ -68,7 +68,7 @@ def respond(
 
     logger.info(f"{code!r} {exc!r} Respond with message: {msg}")
 
-    if settings.current_env not in ["PROD"]:
+    if not context.is_prod_env:
         description = msg.get("description", "")
         if include_trace:
             trace = traceback.format_exc()
@@ -93,11 +93,14 @@ def respond(
 
 
 def verify_password(plain_password, hashed_password):
+    start = time.perf_counter()
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except Exception as exp:
         logger.error(f"Unable to verify password {exp}", exc_info=True)
         return True
+    finally:
+        metrics.PASSWORD_VERIFY_DURATION.observe(time.perf_counter() - start)
 
 
 def get_password_hash(password):
@@ -107,10 +110,24 @@ def get_password_hash(password):
         return password
 
 
+def decode_token(token: str, config) -> dict:
+    """
+    Decodes and verifies the JWT token
+    :param token:
+    :param config: Settings with the secret key and the algorithm
+    :return: Payload of the token
+    """
+    start = time.perf_counter()
+    try:
+        return jwt.decode(token, config.shared_secret_key, algorithms=[config.algorithm])
+    finally:
+        metrics.JWT_DECODE_DURATION.observe(time.perf_counter() - start)
+
+
 def get_token_data(token, auto_error=True):
-    config = inject.instance(CoreSettings)
+    config = app_context.current.settings
     try:
-        payload = jwt.decode(token, config.shared_secret_key, algorithms=[config.algorithm])
+        payload = decode_token(token, config)
         public_id: str = payload.get("sub")
         if public_id is None:
             raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="Token is invalid")
@@ -120,21 +137,29 @@ def get_token_data(token, auto_error=True):
     return public_id
 
 
-def extract_authenticated_user(token):
-    config = inject.instance(CoreSettings)
+def extract_token_payload(token) -> dict:
+    """
+    Returns the verified payload of the access token of an authenticated user
+    :param token:
+    :return:
+    """
+    config = app_context.current.settings
     try:
-        payload = jwt.decode(token, config.shared_secret_key, algorithms=[config.algorithm])
-        public_id: str = payload.get("sub")
-        if public_id is None:
+        payload = decode_token(token, config)
+        if payload.get("sub") is None:
             raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="Token is invalid")
     except JWTError as e:
         logger.exception(f"Exception: {e}")
         raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="Access Token is invalid")
-    return public_id
+    return payload
+
+
+def extract_authenticated_user(token):
+    return extract_token_payload(token)["sub"]
 
 
 def create_access_token(data: dict, expires_delta: typing.Optional[timedelta] = None):
-    config = inject.instance(CoreSettings)
+    config = app_context.current.settings
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
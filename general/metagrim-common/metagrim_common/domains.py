@@ -6,9 +6,10 @@ from metagrim_common import enums
 from metagrim_common.base.utils import get_password_hash
 from metagrim_common.base.utils import verify_password
 from pydantic import BaseModel
-from pydantic import computed_field
+from pydantic import AliasChoices
 from pydantic import ConfigDict
 from pydantic import Field
+from pydantic import field_validator
 from pydantic import UUID4
 from typing_extensions import Literal
 from typing_extensions import TypeAlias
@@ -23,7 +24,7 @@ logger = getLogger(__name__)
 class BaseDomain(BaseModel):
     @property
     def protected_fields(self) -> typing.List[str]:
-        return ["id"]
+        return ["id", "version"]
 
     @property
     def special_fields(self) -> typing.List[str]:
@@ -34,6 +35,8 @@ class BaseDomain(BaseModel):
         return []
 
     id: UUID4 | None = None
+    # Version of the record the domain is read from, see `CoreModel.version`
+    version: int | None = None
 
     @staticmethod
     def _check_field(obj_: typing.Any, field_: str):
@@ -255,9 +258,25 @@ class User(BaseDomain):
     first_name: str | None = Field(default=None)
     last_name: str | None = Field(default=None)
     status: enums.UserStatusEnum = Field(default=enums.UserStatusEnum.inactive)
+    # Read from the `actions` relationship of the model, eager loaded by the user repository
+    user_actions: typing.List[str] = Field(
+        default_factory=list, validation_alias=AliasChoices("user_actions", "actions")
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
+    @field_validator("user_actions", mode="before")
+    @classmethod
+    def _action_names(cls, value: typing.Any) -> typing.Any:
+        actions = set()
+        for action in value or ():
+            if isinstance(action, str):
+                actions.add(action)
+            elif not action.is_deleted:
+                # `UserActionModel` loaded through the relationship
+                actions.add(action.action)
+        return sorted(actions)
+
     @property
     def related_fields(self) -> typing.List[str]:
         return ["user_actions", "actions"]
@@ -268,11 +287,6 @@ class User(BaseDomain):
         result.extend([])
         return result
 
-    @computed_field
-    @property
-    def user_actions(self) -> typing.List[str]:
-        return ["*"]
-
 
 class UserDb(User):
     password_hash: str = None
@@ -310,3 +324,4 @@ class SearchRangeFilterParameters(BaseDomain):
 
 class UserSearchPaginatedParameters(SearchPaginatedParameters):
     user_type: typing.Optional[enums.UserTypeEnum] = None
+    status: typing.Optional[enums.UserStatusEnum] = None
@@ -25,6 +25,29 @@ class OrderEnum(str, enum.Enum):
     asc: str = "ASC"
 
 
+class ExportFormatEnum(str, enum.Enum):
+    ndjson: str = "ndjson"
+    csv: str = "csv"
+
+
+class UserExportOrderEnum(str, enum.Enum):
+    # Columns of the user export the records can be sorted by
+    id: str = "id"
+    email: str = "email"
+    mobile: str = "mobile"
+    user_type: str = "user_type"
+    first_name: str = "first_name"
+    last_name: str = "last_name"
+    status: str = "status"
+    created_at: str = "created_at"
+
+
+class HealthStatusEnum(str, enum.Enum):
+    ok: str = "OK"
+    degraded: str = "DEGRADED"
+    down: str = "DOWN"
+
+
 class SearchFieldOperatorEnum(str, enum.Enum):
     between: str = "BETWEEN"
     gt: str = ">"
@@ -33,3 +56,31 @@ class SearchFieldOperatorEnum(str, enum.Enum):
     ne: str = "!="
     gteq: str = ">="
     lteq: str = "<="
+
+
+class UserActionEnum(str, enum.Enum):
+    # Position of the member is its bit in the access token scopes (see `metagrim_common.base.scopes`),
+    # new actions must only be appended
+    user_list: str = "USER_LIST"
+    user_read: str = "USER_READ"
+    user_create: str = "USER_CREATE"
+    user_update: str = "USER_UPDATE"
+    user_delete: str = "USER_DELETE"
+    user_export: str = "USER_EXPORT"
+
+
+class AuditEventEnum(str, enum.Enum):
+    login: str = "LOGIN"
+    login_failed: str = "LOGIN_FAILED"
+    logout: str = "LOGOUT"
+    user_created: str = "USER_CREATED"
+    user_updated: str = "USER_UPDATED"
+    user_status_changed: str = "USER_STATUS_CHANGED"
+    user_deleted: str = "USER_DELETED"
+
+
+class UserEventEnum(str, enum.Enum):
+    created: str = "USER_CREATED"
+    updated: str = "USER_UPDATED"
+    status_changed: str = "USER_STATUS_CHANGED"
+    deleted: str = "USER_DELETED"
@@ -1,2 +1,4 @@
 from .user import UserModel
 from .user_actions import UserActionModel
+from .audit import AuditLogModel
+from .outbox import OutboxEventModel
@@ -0,0 +1,18 @@
+from metagrim_common.model.base import Base
+from metagrim_common.model.base import CoreModel
+from sqlalchemy import Column
+from sqlalchemy import Index
+from sqlalchemy import JSON
+from sqlalchemy import String
+
+
+class AuditLogModel(CoreModel, Base):
+    """Audit trail, `created_by` is the user who did the action and `created_at` when it happened"""
+
+    event = Column(String(64), nullable=False)
+    # Record the action is done on, e.g. the created user
+    entity_id = Column(String(36))
+    request_id = Column(String(128))
+    data = Column(JSON)
+
+    __table_args__ = (Index("ix_demo_audit_log_entity_id_created_at", "entity_id", "created_at"),)
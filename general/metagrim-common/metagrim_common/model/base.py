@@ -1,5 +1,5 @@
 import re
-from functools import lru_cache
+import typing
 from uuid import uuid4
 
 from metagrim_common.model.types import UUID
@@ -7,6 +7,7 @@ from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import DateTime
 from sqlalchemy import func
+from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import TIMESTAMP
 from sqlalchemy.orm import as_declarative
@@ -20,15 +21,61 @@ class CoreModel:
     is_deleted = Column(Boolean(), default=False)
     created_by = Column(String(36))
     modified_by = Column(String(36))
+    # Optimistic concurrency, bumped by each update, see `SqlAlchemyRepository.update_version`
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Column names of the model class, built once per class on the first use
+    # as `__table__` is not available yet while the class is being created
+    _columns: typing.Tuple[str, ...] | None = None
+    _column_set: typing.FrozenSet[str] | None = None
+    _updatable_column_set: typing.FrozenSet[str] | None = None
+
+    @declared_attr
+    def __mapper_args__(cls) -> typing.Dict[str, typing.Any]:
+        # Flushes of the loaded records check the version they were read with
+        return {"version_id_col": cls.version}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Do not share the columns of the parent class
+        cls._columns = None
+        cls._column_set = None
+        cls._updatable_column_set = None
+
+    @classmethod
+    def _build_columns(cls) -> None:
+        cls._columns = tuple(column.name for column in cls.__table__.columns)
+        cls._column_set = frozenset(cls._columns)
+        cls._updatable_column_set = frozenset(
+            column.name for column in cls.__table__.columns if not column.primary_key
+        )
+
+    @classmethod
+    def get_columns(cls) -> typing.Tuple[str, ...]:
+        if cls._columns is None:
+            cls._build_columns()
+        return cls._columns
+
+    @classmethod
+    def get_column_set(cls, updatable: bool = False) -> typing.FrozenSet[str]:
+        """
+        Returns the column names as set
+        :param updatable: bool: If True then primary key columns are excluded
+        :return:
+        """
+        if cls._column_set is None:
+            cls._build_columns()
+        return cls._updatable_column_set if updatable else cls._column_set
 
     @classmethod
-    @lru_cache(maxsize=1)
-    def get_columns(cls):
-        columns = []
-        for column in cls.__table__.columns:
-            name = f"{column}".split(".")[-1]
-            columns.append(name)
-        return columns
+    def project(cls, values: typing.Dict[str, typing.Any], updatable: bool = False) -> typing.Dict[str, typing.Any]:
+        """
+        Keep only the values of the mapped columns
+        :param values: dict:
+        :param updatable: bool: If True then primary key columns are dropped
+        :return:
+        """
+        return {key: values[key] for key in values.keys() & cls.get_column_set(updatable=updatable)}
 
 
 @as_declarative()
@@ -0,0 +1,18 @@
+from metagrim_common.model.base import Base
+from metagrim_common.model.base import CoreModel
+from sqlalchemy import Column
+from sqlalchemy import Index
+from sqlalchemy import JSON
+from sqlalchemy import String
+
+
+class OutboxEventModel(CoreModel, Base):
+    """Event written with the changes of its transaction, deleted once published (see `OutboxRelay`)"""
+
+    topic = Column(String(64), nullable=False)
+    event = Column(String(64), nullable=False)
+    entity_id = Column(String(36))
+    payload = Column(JSON)
+
+    # Relay reads the oldest events first
+    __table_args__ = (Index("ix_demo_outbox_event_created_at", "created_at"),)
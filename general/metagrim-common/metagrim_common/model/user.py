@@ -3,6 +3,8 @@ from metagrim_common.base.utils import verify_password
 from metagrim_common.model.base import Base
 from metagrim_common.model.base import CoreModel
 from sqlalchemy import Column
+from sqlalchemy import false
+from sqlalchemy import Index
 from sqlalchemy import String
 
 
@@ -38,3 +40,21 @@ class UserModel(CoreModel, Base):
             if value:
                 data.append(value)
         return " ".join(data) if data else None
+
+
+# Partial indexes of the live (not soft deleted) users, used by the listing and lookups
+_active_user = UserModel.is_deleted == false()
+Index(
+    "ix_demo_user_active_created_at_id",
+    UserModel.created_at,
+    UserModel.id,
+    postgresql_where=_active_user,
+    sqlite_where=_active_user,
+)
+Index(
+    "ix_demo_user_active_type_status",
+    UserModel.user_type,
+    UserModel.status,
+    postgresql_where=_active_user,
+    sqlite_where=_active_user,
+)
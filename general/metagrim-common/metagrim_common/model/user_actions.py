@@ -8,7 +8,7 @@ from sqlalchemy.orm import relationship
 
 
 class UserActionModel(CoreModel, Base):
-    user_id = Column(ForeignKey(UserModel.id))
+    user_id = Column(ForeignKey(UserModel.id), index=True)
     action = Column(String(255))
 
     user = relationship(UserModel, backref="actions")
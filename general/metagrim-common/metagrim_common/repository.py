@@ -1,42 +1,98 @@
+import logging
 import typing
+import uuid
 
 import inject
 from auth_service import constants
 from metagrim_common.adapter.base import AbstractRepository
 from metagrim_common.adapter.base import BaseBackend
 from metagrim_common.adapter.base import SqlAlchemyRepository
-from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base import app_context
+from metagrim_common.base.context_vars import get_identity_map
+from metagrim_common.base.tracing import traced
 from metagrim_common.enums import UserStatusEnum
 from metagrim_common.model import UserActionModel
 from metagrim_common.model import UserModel
 from metagrim_common.model.base import CoreModel
 from metagrim_common.model.types.uuid import UUID
 from pydantic import UUID4
+from sqlalchemy import bindparam
+from sqlalchemy import case
+from sqlalchemy import false
 from sqlalchemy import func
 from sqlalchemy import or_
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+# Statements of the hot lookups are built once with bound parameters,
+# so every call hits the SQL compilation cache with the same cache key
+_find_user_by_email = select(UserModel).where(UserModel.email == bindparam("email")).limit(1)
+_user_status = select(UserModel.status).where(UserModel.id == bindparam("user_id")).limit(1)
+_user_info = (
+    select(UserModel.id, UserModel.first_name, UserModel.last_name).where(UserModel.id == bindparam("user_id")).limit(1)
+)
+_user_actions = select(UserActionModel.action).where(
+    UserActionModel.user_id == bindparam("user_id"), UserActionModel.is_deleted == false()
+)
+# Variants of the user exists statement keyed by the given (email, mobile, id_) criteria
+_user_exists: typing.Dict[typing.Tuple[bool, bool, bool], typing.Any] = {}
+
+
+def _user_exists_statement(email: bool, mobile: bool, id_: bool):
+    key = (email, mobile, id_)
+    statement = _user_exists.get(key)
+    if statement is None:
+        statement = select(func.count(UserModel.id))
+        if mobile and email:
+            statement = statement.where(
+                or_(UserModel.mobile == bindparam("mobile"), UserModel.email == bindparam("email"))
+            )
+        elif mobile:
+            statement = statement.where(UserModel.mobile == bindparam("mobile"))
+        elif email:
+            statement = statement.where(UserModel.email == bindparam("email"))
+        if id_:
+            statement = statement.where(UserModel.id != bindparam("id_"))
+        _user_exists[key] = statement
+    return statement
+
+
+def prime_statements(session) -> None:
+    """
+    Run the hot lookups once for a missing user, so the first requests find them in the compilation cache
+    :param session:
+    :return:
+    """
+    missing = uuid.UUID(int=0)
+    session.execute(_find_user_by_email, {"email": ""}).first()
+    session.execute(_user_status, {"user_id": missing}).first()
+    session.execute(_user_info, {"user_id": missing}).first()
 
 
 class UserSqlAlchemyRepository(SqlAlchemyRepository):
     model: typing.Type[UserModel] = UserModel
     search_fields = [UserModel.first_name, UserModel.last_name, UserModel.email]
+    indexes = ("ix_demo_user_active_created_at_id", "ix_demo_user_active_type_status")
+    # Domain carries the actions of the user, loaded for all the records of a read in one statement
+    eager_load = ("actions",)
 
+    @traced()
     async def find_by_email(self, email):
-        return self.session.query(self.model).filter_by(email=email).first()
+        record = self.session.execute(_find_user_by_email, {"email": email}).scalars().first()
+        identity_map = get_identity_map()
+        if record is not None and identity_map is not None and not record.is_deleted:
+            # Later reads of the same user by id within this request are served from identity map
+            identity_map.add(self.model, record.id, record)
+        return record
 
+    @traced()
     async def check_user_exists(self, email: str = None, mobile: str = None, id_: UUID | None = None) -> bool:
-        query = self.session.query(func.count(self.model.id))
-        if mobile and email:
-            query = query.filter(or_(self.model.mobile == mobile, self.model.email == email))
-        else:
-            if mobile:
-                query = query.filter_by(mobile=mobile)
-            if email:
-                query = query.filter_by(email=email)
-        if id_:
-            query = query.filter(self.model.id != id_)
-        rec = query.scalar()
+        statement = _user_exists_statement(bool(email), bool(mobile), bool(id_))
+        rec = self.session.execute(statement, {"email": email, "mobile": mobile, "id_": id_}).scalar()
         return bool(rec)
 
+    @traced()
     async def filter_users_by_user_type(self, user_type: str = None) -> list:
         query = self.session.query(
             self.model.id, self.model.first_name, self.model.last_name, self.model.user_type, self.model.status
@@ -58,27 +114,113 @@ class UserSqlAlchemyRepository(SqlAlchemyRepository):
             for user in rec
         ]
 
+    @traced()
     async def is_user_active(self, user_id: UUID4 = None) -> bool:
         user_status = False
-        query = self.session.query(self.model.id, self.model.status)
         if user_id:
-            ticket_agent_rec = query.filter(self.model.id == user_id).first()
-            if ticket_agent_rec.status == UserStatusEnum.active:
+            status = self.session.execute(_user_status, {"user_id": user_id}).scalar()
+            if status == UserStatusEnum.active:
                 user_status = True
         return user_status
 
+    @traced()
+    async def toggle_status(
+        self, user_id: UUID4, projection: typing.Sequence[str] | None = None
+    ) -> typing.Dict[str, typing.Any] | None:
+        """
+        Switch the status of the live user from active to inactive and back, without reading it first
+        :param user_id:
+        :param projection: Column names to return, all the columns by default
+        :return: Updated columns of the user, `None` if there is no such live user
+        """
+        active, inactive = UserStatusEnum.active.value, UserStatusEnum.inactive.value
+        status = case((self.model.status == active, inactive), else_=active)
+        return await self.update_returning(user_id, {"status": status}, projection=projection)
+
+    @traced()
     async def get_user_info(self, user_id: UUID4 = None) -> dict:
         user = {}
-        query = self.session.query(self.model.id, self.model.first_name, self.model.last_name)
         if user_id:
-            rec = query.filter(self.model.id == user_id)
-            user = rec.first()
+            user = self.session.execute(_user_info, {"user_id": user_id}).first()
         return user
 
 
 class UserActionsSqlAlchemyRepository(SqlAlchemyRepository):
     model: typing.Type[UserActionModel] = UserActionModel
     search_fields = []
+    indexes = ("ix_demo_user_action_user_id",)
+
+    def __init__(self, session, cache: "UserActionsRedisRepository | None" = None):
+        """
+        :param session:
+        :param cache: Action sets of the users, the process wide one is resolved from the injector if not given
+        """
+        super(UserActionsSqlAlchemyRepository, self).__init__(session)
+        self.cache = cache if cache is not None else inject.instance(UserActionsRedisRepository)
+
+    @traced()
+    async def get_actions(self, user_id: UUID) -> typing.List[str]:
+        """
+        Returns the actions of the user, served from the Redis cache when present
+        :param user_id:
+        :return:
+        """
+        key = str(user_id)
+        version = None
+        try:
+            actions, version = self.cache.get_actions(key)
+            if actions is not None:
+                return actions
+        except Exception as ex:
+            # Cache is an optimisation only, fallback to the database
+            logger.warning(f"Unable to read actions of user {key} from cache: {ex}")
+
+        actions = await self.load_actions(user_id)
+        if version is None:
+            return actions
+        try:
+            # Stamp with the version read before loading, a change committed meanwhile makes this entry unusable
+            self.cache.set_actions(key, actions, version)
+        except Exception as ex:
+            logger.warning(f"Unable to write actions of user {key} to cache: {ex}")
+        return actions
+
+    @traced()
+    async def load_actions(self, user_id: UUID) -> typing.List[str]:
+        """
+        Returns the actions of the user read from the database, used by the changes of the actions
+        :param user_id:
+        :return:
+        """
+        return sorted(set(self.session.execute(_user_actions, {"user_id": user_id}).scalars()))
+
+    @traced()
+    async def get_actions_by_users(self, user_ids: typing.Iterable[UUID]) -> typing.Dict[str, typing.List[str]]:
+        """
+        Returns the actions of the given users read with a single statement, used for the pages of users
+        :param user_ids:
+        :return: Actions keyed by the user id as string, every given user is present
+        """
+        user_ids = list(user_ids)
+        actions = {str(user_id): set() for user_id in user_ids}
+        if user_ids:
+            rows = self.session.query(self.model.user_id, self.model.action).filter(
+                self.model.user_id.in_(user_ids), self.model.is_deleted == false()
+            )
+            for user_id, action in rows:
+                actions[str(user_id)].add(action)
+        return {user_id: sorted(names) for user_id, names in actions.items()}
+
+    def invalidate(self, user_id: UUID) -> None:
+        """
+        Drop the cached actions of the user, must be called again after the change is committed
+        :param user_id:
+        :return:
+        """
+        try:
+            self.cache.invalidate(str(user_id))
+        except Exception as ex:
+            logger.error(f"Unable to invalidate actions of user {user_id} in cache: {ex}")
 
     async def add_user_action(self, user_id: UUID, actions: typing.List[str]):
         for action in actions:
@@ -86,9 +228,11 @@ class UserActionsSqlAlchemyRepository(SqlAlchemyRepository):
             model.user_id = user_id
             model.action = action
             await self.add(model)
+        self.invalidate(user_id)
 
     async def remove_user_action(self, user_id: UUID, actions: typing.List[str]):
         self.session.query(self.model).filter(self.model.user_id == user_id, self.model.action.in_(actions)).delete()
+        self.invalidate(user_id)
 
 
 class RedisRepository(AbstractRepository):
@@ -118,7 +262,7 @@ class RedisRepository(AbstractRepository):
 
 class TokenRedisRepository(RedisRepository):
     def __init__(self, *args, **kwargs):
-        settings = inject.instance(CoreSettings)
+        settings = app_context.current.settings
         self.token_time_exp = settings.access_token_expire_minutes * 60
         super(TokenRedisRepository, self).__init__(*args, **kwargs)
 
@@ -130,3 +274,93 @@ class TokenRedisRepository(RedisRepository):
 
     def delete(self, uuid):
         self.backend.delete(uuid)
+
+
+class UserCacheRedisRepository(RedisRepository):
+    """Keeps the serialized user domains along with their version stamps"""
+
+    key_prefix: str = "user-cache"
+
+    def __init__(self, *args, **kwargs):
+        settings = app_context.current.settings
+        self.ttl = settings.user_cache_ttl
+        super(UserCacheRedisRepository, self).__init__(*args, **kwargs)
+
+    def _data_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    def _version_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}:version"
+
+    def get_entry(self, user_id) -> typing.Tuple[typing.Optional[dict], int]:
+        """
+        Returns the cached entry and the current version of the user in a single round trip
+        :param user_id:
+        :return: (entry, version)
+        """
+        entry, version = self.backend.mget(self._data_key(user_id), self._version_key(user_id))
+        return (entry if isinstance(entry, dict) else None), int(version or 0)
+
+    def get_version(self, user_id) -> int:
+        """
+        Returns the current version of the user
+        :param user_id:
+        :return:
+        """
+        return int(self.backend.get_str(self._version_key(user_id)) or 0)
+
+    def set_entry(self, user_id, data: dict, version: int):
+        self._add(self._data_key(user_id), {"version": version, "data": data}, ex=self.ttl)
+
+    def bump_version(self, user_id) -> int:
+        """
+        Invalidates the cached entry, entries written with an older version are never served again
+        :param user_id:
+        :return: New version
+        """
+        version = self.backend.incr(self._version_key(user_id))
+        self.backend.delete(self._data_key(user_id))
+        return version
+
+
+class UserActionsRedisRepository(RedisRepository):
+    """Keeps the action sets of the users, read on every login"""
+
+    key_prefix: str = "user-actions"
+
+    def __init__(self, *args, **kwargs):
+        settings = app_context.current.settings
+        self.ttl = settings.user_cache_ttl
+        super(UserActionsRedisRepository, self).__init__(*args, **kwargs)
+
+    def _data_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    def _version_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}:version"
+
+    def get_actions(self, user_id) -> typing.Tuple[typing.Optional[typing.List[str]], int]:
+        """
+        Returns the cached actions and the current version of the user in a single round trip
+        :param user_id:
+        :return: (actions, version), actions are `None` if not cached with the current version
+        """
+        # Kept in a dictionary, the backend does not tell the missing list from the empty one
+        entry, version = self.backend.mget(self._data_key(user_id), self._version_key(user_id))
+        version = int(version or 0)
+        if isinstance(entry, dict) and entry.get("version") == version:
+            return entry.get("actions"), version
+        return None, version
+
+    def set_actions(self, user_id, actions: typing.List[str], version: int):
+        self._add(self._data_key(user_id), {"version": version, "actions": list(actions)}, ex=self.ttl)
+
+    def invalidate(self, user_id) -> int:
+        """
+        Drops the cached actions, the actions written with an older version are never served again
+        :param user_id:
+        :return: New version
+        """
+        version = self.backend.incr(self._version_key(user_id))
+        self.backend.delete(self._data_key(user_id))
+        return version
@@ -1,12 +1,16 @@
+import functools
 import typing
 from datetime import date
+from datetime import datetime
 from enum import Enum
 
-import inject
 from fastapi import Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.security.oauth2 import get_authorization_scheme_param
-from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base import app_context
+from metagrim_common.base.scopes import ActionSet
+from metagrim_common.base.scopes import parse_scopes
+from metagrim_common.enums import HealthStatusEnum
 from metagrim_common.enums import OrderEnum
 from metagrim_common.enums import SearchFieldOperatorEnum
 from pydantic import BaseModel
@@ -20,24 +24,26 @@ class JWTBase(BaseModel):
 
     scopes: typing.List[str] = Field(default_factory=list)
 
-    @property
+    @functools.cached_property
+    def granted_actions(self) -> ActionSet:
+        """Actions of the scopes, parsed once per token for the authorization checks"""
+        return parse_scopes(self.scopes or [])
+
+    @functools.cached_property
     def computed_actions(self) -> typing.List[str]:
         """Retrieve a computed list of a actions allowed within the token.
 
-        The scopes field inside contains the roles that have been assigned to the user on
-        a per organisation and tenant basis. This method will extract all roles and strip
-        the organisation and tenant information returning a list of strings of the actual
-        roles the user has. This information allows us to check whether the user is allowed
-        to access certain endpoints as part of our Token Authentication dependency injection
-        code.
+        The scopes field inside contains the actions that have been assigned to the user, the actions registered
+        in `UserActionEnum` are packed into a single bitmask scope (see `metagrim_common.base.scopes`) which is
+        expanded here. This information allows us to check whether the user is allowed to access certain
+        endpoints as part of our Token Authentication dependency injection code.
 
         Example data inside the token:
-         - public_event_recon_list
-         - public_event_recon
+         - mask:3
          - master_data
 
         This method will extract this data and return it as:
-        - ["public_event_recon_list", "public_event_recon", "master_data]
+        - ["USER_LIST", "USER_READ", "master_data"]
 
         Args:
             N/A
@@ -45,7 +51,7 @@ class JWTBase(BaseModel):
         Returns:
             roles: list of a strings containing the actions accessible to the user.
         """
-        return list(set(self.scopes or []))
+        return self.granted_actions.names()
 
 
 class JWTUser(JWTBase):
@@ -71,6 +77,22 @@ class ApiInfoSchema(BaseModel):
     message: str = Field(..., title="Message", description="Welcome message")
 
 
+class DependencyHealthSchema(BaseModel):
+    name: str = Field(..., title="Name", description="Name of the dependency")
+    status: HealthStatusEnum = Field(..., title="Status", description="Result of the probe")
+    critical: bool = Field(default=True, title="Critical", description="Worker is not ready without it")
+    latency_ms: float = Field(..., title="Latency", description="Duration of the probe in milliseconds")
+    error: str | None = Field(default=None, title="Error", description="Why the probe failed")
+    details: dict | None = Field(default=None, title="Details", description="Details reported by the probe")
+
+
+class HealthSchema(BaseModel):
+    status: HealthStatusEnum = Field(..., title="Status", description="Overall status of the worker")
+    ready: bool = Field(..., title="Ready", description="Worker finished the warmup")
+    checked_at: datetime | None = Field(default=None, title="Checked at", description="Time of the probes")
+    dependencies: typing.List[DependencyHealthSchema] = Field(default_factory=list, title="Dependencies")
+
+
 class ResponseSchema(BaseModel):
     response_code: int = Field(..., title="Response Code", description="Unique response " "code specific to error")
     response_type: ResponseType = Field(None, title="Response Type", description="Response type")
@@ -86,8 +108,7 @@ class ResponseSchema(BaseModel):
 
     def __init__(self, **kwargs):
         super(ResponseSchema, self).__init__(**kwargs)
-        settings = inject.instance(CoreSettings)
-        if settings.current_env == "PROD":
+        if app_context.current.is_prod_env:
             self.description = None
 
 
@@ -97,7 +118,7 @@ class BaseRequestSchema(BaseModel):
 
 class AuthenticationSchema(OAuth2PasswordBearer):
     def __init__(self, **kwargs):
-        config = inject.instance(CoreSettings)
+        config = app_context.current.settings
         super(AuthenticationSchema, self).__init__(tokenUrl=config.token_url, **kwargs)
 
     async def __call__(self, request: Request) -> typing.Optional[str]:
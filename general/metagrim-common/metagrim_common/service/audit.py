@@ -0,0 +1,174 @@
+"""
+Write-behind audit trail.
+
+The services record the audit events (login, logout, user changes, ...) without waiting for the database::
+
+    await self.uow.audit.record(AuditEventEnum.user_created, entity_id=user.id, email=user.email)
+
+The events are put into a bounded in-process queue, with the current user and request id of the context, and a
+background task of the worker writes them in batches of `AUDIT_BATCH_SIZE` with a single `executemany`. A batch is
+written when it is full or `AUDIT_FLUSH_INTERVAL` seconds after its first event. When the queue is full the
+recording waits for the writer, so a slow database slows down the requests instead of growing the memory.
+
+The task is started and stopped with the application lifespan, the events still queued on shutdown are written
+before the worker exits. Without the task (scripts, tests) the events are written by `record` once a batch is full
+and by `flush`.
+"""
+import asyncio
+import contextlib
+import dataclasses
+import datetime
+import logging
+import typing
+
+import inject
+from metagrim_common.base import metrics
+from metagrim_common.base.context_vars import get_current_user_uuid
+from metagrim_common.base.middlewares import get_request_id
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.model import AuditLogModel
+from sqlalchemy import insert
+from sqlalchemy.orm.session import Session
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Put by `stop` behind the recorded events
+_STOP = object()
+
+
+@dataclasses.dataclass(frozen=True)
+class AuditEvent:
+    event: str
+    entity_id: str | None
+    actor_id: str | None
+    request_id: str | None
+    data: typing.Dict[str, typing.Any]
+    created_at: datetime.datetime
+
+    def row(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "event": self.event,
+            "entity_id": self.entity_id,
+            "request_id": self.request_id,
+            "data": self.data,
+            "created_at": self.created_at,
+            "created_by": self.actor_id,
+            "modified_by": self.actor_id,
+            "is_deleted": False,
+        }
+
+
+class AuditTrail:
+    """Process wide queue of the audit events and their background writer"""
+
+    @inject.autoparams("config")
+    def __init__(self, config: CoreSettings, session_factory: typing.Callable[[], Session] | None = None):
+        self.session_factory = session_factory or (lambda: inject.instance(Session))
+        self.batch_size = config.audit_batch_size
+        self.max_size = config.audit_queue_size
+        self.flush_interval = config.audit_flush_interval
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._batch_ready: asyncio.Event | None = None
+        # Events recorded while the writer is not running
+        self._pending: typing.List[AuditEvent] = []
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def record(self, event: str, entity_id: typing.Any = None, actor_id: typing.Any = None, **data) -> None:
+        """
+        Queue the audit event, waits only when the queue is full
+        :param event: Name of the event, see `AuditEventEnum`
+        :param entity_id: Record the action is done on
+        :param actor_id: User who did the action, the current user by default
+        :param data: Details of the event, JSON serializable
+        :return:
+        """
+        actor_id = actor_id or get_current_user_uuid()
+        audit_event = AuditEvent(
+            event=getattr(event, "value", event),
+            entity_id=str(entity_id) if entity_id is not None else None,
+            actor_id=str(actor_id) if actor_id is not None else None,
+            request_id=get_request_id(),
+            data=data,
+            created_at=datetime.datetime.utcnow(),
+        )
+        if not self.running:
+            self._pending.append(audit_event)
+            if len(self._pending) >= self.batch_size:
+                await self.flush()
+            return
+
+        await self._queue.put(audit_event)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    async def flush(self) -> int:
+        """
+        Write the events recorded while the writer is not running
+        :return: Number of the written events
+        """
+        batch, self._pending = self._pending, []
+        await self._write(batch)
+        return len(batch)
+
+    async def start(self) -> None:
+        """Start the writer on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._batch_ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Write the queued events and stop the writer"""
+        if self.running:
+            await self._queue.put(_STOP)
+            self._batch_ready.set()
+            await self._task
+            # Recorded while the writer was stopping
+            while not self._queue.empty():
+                self._pending.append(self._queue.get_nowait())
+        self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is not _STOP and self._queue.qsize() + 1 < self.batch_size:
+                # Let the batch fill up
+                self._batch_ready.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if _STOP in batch:
+                stopping = True
+                batch.remove(_STOP)
+            await self._write(batch)
+
+    async def _write(self, batch: typing.List[AuditEvent]) -> None:
+        if not batch:
+            return
+        try:
+            await run_in_threadpool(self._insert, [audit_event.row() for audit_event in batch])
+        except Exception as ex:
+            metrics.AUDIT_EVENTS_FAILED.inc(len(batch))
+            logger.error(f"Unable to write {len(batch)} audit events: {ex}", exc_info=True)
+        else:
+            metrics.AUDIT_EVENTS_WRITTEN.inc(len(batch))
+
+    def _insert(self, rows: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        session = self.session_factory()
+        try:
+            # List of parameters, sent with executemany
+            session.execute(insert(AuditLogModel.__table__), rows)
+            session.commit()
+        finally:
+            session.close()
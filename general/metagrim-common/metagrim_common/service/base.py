@@ -1,15 +1,15 @@
-from metagrim_common.base.context_vars import reset_current_user_uuid
-from metagrim_common.base.context_vars import set_current_user_uuid
 from metagrim_common.service.unit_of_work import AbstractUnitOfWork
 
 
 class BaseService:
+    """
+    Base of the services, the user of the request is given by the dependency building the service.
+    The audit fields are filled from the current user context (see `metagrim_common.base.context_vars.current_user`)
+    entered by the authentication dependency, the services do not set it.
+    """
+
     current_user_id: str = None
     uow: AbstractUnitOfWork = None
 
     def __init__(self, current_user_id: str = None):
         self.current_user_id = current_user_id
-        self._ctx_token = set_current_user_uuid(current_user_id)
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        reset_current_user_uuid(self._ctx_token)
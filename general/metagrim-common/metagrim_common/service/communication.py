@@ -11,6 +11,9 @@ import aiohttp
 import inject
 from metagrim_common.base.error import ApplicationError
 from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base.tracing import outgoing_headers
+from metagrim_common.base.tracing import traced
+from opentelemetry.trace import SpanKind
 from pydantic import UUID4
 
 
@@ -25,13 +28,31 @@ class ServiceCommunication:
         self.config = config
         self.logger = logger_ or logger
 
+    @traced("service_communication.probe", kind=SpanKind.CLIENT)
+    async def probe(self, base_url: str | None = None, path: str = "/livez") -> dict:
+        """
+        Checks the other microservice responds, used by the readiness probes
+        :param base_url: Defaults to the event service
+        :param path:
+        :return:
+        """
+        url = f"{base_url or self.config.event_service_base_url}{path}"
+        timeout = aiohttp.ClientTimeout(total=self.config.requests_timeout)  # type: ignore[attr-defined]
+        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:  # type: ignore[attr-defined]
+            async with session.get(url=url, headers=outgoing_headers()) as r:
+                if r.status >= 500:
+                    raise ApplicationError(503, message=f"{url} responded with {r.status}")
+        return {"status_code": r.status}
+
+    @traced("service_communication.get_event_data", kind=SpanKind.CLIENT)
     async def get_event_data(
         self,
         event_uuid: UUID4,
     ) -> str | None:
         # Prepare the URL
         url = f"{self.config.event_service_base_url}/fareharbor/{event_uuid}"
-        headers = {}
+        # Continue the trace of the current request in the other microservice
+        headers = outgoing_headers()
         response = {}
         try:
             # Generate and forward the HTTP request
@@ -60,11 +81,13 @@ class ServiceCommunication:
             raise e
         return response
 
+    @traced("service_communication.delete_event", kind=SpanKind.CLIENT)
     async def delete_event(self, event_uuid: UUID4) -> bool:
 
         # Prepare the URL
         url = f"{self.config.event_service_base_url}/fareharbor/{event_uuid}"
-        headers = {}
+        # Continue the trace of the current request in the other microservice
+        headers = outgoing_headers()
         try:
             # Generate and forward the HTTP request
             self.logger.info(f"Deleting event {url}")
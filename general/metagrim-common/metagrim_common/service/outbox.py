@@ -0,0 +1,270 @@
+"""
+Transactional outbox.
+
+The services publish the domain events through their unit of work, before the commit::
+
+    self.uow.publish("user", UserEventEnum.created, entity_id=user.id, email=user.email)
+    self.uow.commit()
+
+The event is added to the session as an `OutboxEventModel` row, so it is written by the transaction of the changes
+and discarded with them by a rollback. The relay of each worker reads the committed events in batches of
+`OUTBOX_BATCH_SIZE`, appends them to the Redis Stream `{OUTBOX_STREAM_PREFIX}:{topic}` with a single pipeline and
+deletes them. The rows are locked with `SKIP LOCKED`, the relays of the workers share the events instead of
+publishing them twice.
+
+Delivery is at least once: the events appended but not deleted, e.g. when the database fails after the pipeline,
+are published again by the next read. The consumers use the event id to drop the duplicates.
+
+The relay is woken up by the commits of its own worker and reads every `OUTBOX_POLL_INTERVAL` seconds for the events
+committed by the other workers. It is started and stopped with the application lifespan, the events still in the
+table on shutdown are published by the next relay. The other services read the streams with `EventConsumer`.
+"""
+import asyncio
+import contextlib
+import dataclasses
+import json
+import logging
+import os
+import socket
+import typing
+
+import inject
+from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.base import metrics
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.model import OutboxEventModel
+from sqlalchemy import delete
+from sqlalchemy import select
+from sqlalchemy.orm.session import Session
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+def stream_name(config: CoreSettings, topic: str) -> str:
+    return f"{config.outbox_stream_prefix}:{topic}"
+
+
+def notify() -> None:
+    """Wake up the running relays of the process, called once the events are committed"""
+    for relay in list(OutboxRelay.running_relays):
+        relay.wake()
+
+
+@dataclasses.dataclass(frozen=True)
+class StreamEvent:
+    """Event read from a stream, `message_id` is the id of the stream entry and `id` of the outbox event"""
+
+    stream: str
+    message_id: str
+    id: str
+    event: str
+    entity_id: str | None
+    payload: typing.Dict[str, typing.Any]
+    created_at: str
+
+    @classmethod
+    def from_entry(cls, stream: typing.Any, message_id: typing.Any, fields: dict) -> "StreamEvent":
+        fields = {_text(key): _text(value) for key, value in fields.items()}
+        return cls(
+            stream=_text(stream),
+            message_id=_text(message_id),
+            id=fields["id"],
+            event=fields["event"],
+            entity_id=fields.get("entity_id") or None,
+            payload=json.loads(fields.get("payload") or "{}"),
+            created_at=fields.get("created_at", ""),
+        )
+
+
+def _text(value: typing.Any) -> str:
+    return value.decode("utf-8") if type(value) in [bytes, bytearray] else str(value)
+
+
+def _entry(row: typing.Mapping[str, typing.Any]) -> typing.Dict[str, str]:
+    # Stream fields are strings, the missing ones are sent empty
+    return {
+        "id": str(row["id"]),
+        "event": row["event"],
+        "entity_id": row["entity_id"] or "",
+        "payload": json.dumps(row["payload"] or {}),
+        "created_at": row["created_at"].isoformat() if row["created_at"] else "",
+    }
+
+
+class OutboxRelay:
+    """Publishes the committed outbox events to the Redis Streams"""
+
+    # Relays of the process started on their event loop, woken up by `notify`
+    running_relays: typing.Set["OutboxRelay"] = set()
+
+    @inject.autoparams("config")
+    def __init__(
+        self,
+        config: CoreSettings,
+        session_factory: typing.Callable[[], Session] | None = None,
+        backend: BaseBackend | None = None,
+    ):
+        self.config = config
+        self.session_factory = session_factory or (lambda: inject.instance(Session))
+        self.backend = backend
+        self.batch_size = config.outbox_batch_size
+        self.poll_interval = config.outbox_poll_interval
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._committed: asyncio.Event | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def wake(self) -> None:
+        """Read the events without waiting for the poll interval, can be called from any thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._committed.set)
+
+    async def start(self) -> None:
+        """Start the relay on the running event loop"""
+        if self.running:
+            return
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._committed = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="outbox-relay")
+        OutboxRelay.running_relays.add(self)
+
+    async def stop(self) -> None:
+        """Stop the relay once the batch being published is done"""
+        OutboxRelay.running_relays.discard(self)
+        if self.running:
+            self._stopping = True
+            self._committed.set()
+            await self._task
+        self._task = None
+        self._loop = None
+
+    async def relay(self) -> int:
+        """
+        Publish a batch of the committed events
+        :return: Number of the published events
+        """
+        try:
+            published = await run_in_threadpool(self.publish_batch)
+        except Exception as ex:
+            metrics.OUTBOX_EVENTS_FAILED.inc()
+            logger.error(f"Unable to publish the outbox events: {ex}", exc_info=True)
+            return 0
+        metrics.OUTBOX_EVENTS_PUBLISHED.inc(published)
+        return published
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._committed.clear()
+            published = await self.relay()
+            if published < self.batch_size and not self._stopping:
+                # Nothing left, wait for the next commit or the events of the other workers
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._committed.wait(), self.poll_interval)
+
+    def publish_batch(self) -> int:
+        """
+        Append the oldest committed events to their streams and delete them, in the calling thread
+        :return: Number of the published events
+        """
+        table = OutboxEventModel.__table__
+        backend = self.backend or inject.instance(BaseBackend)
+        session = self.session_factory()
+        try:
+            query = select(table).order_by(table.c.created_at).limit(self.batch_size)
+            # Ignored by SQLite, which locks the whole database
+            rows = session.execute(query.with_for_update(skip_locked=True)).mappings().all()
+            if rows:
+                backend.stream_add(
+                    [(stream_name(self.config, row["topic"]), _entry(row)) for row in rows],
+                    maxlen=self.config.outbox_stream_maxlen,
+                )
+                session.execute(delete(table).where(table.c.id.in_([row["id"] for row in rows])))
+            session.commit()
+            return len(rows)
+        finally:
+            session.close()
+
+
+class EventConsumer:
+    """
+    Reads the events of a topic as a member of a consumer group. Each event is delivered to one consumer of
+    the group, it is pending until acknowledged and claimed by another consumer when its consumer stops::
+
+        consumer = EventConsumer("user", group="event-service")
+        consumer.create_group()
+        for event in consumer.read(block=5000):
+            handle(event)
+            consumer.ack(event)
+    """
+
+    @inject.autoparams("config")
+    def __init__(
+        self,
+        topic: str,
+        group: str,
+        consumer: str | None = None,
+        config: CoreSettings = None,
+        backend: BaseBackend | None = None,
+    ):
+        """
+        :param topic: Topic of the events, see `SqlAlchemyUnitOfWork.publish`
+        :param group: Name of the consumer group, usually the name of the consuming service
+        :param consumer: Name of the consumer within the group, host name and process id by default
+        :param config:
+        :param backend: Redis backend, resolved from the injector if not given
+        """
+        self.stream = stream_name(config, topic)
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.backend = backend or inject.instance(BaseBackend)
+
+    def create_group(self, start: str = "0") -> bool:
+        """
+        Create the consumer group, nothing is done when it exists
+        :param start: "0" to deliver the events already in the stream, "$" only the new ones
+        :return: `False` when the group already exists
+        """
+        return self.backend.stream_create_group(self.stream, self.group, start=start)
+
+    def read(self, count: int = 100, block: int | None = None, pending: bool = False) -> typing.List[StreamEvent]:
+        """
+        Read the events never delivered to the group
+        :param count: Maximum number of the events
+        :param block: Milliseconds to wait for the new events, returns at once if not given
+        :param pending: Read again the events delivered to this consumer but not acknowledged, e.g. after a restart
+        :return:
+        """
+        response = self.backend.stream_read_group(
+            self.group, self.consumer, {self.stream: "0" if pending else ">"}, count=count, block=block
+        )
+        return [
+            StreamEvent.from_entry(stream, message_id, fields)
+            for stream, entries in response or []
+            for message_id, fields in entries
+            # Deleted by the stream trimming while pending
+            if fields
+        ]
+
+    def claim(self, min_idle_ms: int, count: int = 100) -> typing.List[StreamEvent]:
+        """
+        Take over the events left unacknowledged by the other consumers for longer than `min_idle_ms`
+        :param min_idle_ms:
+        :param count:
+        :return:
+        """
+        entries = self.backend.stream_claim(self.stream, self.group, self.consumer, min_idle_ms, count=count)
+        return [StreamEvent.from_entry(self.stream, message_id, fields) for message_id, fields in entries if fields]
+
+    def ack(self, *events: StreamEvent) -> int:
+        """
+        Acknowledge the processed events
+        :param events:
+        :return: Number of the acknowledged events
+        """
+        return self.backend.stream_ack(self.stream, self.group, *[event.message_id for event in events])
@@ -1,10 +1,22 @@
 import abc
+import datetime
 import logging
+import typing
 
 import inject
+from metagrim_common.base import app_context
+from metagrim_common.base import query_budget
+from metagrim_common.base import tracing
+from metagrim_common.base.context_vars import get_current_user_uuid
+from metagrim_common.model import OutboxEventModel
 from metagrim_common.repository import TokenRedisRepository
 from metagrim_common.repository import UserActionsSqlAlchemyRepository
 from metagrim_common.repository import UserSqlAlchemyRepository
+from metagrim_common.service import outbox
+from opentelemetry import context
+from opentelemetry import trace
+from opentelemetry.trace import Status
+from opentelemetry.trace import StatusCode
 from pydantic import UUID4
 from sqlalchemy.orm.session import Session
 
@@ -25,8 +37,9 @@ class AbstractUnitOfWork(abc.ABC):
     session: Session = None
     tokens: TokenRedisRepository = None
 
-    def __init__(self):
-        self.tokens = TokenRedisRepository()
+    def __init__(self, tokens: TokenRedisRepository | None = None):
+        # Token repository is stateless over the shared backend, so a process wide instance can be passed in
+        self.tokens = tokens if tokens is not None else TokenRedisRepository()
 
     async def __aenter__(self) -> "AbstractUnitOfWork":
         return self
@@ -56,7 +69,12 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
     users: UserSqlAlchemyRepository = None
     user_actions: UserSqlAlchemyRepository = None
 
-    def __init__(self, session: Session = None, session_factory=default_session_factory):
+    def __init__(
+        self,
+        session: Session = None,
+        session_factory=default_session_factory,
+        tokens: TokenRedisRepository | None = None,
+    ):
         """
         Either the session object or session_factory need to be provided
         If session object is passed it will be passed down to the repository
@@ -64,11 +82,18 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         And then passed it down to the repository
         :param session: sqlalchemy.orm.Session:
         :param session_factory: Callable: which returns the session object
+        :param tokens: TokenRedisRepository: shared token repository, new one is created if not given
         """
         self.session = session
         self.session_factory = session_factory
         self.close_on_exit = False
-        super(SqlAlchemyUnitOfWork, self).__init__()
+        # Spans of the entered contexts with the tokens to restore the outer tracing context
+        self._spans: list = []
+        # Query logs started by the entered contexts in the query budget mode, `None` when the request has one
+        self._query_logs: list = []
+        # Outbox events added to the transaction since the last commit
+        self._published = 0
+        super(SqlAlchemyUnitOfWork, self).__init__(tokens=tokens)
 
     async def __aenter__(self):
         """
@@ -76,24 +101,92 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         :return:
         """
         await super().__aenter__()
+        if trace.get_current_span().is_recording():
+            span = tracing.tracer.start_span(type(self).__name__)
+            self._spans.append((span, context.attach(trace.set_span_in_context(span))))
+        else:
+            self._spans.append((None, None))
         if not self.session:
             # Session is not initialized so creating new session
             self.session = self.session_factory()  # type: Session
             self.close_on_exit = True
 
-        self.users: UserSqlAlchemyRepository = UserSqlAlchemyRepository(self.session)
-        self.user_actions: UserActionsSqlAlchemyRepository = UserActionsSqlAlchemyRepository(self.session)
+        self._watch_queries()
+
+        if self.users is None or self.users.session is not self.session:
+            # Repositories are bound to the session, build them only when session is changed
+            self.users: UserSqlAlchemyRepository = UserSqlAlchemyRepository(self.session)
+            self.user_actions: UserActionsSqlAlchemyRepository = UserActionsSqlAlchemyRepository(self.session)
 
         return self
 
     async def __aexit__(self, *args):
-        await super().__aexit__(*args)
-        if self.close_on_exit:
-            # Close the session only if it is started in the context manager
-            self.session.close()
-
+        try:
+            await super().__aexit__(*args)
+            if self.close_on_exit:
+                # Close the session only if it is started in the context manager
+                self.session.close()
+        finally:
+            span, token = self._spans.pop() if self._spans else (None, None)
+            if span is not None:
+                context.detach(token)
+                if args and args[1] is not None:
+                    span.record_exception(args[1])
+                    span.set_status(Status(StatusCode.ERROR))
+                span.end()
+            self._check_queries(failed=bool(args and args[1] is not None))
+
+    def _watch_queries(self) -> None:
+        """Count the statements of the session in the query budget mode, see `metagrim_common.base.query_budget`"""
+        settings = app_context.current.settings
+        if settings.query_budget_mode == "off":
+            return
+        query_budget.watch(self.session.get_bind())
+        # Within a request the statements are checked by the `QueryBudgetMiddleware` against the route budget
+        self._query_logs.append(None if query_budget.get_query_log() is not None else query_budget.set_query_log())
+
+    def _check_queries(self, failed: bool) -> None:
+        token = self._query_logs.pop() if self._query_logs else None
+        if token is None:
+            return
+        query_log = query_budget.get_query_log()
+        query_budget.reset_query_log(token)
+        if not failed:
+            settings = app_context.current.settings
+            query_budget.report(
+                query_log, type(self).__name__, settings.query_budget_mode, threshold=settings.query_repeat_threshold
+            )
+
+    def publish(self, topic: str, event: str, entity_id: typing.Any = None, **payload) -> OutboxEventModel:
+        """
+        Add the domain event to the transaction, see `metagrim_common.service.outbox`
+        It is written by the next commit and published once committed, dropped by a rollback
+        :param topic: Stream of the event, e.g. "user"
+        :param event: Name of the event, e.g. `UserEventEnum`
+        :param entity_id: Record the event is about
+        :param payload: Details of the event, JSON serializable
+        :return:
+        """
+        record = OutboxEventModel(
+            topic=topic,
+            event=getattr(event, "value", event),
+            entity_id=str(entity_id) if entity_id is not None else None,
+            payload=payload,
+            # Set here as the server time is the same for all the events of a transaction
+            created_at=datetime.datetime.utcnow(),
+            created_by=get_current_user_uuid(),
+        )
+        self.session.add(record)
+        self._published += 1
+        return record
+
+    @tracing.traced("unit_of_work.commit")
     def _commit(self):
         self.session.commit()
+        if self._published:
+            self._published = 0
+            outbox.notify()
 
     def rollback(self):
+        self._published = 0
         self.session.rollback()
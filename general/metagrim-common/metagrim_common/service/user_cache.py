@@ -0,0 +1,129 @@
+"""
+Cache-aside read cache for the user domains.
+
+Reads are served from a small in-process LRU first, then from Redis and finally from the database.
+Every write bumps the version stamp of the user in Redis, an entry is served from Redis only
+when it carries the current version, so a reader racing with a writer can never bring the stale record back.
+In-process entries live only for `user_cache_local_ttl` seconds which bounds the staleness across the workers.
+"""
+import logging
+import time
+import typing
+from collections import OrderedDict
+
+import inject
+from metagrim_common.base import metrics
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.domains import User
+from metagrim_common.repository import UserCacheRedisRepository
+
+logger = logging.getLogger(__name__)
+
+
+class UserReadCache:
+    """Two level (in-process and Redis) cache of the User domains"""
+
+    @inject.autoparams("config")
+    def __init__(self, config: CoreSettings, repository: UserCacheRedisRepository | None = None):
+        self.repository = repository or UserCacheRedisRepository()
+        self.local_ttl = config.user_cache_local_ttl
+        self.local_size = config.user_cache_local_size
+        self._local: "OrderedDict[str, typing.Tuple[float, User]]" = OrderedDict()
+
+        # Hit rate counters
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.local_hits + self.redis_hits + self.misses
+        return (self.local_hits + self.redis_hits) / total if total else 0.0
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+        }
+
+    def _get_local(self, key: str) -> User | None:
+        item = self._local.get(key)
+        if item is None:
+            return None
+        expires_at, user = item
+        if expires_at < time.monotonic():
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return user
+
+    def _set_local(self, key: str, user: User) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, user)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def get_or_load(
+        self, user_id: typing.Any, loader: typing.Callable[[typing.Any], typing.Awaitable[User | None]]
+    ) -> User | None:
+        """
+        Returns the user from the cache, on miss loads it with given loader and populates the cache
+        :param user_id:
+        :param loader: Coroutine function which loads the user from database
+        :return:
+        """
+        key = str(user_id)
+        user = self._get_local(key)
+        if user is not None:
+            self.local_hits += 1
+            metrics.USER_CACHE_LOCAL_HITS.inc()
+            return user
+
+        version = None
+        try:
+            entry, version = self.repository.get_entry(key)
+            if entry and entry.get("version") == version:
+                user = User.model_validate(entry["data"])
+                self.redis_hits += 1
+                metrics.USER_CACHE_REDIS_HITS.inc()
+                self._set_local(key, user)
+                return user
+        except Exception as ex:
+            # Cache is an optimisation only, fallback to the database
+            logger.warning(f"Unable to read user {key} from cache: {ex}")
+
+        self.misses += 1
+        metrics.USER_CACHE_MISSES.inc()
+        user = await loader(user_id)
+        if user is None:
+            return None
+
+        if version is None:
+            # Redis is not available, the local entry is bounded by its time to live
+            self._set_local(key, user)
+            return user
+        try:
+            if self.repository.get_version(key) != version:
+                # Changed while loading, the loaded user may be the old one, do not cache it
+                return user
+            self._set_local(key, user)
+            # Stamp with the version read before loading, a concurrent write makes this entry unusable
+            self.repository.set_entry(key, user.model_dump(mode="json", exclude_computed=True), version)
+        except Exception as ex:
+            logger.warning(f"Unable to write user {key} to cache: {ex}")
+        return user
+
+    def invalidate(self, user_id: typing.Any) -> None:
+        """
+        Must be called after the user record is changed and committed
+        :param user_id:
+        :return:
+        """
+        key = str(user_id)
+        self._local.pop(key, None)
+        try:
+            self.repository.bump_version(key)
+        except Exception as ex:
+            logger.error(f"Unable to invalidate user {key} in cache: {ex}")
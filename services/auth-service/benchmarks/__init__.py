@@ -0,0 +1,12 @@
+"""Performance benchmarks of the Auth Service.
+
+Run from the service directory, for example::
+
+    python -m benchmarks.bench_app_context
+"""
+import sys
+from os.path import abspath
+from os.path import join
+
+# Adjust the paths
+sys.path.insert(0, abspath(join(__file__, "../", "../", "src/")))
@@ -0,0 +1,58 @@
+"""Per request overhead of resolving settings/error configuration through the injector vs the app context.
+
+A request through the authenticated routes resolves the settings and the error configuration at
+`extract_authenticated_user`, `TokenRedisRepository.__init__`, `AuthenticatorService.__init__`,
+`respond` (twice) and `ResponseSchema.__init__`, use `--lookups` to change that count.
+
+    python -m benchmarks.bench_app_context --number 200000
+"""
+import argparse
+import timeit
+
+import inject
+from auth_service.app.dependency import get_settings
+from metagrim_common.base import app_context
+from metagrim_common.base.error_conf import ErrorConfig
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base.utils import respond
+
+
+def configure_injector(binder: inject.Binder):
+    binder.bind(CoreSettings, get_settings())
+    binder.bind_to_constructor(ErrorConfig, ErrorConfig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200_000, help="Iterations per measurement")
+    parser.add_argument("--lookups", type=int, default=6, help="Settings/Error config lookups per request")
+    args = parser.parse_args()
+
+    inject.clear_and_configure(configure_injector)
+    app_context.configure()
+
+    def injector_lookup():
+        inject.instance(CoreSettings)
+        inject.instance(ErrorConfig)
+
+    def context_lookup():
+        context = app_context.current
+        context.settings
+        context.error_config
+
+    results = {}
+    for name, func in [("inject.instance", injector_lookup), ("app_context.current", context_lookup)]:
+        best = min(timeit.repeat(func, number=args.number, repeat=5))
+        results[name] = best / args.number * 1e9
+        print(f"{name:<22} {results[name]:8.1f} ns/lookup  {results[name] * args.lookups / 1000:8.3f} us/request")
+
+    saved = (results["inject.instance"] - results["app_context.current"]) * args.lookups / 1000
+    print(f"{'saved':<22} {saved:8.3f} us/request")
+
+    number = max(args.number // 20, 1)
+    best = min(timeit.repeat(lambda: respond(200, message="OK"), number=number, repeat=5))
+    print(f"{'respond()':<22} {best / number * 1e6:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    main()
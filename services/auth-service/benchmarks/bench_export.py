@@ -0,0 +1,100 @@
+"""Peak memory and throughput of the streamed user export.
+
+Seeds a SQLite database with users and compares the peak traced memory of
+the streamed NDJSON export (`SqlAlchemyRepository.stream` + `encode_ndjson`) with
+loading the same rows as a single page of ORM models validated into `User` domains.
+The streamed peak should stay flat as the number of rows grows.
+Timings are taken while tracing the allocations, so they are only comparable with each other.
+
+    python -m benchmarks.bench_export --rows 1000 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from metagrim_common.base.export import encode_ndjson
+from metagrim_common.domains import User
+from metagrim_common.model import UserModel
+from metagrim_common.model.base import Base
+from metagrim_common.repository import UserSqlAlchemyRepository
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+PROJECTION = ("id", "email", "mobile", "user_type", "first_name", "last_name", "status", "created_at")
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, 10_000):
+            conn.execute(
+                UserModel.__table__.insert(),
+                [
+                    dict(
+                        id=uuid.uuid4(),
+                        email=f"user{index}@demo.com",
+                        user_type="CASHIER",
+                        first_name=f"First{index}",
+                        last_name="Last",
+                        password_hash=None,
+                        status="ACTIVE",
+                        is_deleted=False,
+                    )
+                    for index in range(start, min(start + 10_000, rows))
+                ],
+            )
+
+
+async def streamed(session, batch_size):
+    repository = UserSqlAlchemyRepository(session)
+    size = 0
+    async for chunk in encode_ndjson(repository.stream(PROJECTION, batch_size=batch_size), PROJECTION):
+        size += len(chunk)
+    return size
+
+
+async def loaded(session, rows):
+    repository = UserSqlAlchemyRepository(session)
+    paginated = await repository.get_paginated_result(page_size=rows)
+    data = [User.model_validate(item).model_dump(mode="json") for item in paginated["data"]]
+    return len(data)
+
+
+async def measure(name, coroutine_factory):
+    tracemalloc.start()
+    start = time.perf_counter()
+    await coroutine_factory()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return f"{name} {peak / 1024 / 1024:8.2f} MiB peak {elapsed:7.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="Number of users to export")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows fetched per batch")
+    parser.add_argument("--skip-loaded", action="store_true", help="Measure the streamed export only")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'export.db')}")
+            seed(engine, rows)
+            session = sessionmaker(bind=engine)()
+            results = [asyncio.run(measure("streamed", lambda: streamed(session, args.batch_size)))]
+            if not args.skip_loaded:
+                session.expunge_all()
+                results.append(asyncio.run(measure("loaded  ", lambda: loaded(session, rows))))
+            session.close()
+            engine.dispose()
+        for result in results:
+            print(f"{rows:>10} rows  {result}")
+
+
+if __name__ == "__main__":
+    main()
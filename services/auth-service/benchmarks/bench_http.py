@@ -0,0 +1,316 @@
+"""HTTP load and latency benchmark of the Auth Service endpoints.
+
+Runs the real application against stand-ins of the external services: a seeded SQLite database and fakeredis.
+Requests are sent concurrently through an in-process ASGI client, or with `--url` to a running server,
+`--serve` starts such a server (uvicorn with the same stand-ins) in a subprocess. It runs a single worker
+as fakeredis is not shared between the processes, use `--url` to load a real multi worker deployment.
+For every route it records the throughput and the p50/p95/p99 latencies and writes them to a JSON file,
+`--compare` prints the change against the results of an earlier run (e.g. of another commit).
+
+`--mode overhead` measures the routes added by the benchmark which never touch the database or Redis:
+`/bench/raw` returns a plain response (middlewares only) and `/bench/respond` builds it with `respond()`,
+`/healthz` is measured in both modes.
+
+    python -m benchmarks.bench_http --output before.json
+    python -m benchmarks.bench_http --output after.json --compare before.json
+    python -m benchmarks.bench_http --mode overhead --concurrency 1
+    python -m benchmarks.bench_http --serve
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+import uuid
+
+ADMIN_EMAIL = "admin@demo.com"
+ADMIN_PASSWORD = "admin@123"
+
+# Route name -> (method, path, number of requests relative to --requests)
+ROUTES = {
+    "api": {
+        "POST /auth": ("POST", "/auth", 0.02),  # bcrypt verification dominates, run a few only
+        "GET /me": ("GET", "/me", 1),
+        "GET /user": ("GET", "/user", 1),
+        "GET /healthz": ("GET", "/healthz", 1),
+    },
+    "overhead": {
+        "GET /bench/raw": ("GET", "/bench/raw", 1),
+        "GET /bench/respond": ("GET", "/bench/respond", 1),
+        "GET /healthz": ("GET", "/healthz", 1),
+    },
+}
+
+
+def prepare_environment(directory: str, users: int) -> None:
+    """
+    Point the settings to the SQLite database in given directory and seed it
+    Must be called before importing the application
+    :param directory:
+    :param users: Number of users besides the admin
+    :return:
+    """
+    os.environ.setdefault("SHARED_SECRET_KEY", uuid.uuid4().hex)
+    # All the requests come from the same client and user
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+    os.environ["SQLALCHEMY_URI"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ["LOG_FILE"] = os.path.join(directory, "bench.log")
+
+    from metagrim_common.base.utils import get_password_hash
+    from metagrim_common.model import UserModel
+    from metagrim_common.model.base import Base
+    from sqlalchemy import create_engine
+
+    engine = create_engine(os.environ["SQLALCHEMY_URI"])
+    Base.metadata.create_all(engine)
+    common = dict(is_deleted=False, status="ACTIVE", last_name="User", mobile=None)
+    with engine.begin() as conn:
+        conn.execute(
+            UserModel.__table__.insert(),
+            [
+                dict(
+                    id=uuid.uuid4(),
+                    email=ADMIN_EMAIL,
+                    password_hash=get_password_hash(ADMIN_PASSWORD),
+                    user_type="ADMIN",
+                    first_name="Admin",
+                    **common,
+                )
+            ]
+            + [
+                dict(
+                    id=uuid.uuid4(),
+                    email=f"user{index}@demo.com",
+                    password_hash=None,
+                    user_type="CASHIER",
+                    first_name=f"First{index}",
+                    **common,
+                )
+                for index in range(users)
+            ],
+        )
+    engine.dispose()
+
+
+def create_bench_app():
+    """
+    Import the application, swap Redis with fakeredis and add the overhead routes
+    :return:
+    """
+    try:
+        import fakeredis
+    except ImportError:  # pragma: no cover
+        raise SystemExit("fakeredis is required for the benchmark, install the dev packages")
+
+    import inject
+    from auth_service import constants
+    from auth_service.app.bootstrap import api
+    from fastapi.responses import PlainTextResponse
+    from metagrim_common.adapter.base import BaseBackend
+    from metagrim_common.base.utils import respond
+
+    inject.instance(BaseBackend).conn = fakeredis.FakeStrictRedis()
+
+    async def raw():
+        return PlainTextResponse("OK")
+
+    async def respond_ok():
+        return respond(constants.RESPONSE_OK)
+
+    api.add_api_route("/bench/raw", raw, include_in_schema=False)
+    api.add_api_route("/bench/respond", respond_ok, include_in_schema=False)
+    return api
+
+
+def percentile(values: typing.List[float], percent: float) -> float:
+    """Nearest rank percentile of the sorted values"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+async def run_route(client, method: str, path: str, number: int, concurrency: int, headers: dict, json_=None):
+    latencies = []
+    errors = 0
+    remaining = iter(range(number))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, path, headers=headers, json=json_)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": number,
+        "errors": errors,
+        "rps": round(number / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_benchmark(client, mode: str, requests: int, concurrency: int, warmup: int) -> dict:
+    login = {"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    response = await client.post("/auth", json=login)
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    results = {}
+    for name, (method, path, share) in ROUTES[mode].items():
+        json_ = login if path == "/auth" else None
+        number = max(concurrency, int(requests * share))
+        # Warm up the caches and the lazily created resources
+        await run_route(client, method, path, max(1, int(warmup * share)), 1, headers, json_)
+        results[name] = await run_route(client, method, path, number, concurrency, headers, json_)
+        print(
+            f"{name:<20} {results[name]['rps']:10.1f} req/s  p50 {results[name]['p50_ms']:8.2f} ms  "
+            f"p95 {results[name]['p95_ms']:8.2f} ms  p99 {results[name]['p99_ms']:8.2f} ms  "
+            f"errors {results[name]['errors']}"
+        )
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results: dict, baseline_file: str) -> None:
+    with open(baseline_file) as file:
+        baseline = json.load(file)
+    print(f"\nCompared with {baseline_file} ({baseline['meta'].get('commit')})")
+    for name, current in results["routes"].items():
+        previous = baseline["routes"].get(name)
+        if not previous:
+            continue
+        changes = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+            changes.append(f"{key} {change:+7.1f}%")
+        print(f"{name:<20} {'  '.join(changes)}")
+
+
+def serve(port: int, users: int) -> subprocess.Popen:
+    """
+    Start uvicorn with the stand-ins in a subprocess
+    :param port:
+    :param users:
+    :return:
+    """
+    command = [sys.executable, "-m", "benchmarks.bench_http", "--serve-only", "--port", str(port)]
+    return subprocess.Popen(command + ["--users", str(users)])
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            try:
+                if (await client.get("/healthz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"Server at {url} did not start in {timeout} s")
+            await asyncio.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=sorted(ROUTES), default="api", help="Routes to measure")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=50, help="Warm up requests per route")
+    parser.add_argument("--users", type=int, default=1000, help="Seeded users")
+    parser.add_argument("--url", default=None, help="Benchmark the server at this URL instead of in-process")
+    parser.add_argument("--serve", action="store_true", help="Start uvicorn with the stand-ins and benchmark it")
+    parser.add_argument("--serve-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8765, help="Port of the server started by --serve")
+    parser.add_argument("--output", default="bench_http.json", help="JSON file to write the results to")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    if args.serve_only:
+        import uvicorn
+
+        with tempfile.TemporaryDirectory() as directory:
+            prepare_environment(directory, args.users)
+            uvicorn.run(create_bench_app(), port=args.port, log_level="warning")
+        return
+
+    import httpx
+
+    process = None
+    url = args.url
+    with tempfile.TemporaryDirectory() as directory:
+        if args.serve:
+            url = f"http://127.0.0.1:{args.port}"
+            process = serve(args.port, args.users)
+        try:
+            app = None
+            if url:
+                asyncio.run(wait_until_ready(url))
+                client = httpx.AsyncClient(base_url=url, timeout=60)
+            else:
+                prepare_environment(directory, args.users)
+                app = create_bench_app()
+                client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+            async def run():
+                async with contextlib.AsyncExitStack() as stack:
+                    if app is not None:
+                        # Start and warm up the resources as the server would
+                        await stack.enter_async_context(app.router.lifespan_context(app))
+                        await app.state.resources.wait_until_ready()
+                    await stack.enter_async_context(client)
+                    return await run_benchmark(client, args.mode, args.requests, args.concurrency, args.warmup)
+
+            routes = asyncio.run(run())
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "target": url or "in-process",
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+        },
+        "routes": routes,
+    }
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
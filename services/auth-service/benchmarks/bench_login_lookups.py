@@ -0,0 +1,104 @@
+"""Login lookups per second.
+
+Compares the legacy `session.query(...)` lookups which were rebuilt on every call
+with the precompiled `select()` statements of `UserSqlAlchemyRepository`
+(`find_by_email`, `check_user_exists`, `is_user_active`, `get_user_info`)
+against an in-memory SQLite database, so the numbers show the Python side cost of each lookup.
+
+    python -m benchmarks.bench_login_lookups --number 20000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from metagrim_common.enums import UserStatusEnum
+from metagrim_common.model import UserModel
+from metagrim_common.model.base import Base
+from metagrim_common.repository import UserSqlAlchemyRepository
+from sqlalchemy import create_engine
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+USERS = 1000
+
+
+class LegacyLookups:
+    """The lookups as they were implemented with the legacy Query API"""
+
+    def __init__(self, session):
+        self.session = session
+        self.model = UserModel
+
+    async def find_by_email(self, email):
+        return self.session.query(self.model).filter_by(email=email).first()
+
+    async def check_user_exists(self, email):
+        return bool(self.session.query(func.count(self.model.id)).filter_by(email=email).scalar())
+
+    async def is_user_active(self, user_id):
+        record = self.session.query(self.model.id, self.model.status).filter(self.model.id == user_id).first()
+        return record.status == UserStatusEnum.active
+
+    async def get_user_info(self, user_id):
+        return (
+            self.session.query(self.model.id, self.model.first_name, self.model.last_name)
+            .filter(self.model.id == user_id)
+            .first()
+        )
+
+
+def seed(engine):
+    Base.metadata.create_all(engine)
+    ids = [uuid.uuid4() for _ in range(USERS)]
+    with engine.begin() as conn:
+        conn.execute(
+            UserModel.__table__.insert(),
+            [
+                dict(id=id_, email=f"user{index}@demo.com", user_type="CASHIER", status="ACTIVE", is_deleted=False)
+                for index, id_ in enumerate(ids)
+            ],
+        )
+    return ids
+
+
+async def measure(name, lookups, session, ids, number):
+    for index in range(100):  # warm up the caches
+        await lookups.find_by_email(f"user{index}@demo.com")
+    start = time.perf_counter()
+    for index in range(number):
+        await lookups.find_by_email(f"user{index % USERS}@demo.com")
+        session.expunge_all()
+    find_rate = number / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for index in range(number):
+        user_id = ids[index % USERS]
+        await lookups.check_user_exists(f"user{index % USERS}@demo.com")
+        await lookups.is_user_active(user_id)
+        await lookups.get_user_info(user_id)
+    other_rate = number * 3 / (time.perf_counter() - start)
+    print(f"{name:<10} {find_rate:10.0f} find_by_email/s {other_rate:10.0f} other lookups/s")
+    return find_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="Lookups to run")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    ids = seed(engine)
+    session = sessionmaker(bind=engine)()
+
+    async def run():
+        before = await measure("legacy", LegacyLookups(session), session, ids, args.number)
+        after = await measure("compiled", UserSqlAlchemyRepository(session), session, ids, args.number)
+        print(f"{'speedup':<10} {after / before:10.2f}x find_by_email")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
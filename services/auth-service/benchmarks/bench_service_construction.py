@@ -0,0 +1,105 @@
+"""Allocations and time spent building the services of a request.
+
+Compares the injector path (`UserService()` resolving a new `UnitOfWork`, `TokenRedisRepository`
+and `RedisRepository` through `inject.autoparams`) with the FastAPI dependencies of `auth_service.api.deps`
+which reuse the process wide collaborators and create only the unit of work per request.
+
+    python -m benchmarks.bench_service_construction --number 20000
+"""
+import argparse
+import asyncio
+import collections
+import gc
+import time
+import tracemalloc
+
+import inject
+from auth_service.app.dependency import configure_dependency
+
+# Routes resolve the settings while importing, so configure the injector first
+inject.configure(configure_dependency)
+
+from auth_service.api import deps  # noqa
+from auth_service.service.unit_of_work import UnitOfWork  # noqa
+from auth_service.service.user import UserService  # noqa
+from metagrim_common.adapter.base import SqlAlchemyRepository  # noqa
+from metagrim_common.repository import RedisRepository  # noqa
+
+# Collaborators whose construction is counted per request
+COUNTED = [UnitOfWork, RedisRepository, SqlAlchemyRepository]
+constructed = collections.Counter()
+
+
+def count_constructions():
+    for cls in COUNTED:
+        original = cls.__init__
+
+        def counting_init(self, *args, __original=original, __cls=cls, **kwargs):
+            constructed[__cls.__name__] += 1
+            __original(self, *args, **kwargs)
+
+        cls.__init__ = counting_init
+
+
+async def injector_path():
+    service = UserService()
+    async with service.uow:
+        pass
+    return service
+
+
+async def dependency_path():
+    service = await deps.get_user_service(current_user_id=None, uow=await deps.get_unit_of_work())
+    async with service.uow:
+        pass
+    return service
+
+
+async def measure(name, factory, number):
+    await factory()  # warm up the process wide collaborators
+
+    constructed.clear()
+    await factory()
+    objects = sum(constructed.values())
+    per_request = dict(constructed)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [await factory() for _ in range(number)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats) / number
+    size = sum(stat.size_diff for stat in stats) / number
+    del kept
+
+    start = time.perf_counter()
+    for _ in range(number):
+        await factory()
+    elapsed = (time.perf_counter() - start) / number * 1e6
+    print(
+        f"{name:<12} {objects:4d} objects/request {blocks:8.1f} blocks/request  {size:10.1f} bytes/request  "
+        f"{elapsed:8.2f} us/request  {per_request}"
+    )
+    return objects, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="Requests to simulate")
+    args = parser.parse_args()
+
+    count_constructions()
+
+    async def run():
+        old_objects, old_blocks = await measure("injector", injector_path, args.number)
+        new_objects, new_blocks = await measure("dependency", dependency_path, args.number)
+        removed_objects, removed_blocks = old_objects - new_objects, old_blocks - new_blocks
+        print(f"{'removed':<12} {removed_objects:4d} objects/request {removed_blocks:8.1f} blocks/request")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Transactional outbox
+
+Revision ID: b5d8e2c4a6f1
+Revises: f7c2a9e4b1d3
+Create Date: 2026-10-19 16:02:13.518377
+
+"""
+import metagrim_common
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b5d8e2c4a6f1"
+down_revision = "f7c2a9e4b1d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "demo_outbox_event",
+        sa.Column("id", metagrim_common.model.types.uuid.UUID(length=16), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("modified_at", sa.TIMESTAMP(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("created_by", sa.String(length=36), nullable=True),
+        sa.Column("modified_by", sa.String(length=36), nullable=True),
+        sa.Column("topic", sa.String(length=64), nullable=False),
+        sa.Column("event", sa.String(length=64), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Relay reads the oldest events first
+    op.create_index("ix_demo_outbox_event_created_at", "demo_outbox_event", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_demo_outbox_event_created_at", table_name="demo_outbox_event")
+    op.drop_table("demo_outbox_event")
@@ -0,0 +1,30 @@
+"""Record version
+
+Revision ID: c3e7a1f5d9b2
+Revises: b5d8e2c4a6f1
+Create Date: 2026-10-19 17:10:52.730164
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c3e7a1f5d9b2"
+down_revision = "b5d8e2c4a6f1"
+branch_labels = None
+depends_on = None
+
+# Tables of the models with the `CoreModel` columns
+tables = ("demo_user", "demo_user_action", "demo_audit_log", "demo_outbox_event")
+
+
+def upgrade() -> None:
+    for table in tables:
+        # Existing rows start at the first version
+        op.add_column(table, sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    for table in tables:
+        op.drop_column(table, "version")
@@ -0,0 +1,32 @@
+"""Partial indexes of the active users
+
+Revision ID: c41d5e2f9a10
+Revises: a7ebfbfd4016
+Create Date: 2026-10-19 10:12:05.318245
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c41d5e2f9a10"
+down_revision = "a7ebfbfd4016"
+branch_labels = None
+depends_on = None
+
+# Indexes cover only the rows which are not soft deleted
+ACTIVE_USER = {
+    "postgresql_where": sa.text("is_deleted = false"),
+    "sqlite_where": sa.text("is_deleted = 0"),
+}
+
+
+def upgrade() -> None:
+    op.create_index("ix_demo_user_active_created_at_id", "demo_user", ["created_at", "id"], **ACTIVE_USER)
+    op.create_index("ix_demo_user_active_type_status", "demo_user", ["user_type", "status"], **ACTIVE_USER)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_demo_user_active_type_status", table_name="demo_user")
+    op.drop_index("ix_demo_user_active_created_at_id", table_name="demo_user")
@@ -0,0 +1,40 @@
+"""Actions granted to the users
+
+Revision ID: e3b9d1a7c5f2
+Revises: c41d5e2f9a10
+Create Date: 2026-10-19 14:40:12.518934
+
+"""
+import metagrim_common
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e3b9d1a7c5f2"
+down_revision = "c41d5e2f9a10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "demo_user_action",
+        sa.Column("id", metagrim_common.model.types.uuid.UUID(length=16), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("modified_at", sa.TIMESTAMP(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("created_by", sa.String(length=36), nullable=True),
+        sa.Column("modified_by", sa.String(length=36), nullable=True),
+        sa.Column("user_id", metagrim_common.model.types.uuid.UUID(length=16), nullable=True),
+        sa.Column("action", sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["demo_user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Action set of a user and the actions of a page of users are looked up by the user id
+    op.create_index("ix_demo_user_action_user_id", "demo_user_action", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_demo_user_action_user_id", table_name="demo_user_action")
+    op.drop_table("demo_user_action")
@@ -0,0 +1,41 @@
+"""Audit trail
+
+Revision ID: f7c2a9e4b1d3
+Revises: e3b9d1a7c5f2
+Create Date: 2026-10-19 15:20:41.204518
+
+"""
+import metagrim_common
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f7c2a9e4b1d3"
+down_revision = "e3b9d1a7c5f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "demo_audit_log",
+        sa.Column("id", metagrim_common.model.types.uuid.UUID(length=16), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("modified_at", sa.TIMESTAMP(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("created_by", sa.String(length=36), nullable=True),
+        sa.Column("modified_by", sa.String(length=36), nullable=True),
+        sa.Column("event", sa.String(length=64), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=True),
+        sa.Column("request_id", sa.String(length=128), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # History of a record
+    op.create_index("ix_demo_audit_log_entity_id_created_at", "demo_audit_log", ["entity_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_demo_audit_log_entity_id_created_at", table_name="demo_audit_log")
+    op.drop_table("demo_audit_log")
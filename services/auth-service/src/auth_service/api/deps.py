@@ -0,0 +1,54 @@
+"""
+FastAPI dependencies which build the services for a request.
+
+Stateless collaborators (repositories over the shared backend, user read cache, settings) are resolved once per
+process, only the unit of work (holding the DB session) and the current user are created per request.
+FastAPI caches the dependencies within a request, so all the services of a request share the same unit of work.
+Dependencies are coroutines, so FastAPI runs them inline instead of in the thread pool.
+"""
+from functools import lru_cache
+
+import inject
+from auth_service.service.authenticator import AuthenticatorService
+from auth_service.service.unit_of_work import UnitOfWork
+from auth_service.service.user import UserService
+from fastapi import Depends
+from metagrim_common.base.deps import get_authorised_user
+from metagrim_common.repository import TokenRedisRepository
+from metagrim_common.service.audit import AuditTrail
+from metagrim_common.service.user_cache import UserReadCache
+
+
+@lru_cache
+def get_token_repository() -> TokenRedisRepository:
+    return inject.instance(TokenRedisRepository)
+
+
+@lru_cache
+def get_user_read_cache() -> UserReadCache:
+    return inject.instance(UserReadCache)
+
+
+@lru_cache
+def get_audit_trail() -> AuditTrail:
+    return inject.instance(AuditTrail)
+
+
+async def get_unit_of_work() -> UnitOfWork:
+    return UnitOfWork(tokens=get_token_repository(), user_cache=get_user_read_cache(), audit=get_audit_trail())
+
+
+async def get_authenticator_service(uow: UnitOfWork = Depends(get_unit_of_work)) -> AuthenticatorService:
+    return AuthenticatorService(uow=uow)
+
+
+async def get_current_user_authenticator_service(
+    current_user_id: str = Depends(get_authorised_user), uow: UnitOfWork = Depends(get_unit_of_work)
+) -> AuthenticatorService:
+    return AuthenticatorService(uow=uow, current_user_id=current_user_id)
+
+
+async def get_user_service(
+    current_user_id: str = Depends(get_authorised_user), uow: UnitOfWork = Depends(get_unit_of_work)
+) -> UserService:
+    return UserService(uow=uow, current_user_id=current_user_id)
@@ -1,5 +1,9 @@
 import typing
 
+from metagrim_common.enums import ExportFormatEnum
+from metagrim_common.enums import OrderEnum
+from metagrim_common.enums import UserActionEnum
+from metagrim_common.enums import UserExportOrderEnum
 from metagrim_common.enums import UserStatusEnum
 from metagrim_common.enums import UserTypeEnum
 from metagrim_common.schema import BaseRequestSchema
@@ -29,6 +33,12 @@ class UserUpdateSchema(BaseRequestSchema, UserBase):
     """Used to update user details."""
 
     status: str = Field(default=UserStatusEnum.inactive)
+    allowed_actions: typing.Optional[typing.List[UserActionEnum]] = Field(
+        default=None, title="Actions granted to the user, all the others are revoked"
+    )
+    version: int | None = Field(
+        default=None, title="Version of the user the changes are based on, rejected with 409 if it is changed since"
+    )
 
 
 class UserReadSchema(UserBase):
@@ -36,6 +46,8 @@ class UserReadSchema(UserBase):
 
     id: UUID4
     status: str = Field(default=UserStatusEnum.inactive)
+    user_actions: typing.List[str] = Field(default_factory=list, title="Actions granted to the user")
+    version: int | None = Field(default=None, title="Version of the user, changed by each update")
 
 
 class UserBriefSchema(UserReadSchema):
@@ -55,3 +67,13 @@ class UserPaginationResponseSchema(PaginationResponseSchema):
 class UserSearchPaginatedRequestSchema(SearchPaginatedRequestSchema):
     user_type: typing.Optional[UserTypeEnum] = Field(default=None, title="User type")
     status: typing.Optional[UserStatusEnum] = Field(default=None, title="User status")
+
+
+class UserExportRequestSchema(BaseModel):
+    format: ExportFormatEnum = Field(default=ExportFormatEnum.ndjson, title="Export format")
+    search: str | None = Field(default=None, title="Filter records")
+    # Only the exported columns, the request is rejected before the response is started
+    order_by: UserExportOrderEnum = Field(default=UserExportOrderEnum.created_at, title="Sort records by")
+    order: OrderEnum = Field(default=OrderEnum.desc, title="Sort order")
+    user_type: typing.Optional[UserTypeEnum] = Field(default=None, title="User type")
+    status: typing.Optional[UserStatusEnum] = Field(default=None, title="User status")
@@ -1,81 +1,132 @@
 from auth_service import constants
 from auth_service import domain
+from auth_service.api.deps import get_user_service
 from auth_service.api.schema import user
 from auth_service.service.user import UserService
 from fastapi import Depends
-from metagrim_common.base.deps import get_authorised_user
+from fastapi.responses import StreamingResponse
+from metagrim_common.base.deps import require_actions
+from metagrim_common.base.export import ENCODERS
+from metagrim_common.base.export import MEDIA_TYPES
+from metagrim_common.base.query_budget import query_budget
 from metagrim_common.base.router import APIRouter
 from metagrim_common.base.utils import respond
 from metagrim_common.domains import UserSearchPaginatedParameters
+from metagrim_common.enums import UserActionEnum
 from metagrim_common.schema import ResponseSchema
 
 router = APIRouter(prefix="/user", tags=["User Management"])
 
 
-@router.get("", response_model=user.UserPaginationResponseSchema)
+@router.get(
+    "",
+    response_model=user.UserPaginationResponseSchema,
+    dependencies=[Depends(require_actions(UserActionEnum.user_list))],
+)
+@query_budget(5)
 async def get_users(
     paginate: user.UserSearchPaginatedRequestSchema = Depends(user.UserSearchPaginatedRequestSchema),
-    current_user_id: str = Depends(get_authorised_user),
+    service: UserService = Depends(get_user_service),
 ) -> user.UserPaginationResponseSchema:
-    service = UserService(current_user_id=current_user_id)
     paginated = UserSearchPaginatedParameters(**paginate.model_dump(exclude_none=True))
     result = await service.list_users(paginated)
     return result  # type: ignore
 
 
-@router.post("", response_model=ResponseSchema)
+# Must be declared before `GET /{public_id}` which would match it otherwise
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_actions(UserActionEnum.user_export))],
+)
+@query_budget(3)
+async def export_users(
+    params: user.UserExportRequestSchema = Depends(user.UserExportRequestSchema),
+    service: UserService = Depends(get_user_service),
+) -> StreamingResponse:
+    filters = UserSearchPaginatedParameters(**params.model_dump(exclude_none=True, exclude={"format"}))
+    content = ENCODERS[params.format](service.export_users(filters), service.export_projection)
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[params.format],
+        headers={"Content-Disposition": f'attachment; filename="users.{params.format.value}"'},
+    )
+
+
+@router.post(
+    "",
+    response_model=ResponseSchema,
+    dependencies=[Depends(require_actions(UserActionEnum.user_create))],
+)
+@query_budget(6)
 async def create_user(
     user_form: user.UserCreateSchema,
-    current_user_id: str = Depends(get_authorised_user),
+    service: UserService = Depends(get_user_service),
 ) -> ResponseSchema:
-    service = UserService(current_user_id=current_user_id)
     entity = domain.UserDb(**user_form.model_dump(exclude_none=True))
     entity.set_pass_hash(user_form.password)
     new_user = await service.create_user(entity, requested_actions=[])
     return respond(constants.HTTP_201_CREATED, public_id=new_user.id)  # type: ignore
 
 
-@router.patch("/{public_id}", response_model=user.UserReadSchema)
+@router.patch(
+    "/{public_id}",
+    response_model=user.UserReadSchema,
+    dependencies=[Depends(require_actions(UserActionEnum.user_update))],
+)
+@query_budget(9)
 async def update_user(
     public_id: str,
     user_form: user.UserUpdateSchema,
-    current_user_id: str = Depends(get_authorised_user),
+    service: UserService = Depends(get_user_service),
 ) -> user.UserReadSchema:
-    service = UserService(current_user_id=current_user_id)
     entity = domain.User(**user_form.model_dump(exclude_unset=True))
     entity.id = public_id
     updated_entity = await service.update_user(
         entity,
-        requested_actions=[action.value for action in user_form.allowed_actions] if user_form.allowed_actions else None,
+        requested_actions=(
+            [action.value for action in user_form.allowed_actions] if user_form.allowed_actions is not None else None
+        ),
     )
     return updated_entity  # type: ignore
 
 
-@router.delete("/{public_id}", response_model=ResponseSchema)
+@router.delete(
+    "/{public_id}",
+    response_model=ResponseSchema,
+    dependencies=[Depends(require_actions(UserActionEnum.user_delete))],
+)
+@query_budget(5)
 async def delete_user(
     public_id: str,
-    current_user_id: str = Depends(get_authorised_user),
+    service: UserService = Depends(get_user_service),
 ):
-    service = UserService(current_user_id=current_user_id)
     await service.delete_user(public_id)
     return respond(constants.RESPONSE_OK)
 
 
-@router.get("/{public_id}", response_model=user.UserReadSchema)
+@router.get(
+    "/{public_id}",
+    response_model=user.UserReadSchema,
+    dependencies=[Depends(require_actions(UserActionEnum.user_read))],
+)
+@query_budget(4)
 async def get_user(
     public_id: str,
-    current_user_id: str = Depends(get_authorised_user),
+    service: UserService = Depends(get_user_service),
 ):
-    service = UserService(current_user_id=current_user_id)
     user = await service.get_user(public_id)
     return user
 
 
-@router.patch("/{public_id}/status")
+@router.patch(
+    "/{public_id}/status",
+    dependencies=[Depends(require_actions(UserActionEnum.user_update))],
+)
+@query_budget(5)
 async def change_user_status(
     public_id: str,
-    current_user_id: str = Depends(get_authorised_user),
+    service: UserService = Depends(get_user_service),
 ):
-    service = UserService(current_user_id=current_user_id)
     await service.change_user_status(public_id)
     return respond(constants.RESPONSE_OK)
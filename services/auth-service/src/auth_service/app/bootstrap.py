@@ -2,9 +2,11 @@ import typing
 
 import inject
 from auth_service.settings import Settings
+from metagrim_common.base.lifespan import ResourceRegistry
 from metagrim_common.base.settings import CoreSettings
 
 from .dependency import configure_dependency
+from .dependency import configure_resources
 
 # Configure the Dependencies for the Application
 inject.configure(configure_dependency)
@@ -16,8 +18,9 @@ def init_app():
     from auth_service.api.user import router as user_ends
     from metagrim_common.base.bootstrap import create_app
 
-    api_ = create_app(typing.cast(Settings, inject.instance(CoreSettings)))
-    return api_
+    resources = ResourceRegistry()
+    configure_resources(resources)
+    return create_app(typing.cast(Settings, inject.instance(CoreSettings)), resources=resources)
 
 
 # Create the FAST API app
@@ -1,4 +1,5 @@
 import logging
+import os
 from functools import lru_cache
 
 import inject
@@ -6,11 +7,23 @@ from auth_service.error_conf import ErrorConfig
 from auth_service.service.unit_of_work import UnitOfWork
 from auth_service.settings import Settings
 from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.adapter.base import check_repository_indexes
 from metagrim_common.adapter.redis_backend import RedisBackend
+from metagrim_common.base import tracing
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.metrics import instrument_engine
 from metagrim_common.base.settings import CoreSettings
+from metagrim_common.repository import prime_statements
+from metagrim_common.repository import TokenRedisRepository
+from metagrim_common.repository import UserActionsRedisRepository
+from metagrim_common.service.audit import AuditTrail
+from metagrim_common.service.outbox import OutboxRelay
+from metagrim_common.service.user_cache import UserReadCache
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +33,53 @@ def get_settings():
     return Settings()
 
 
-def sql_alchemy_session_factory() -> sessionmaker:
-    """ "
-    SQLAlchemy Session Maker
+# Engine of the current process, the connection pool must never be shared with a forked worker
+_engine: Engine | None = None
+_session_maker = sessionmaker(autocommit=False, autoflush=False)
+
+
+def get_engine() -> Engine:
     """
-    settings = get_settings()
-    engine = create_engine(settings.sqlalchemy_uri)
-    logger.info("Initializing SQLAlchemy Session Maker")
-    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Returns the SQLAlchemy engine of the current process, it is created on the first use
+    :return:
+    """
+    global _engine
+    if _engine is None:
+        settings = get_settings()
+        logger.info(f"Creating SQLAlchemy engine in process {os.getpid()}")
+        options = {}
+        if not settings.sqlalchemy_uri.startswith("sqlite"):
+            options = dict(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow, pool_pre_ping=True)
+        _engine = create_engine(settings.sqlalchemy_uri, **options)
+        if settings.metrics_enabled:
+            instrument_engine(_engine)
+        if settings.tracing_exporter != "none":
+            tracing.instrument_engine(_engine)
+    return _engine
+
+
+def dispose_engine(close: bool = True) -> None:
+    """
+    Drop the engine of the current process, next use creates a new one
+    :param close: If False the pooled connections are left untouched, used in the forked child
+    as the connections belong to the parent process
+    :return:
+    """
+    global _engine
+    if _engine is not None:
+        _engine.dispose(close=close)
+        _engine = None
+
+
+def sql_alchemy_session_factory() -> Session:
+    """
+    Returns new SQLAlchemy Session bound to the engine of the current process
+    """
+    return _session_maker(bind=get_engine())
+
+
+# Forked workers create their own engine
+os.register_at_fork(after_in_child=lambda: dispose_engine(close=False))
 
 
 def get_backend() -> BaseBackend:
@@ -51,6 +103,92 @@ def get_backend() -> BaseBackend:
     return backend
 
 
+def warm_up_database() -> None:
+    """Open the pool connections and compile the hot lookups before the first request"""
+    settings = get_settings()
+    engine = get_engine()
+    connections = [engine.connect() for _ in range(max(1, min(settings.db_warmup_connections, settings.db_pool_size)))]
+    try:
+        session = _session_maker(bind=connections[0])
+        prime_statements(session)
+        session.close()
+    finally:
+        # Back to the pool
+        for connection in connections:
+            connection.close()
+
+
+def check_indexes() -> None:
+    """Warn about the indexes expected by the repositories but missing in the database"""
+    check_repository_indexes(get_engine())
+
+
+def probe_database() -> dict:
+    """Readiness of the database, an exhausted connection pool is reported as degraded without waiting for it"""
+    settings = get_settings()
+    engine = get_engine()
+    details = {}
+    if isinstance(engine.pool, QueuePool):
+        details = dict(pool_size=engine.pool.size(), checked_out=engine.pool.checkedout())
+        if engine.pool.checkedout() >= engine.pool.size() + settings.db_max_overflow:
+            return dict(details, degraded=True)
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+    return details
+
+
+def ping_backend() -> None:
+    inject.instance(BaseBackend).ping()
+
+
+def close_backend() -> None:
+    conn = getattr(inject.instance(BaseBackend), "conn", None)
+    if conn is not None:
+        # Redis pool checks the process id, so it is never reused across fork, just close the connections
+        conn.connection_pool.disconnect()
+
+
+async def start_audit() -> None:
+    await inject.instance(AuditTrail).start()
+
+
+async def stop_audit() -> None:
+    """Write the audit events still queued before the engine is disposed"""
+    await inject.instance(AuditTrail).stop()
+
+
+async def start_outbox() -> None:
+    await inject.instance(OutboxRelay).start()
+
+
+async def stop_outbox() -> None:
+    """Events left in the table are published by the relay of the next worker"""
+    await inject.instance(OutboxRelay).stop()
+
+
+def configure_resources(resources: ResourceRegistry) -> None:
+    """
+    Register the resources of each worker process, they are created after the fork
+    :param resources:
+    :return:
+    """
+    resources.register(
+        "database", startup=get_engine, warmup=warm_up_database, shutdown=dispose_engine, probe=probe_database
+    )
+    resources.register("indexes", warmup=check_indexes)
+    resources.register("redis", warmup=ping_backend, shutdown=close_backend, probe=ping_backend)
+    # Registered after the database, so it is stopped first
+    resources.register("audit", startup=start_audit, shutdown=stop_audit)
+    if get_settings().outbox_enabled:
+        # Registered after the database and Redis, it uses both
+        resources.register("outbox", startup=start_outbox, shutdown=stop_outbox)
+    if get_settings().event_service_base_url:
+        # aiohttp is needed only when the service talks to the other microservices
+        from metagrim_common.service.communication import ServiceCommunication
+
+        resources.register("event-service", probe=ServiceCommunication().probe, critical=False)
+
+
 def configure_dependency(binder: inject.Binder):
     # bind instances
     binder.bind(CoreSettings, get_settings())
@@ -58,7 +196,16 @@ def configure_dependency(binder: inject.Binder):
 
     # Singleton Error configuration
     binder.bind_to_constructor(ErrorConfig, ErrorConfig)
+    # Process wide user read cache, it keeps the hit rate counters
+    binder.bind_to_constructor(UserReadCache, UserReadCache)
+    # Process wide queue of the audit events, written by the background task of the worker
+    binder.bind_to_constructor(AuditTrail, AuditTrail)
+    # Publishes the committed outbox events, started by the worker
+    binder.bind_to_constructor(OutboxRelay, OutboxRelay)
+    # Stateless repositories over the shared backend
+    binder.bind_to_constructor(TokenRedisRepository, TokenRedisRepository)
+    binder.bind_to_constructor(UserActionsRedisRepository, UserActionsRedisRepository)
 
     # Always return the new SQLAlchemy Session
-    binder.bind_to_provider(Session, sql_alchemy_session_factory())
+    binder.bind_to_provider(Session, sql_alchemy_session_factory)
     binder.bind_to_provider(UnitOfWork, UnitOfWork)
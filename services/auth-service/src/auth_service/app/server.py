@@ -0,0 +1,111 @@
+"""Production server launcher
+
+Runs the application with the worker processes configured by the settings:
+
+* `APP_SERVER=uvicorn` starts uvicorn, with `APP_WORKERS` > 1 the workers are spawned by uvicorn
+  and each of them imports the application on its own.
+* `APP_SERVER=gunicorn` starts gunicorn with the uvicorn workers, with `APP_PRELOAD` the application is
+  imported once in the master and the workers are forked from it, which makes spawning the workers fast.
+
+In both cases the database engine and the other per worker resources are created by the startup hooks
+of each worker (see `auth_service.app.dependency`), so nothing is shared across the fork.
+On SIGTERM the server stops accepting connections, gives the in-flight requests `APP_GRACEFUL_TIMEOUT`
+seconds to finish and runs the shutdown hooks.
+"""
+import logging
+import os
+import typing
+
+import uvicorn  # type: ignore
+from auth_service.app.dependency import get_settings
+from auth_service.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+APP = "auth_service.app.bootstrap:api"
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+    from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        """Uvicorn worker with the event loop and HTTP parser selected by the settings"""
+
+        CONFIG_KWARGS: typing.Dict[str, typing.Any] = {
+            "loop": get_settings().app_loop,
+            "http": get_settings().app_http,
+            # Finish before gunicorn kills the worker, so the shutdown hooks can run
+            "timeout_graceful_shutdown": max(get_settings().app_graceful_timeout - 1, 1),
+        }
+
+    class GunicornServer(BaseApplication):
+        def __init__(self, app_uri: str, options: typing.Dict[str, typing.Any]):
+            self.app_uri = app_uri
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(self.app_uri)
+
+except ImportError:  # pragma: no cover
+    # gunicorn is optional, uvicorn is used without it
+    GunicornServer = None
+
+
+def child_exit(server, worker) -> None:
+    """Drop the live metrics of the exited worker from the shared metrics directory"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def run_gunicorn(settings: Settings) -> None:
+    if GunicornServer is None:
+        raise RuntimeError("gunicorn is not installed, install it or set APP_SERVER=uvicorn")
+    options = {
+        "bind": f"{settings.app_host}:{settings.app_port}",
+        "workers": settings.app_workers,
+        "worker_class": f"{__name__}.Worker",
+        "preload_app": settings.app_preload,
+        "graceful_timeout": settings.app_graceful_timeout,
+        "keepalive": settings.app_keepalive,
+    }
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        options["child_exit"] = child_exit
+    logger.info(f"Starting gunicorn with {options}")
+    GunicornServer(APP, options).run()
+
+
+def run_uvicorn(settings: Settings) -> None:
+    if settings.can_reload:
+        # Development server
+        uvicorn.run(APP, host=settings.app_host, port=settings.app_port, reload=True)
+        return
+    uvicorn.run(
+        APP,
+        host=settings.app_host,
+        port=settings.app_port,
+        workers=settings.app_workers,
+        loop=settings.app_loop,
+        http=settings.app_http,
+        timeout_keep_alive=settings.app_keepalive,
+        timeout_graceful_shutdown=settings.app_graceful_timeout,
+    )
+
+
+def run(settings: Settings | None = None) -> None:
+    """
+    Start the server selected by the settings
+    :param settings:
+    :return:
+    """
+    settings = settings or get_settings()
+    if settings.app_server == "gunicorn" and not settings.can_reload:
+        run_gunicorn(settings)
+    else:
+        run_uvicorn(settings)
@@ -4,11 +4,13 @@ import inject
 from auth_service import constants
 from auth_service.api.schema.login import AuthResponse
 from auth_service.service.unit_of_work import UnitOfWork
+from metagrim_common.base import app_context
 from metagrim_common.base.error import ApplicationError
+from metagrim_common.base.scopes import encode_scopes
 from metagrim_common.base.settings import CoreSettings
 from metagrim_common.base.utils import create_access_token
 from metagrim_common.base.utils import verify_password
-from metagrim_common.domains import User
+from metagrim_common.enums import AuditEventEnum
 from metagrim_common.enums import UserStatusEnum
 from metagrim_common.schema import JWTUser
 from metagrim_common.service.base import BaseService
@@ -22,7 +24,7 @@ class AuthenticatorService(BaseService):
         super(AuthenticatorService, self).__init__(current_user_id=current_user_id)
         self.uow: UnitOfWork = uow
         self.uow.current_user_id = current_user_id
-        self.settings: CoreSettings = inject.get_injector().get_instance(CoreSettings)
+        self.settings: CoreSettings = app_context.current.settings
 
     async def verify_password(self, email: str, password: str) -> AuthResponse:
         async with self.uow:
@@ -36,9 +38,7 @@ class AuthenticatorService(BaseService):
 
             if user and verify_password(password, user.password_hash):
                 access = {}
-                # Update this code to pull actions from user_actions table
-                user_domain = User.model_validate(user)
-                scopes = user_domain.user_actions
+                scopes = encode_scopes(await self.uow.user_actions.get_actions(user.id))
                 data = JWTUser(
                     id=str(user.id),
                     email=user.email,
@@ -53,6 +53,7 @@ class AuthenticatorService(BaseService):
                 access["user_id"] = str(user.id)
                 access["is_revoked"] = False
                 self.uow.tokens.add_token(str(user.id), access)
+                await self.uow.audit.record(AuditEventEnum.login, entity_id=user.id, actor_id=user.id)
                 return AuthResponse(
                     email=user.email,
                     mobile=user.mobile,
@@ -63,6 +64,7 @@ class AuthenticatorService(BaseService):
                     last_name=user.last_name,
                 )
 
+            await self.uow.audit.record(AuditEventEnum.login_failed, entity_id=user.id, actor_id=user.id)
             raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="User password is wrong")
 
     async def logout(self) -> None:
@@ -71,3 +73,4 @@ class AuthenticatorService(BaseService):
         """
         async with self.uow:
             self.uow.tokens.delete(self.current_user_id)
+            await self.uow.audit.record(AuditEventEnum.logout, entity_id=self.current_user_id)
@@ -1,25 +1,56 @@
+import inject
+from metagrim_common.base.context_vars import get_identity_map
 from metagrim_common.domains import User
 from metagrim_common.repository import UserSqlAlchemyRepository
+from metagrim_common.service.audit import AuditTrail
 from metagrim_common.service.unit_of_work import SqlAlchemyUnitOfWork
+from metagrim_common.service.user_cache import UserReadCache
+from pydantic import UUID4
 
 
 class UnitOfWork(SqlAlchemyUnitOfWork):
-    def __init__(self, *args, **kwargs):
+    users: UserSqlAlchemyRepository = None
+
+    def __init__(self, *args, user_cache: UserReadCache | None = None, audit: AuditTrail | None = None, **kwargs):
         """
         Initialise the Unit of Work object
         :param args:
+        :param user_cache: Process wide user read cache, resolved from the injector if not given
+        :param audit: Process wide audit trail, resolved from the injector if not given
         :param kwargs:
         """
         super(UnitOfWork, self).__init__(*args, **kwargs)
+        self.user_cache: UserReadCache = user_cache if user_cache is not None else inject.instance(UserReadCache)
+        self.audit: AuditTrail = audit if audit is not None else inject.instance(AuditTrail)
 
     async def __aenter__(self):
         """Start Asynchronous context manager"""
+        # Repositories are initialized by the parent after connecting to DB
         await super(UnitOfWork, self).__aenter__()
 
-        # initialize repositories after connecting to DB
-        self.users = UserSqlAlchemyRepository(self.session)
-
-        if self.current_user_id and (not self.current_user or self.current_user.id != self.current_user_id):
+        if self.current_user_id and (not self.current_user or str(self.current_user.id) != str(self.current_user_id)):
             # Load current user
-            user = await self.users.get(self.current_user_id)
-            self.current_user: User = User.model_validate(user)
+            self.current_user: User = await self.get_user(self.current_user_id)
+        return self
+
+    async def get_user(self, user_id: UUID4 | str) -> User | None:
+        """
+        Returns the user domain, reusing the one already built within the current request
+        or cached by the user read cache
+        :param user_id:
+        :return:
+        """
+        identity_map = get_identity_map()
+        if identity_map is not None:
+            user = identity_map.get_domain(User, user_id)
+            if user is not None:
+                return user
+
+        user = await self.user_cache.get_or_load(user_id, self._load_user)
+        if user is not None and identity_map is not None:
+            identity_map.add_domain(user_id, user)
+        return user
+
+    async def _load_user(self, user_id: UUID4 | str) -> User | None:
+        record = await self.users.get(user_id)
+        return User.model_validate(record) if record else None
@@ -5,15 +5,24 @@ from typing import Dict
 import inject
 from auth_service import constants
 from auth_service.service.unit_of_work import UnitOfWork
+from metagrim_common.base import app_context
 from metagrim_common.base.error import ApplicationError
 from metagrim_common.domains import SearchPaginatedParameters
 from metagrim_common.domains import User
-from metagrim_common.enums import UserStatusEnum
+from metagrim_common.enums import AuditEventEnum
+from metagrim_common.enums import UserEventEnum
 from metagrim_common.service.base import BaseService
 from pydantic import UUID4
 
 
 class UserService(BaseService):
+    # Columns returned by the user listing, matches the `UserBriefSchema`
+    list_projection = ("id", "email", "user_type", "first_name", "last_name", "status", "version")
+    # Columns of the user export, also the `UserExportOrderEnum` the export can be sorted by
+    export_projection = ("id", "email", "mobile", "user_type", "first_name", "last_name", "status", "created_at")
+    # Outbox topic of the user changes, published to the other services
+    event_topic = "user"
+
     @inject.autoparams("uow")
     def __init__(self, uow: UnitOfWork, current_user_id: str = None):
         """
@@ -31,17 +40,37 @@ class UserService(BaseService):
         :param paginate:
         :return:
         """
-        result = []
         async with self.uow:
             paginated = await self.uow.users.get_paginated_result(
                 **paginate.model_dump(exclude_none=True),
                 excluded_ids=[self.uow.current_user_id],  # Excluding logged in user from the listing & search
+                projection=self.list_projection,
             )
-            for item in paginated.get("data", []) or []:
-                result.append(User.model_validate(item).model_dump())
-            paginated["data"] = result
+            # Actions of the whole page with one statement instead of one per user
+            actions = await self.uow.user_actions.get_actions_by_users([row["id"] for row in paginated["data"]])
+        for row in paginated["data"]:
+            row["user_actions"] = actions[str(row["id"])]
         return paginated
 
+    async def export_users(
+        self, filters: SearchPaginatedParameters, batch_size: int | None = None
+    ) -> typing.AsyncIterator[typing.List[typing.Tuple]]:
+        """
+        Stream the users matching with given filters in batches of rows of `export_projection` columns
+        :param filters: Paging parameters are ignored
+        :param batch_size: Rows per batch, defaults to the `export_batch_size` setting
+        :return:
+        """
+        batch_size = batch_size or app_context.current.settings.export_batch_size
+        async with self.uow:
+            async for rows in self.uow.users.stream(
+                projection=self.export_projection,
+                batch_size=batch_size,
+                excluded_ids=[self.uow.current_user_id],  # Excluding logged in user as in the listing
+                **filters.model_dump(exclude_none=True, exclude={"page", "page_size"}),
+            ):
+                yield rows
+
     async def create_user(self, user: User, requested_actions: typing.List[str]):
         """
         Create new User
@@ -54,32 +83,49 @@ class UserService(BaseService):
                 raise ApplicationError(
                     response_code=constants.HTTP_409_CONFLICT, message="User already exists with Email"
                 )
-            new_user = await self.uow.users.add(user.model_dump(exclude_none=True, exclude_related=True))
-            user = User.model_validate(new_user)
+            # Generated and server default values are returned by the insert itself
+            record = await self.uow.users.insert_returning(user.model_dump(exclude_none=True, exclude_related=True))
+            user = User.model_validate(record)
+            self.uow.publish(
+                self.event_topic,
+                UserEventEnum.created,
+                entity_id=user.id,
+                **user.model_dump(mode="json", exclude={"id"}, exclude_related=True),
+            )
 
             self.uow.commit()
+            await self.uow.audit.record(AuditEventEnum.user_created, entity_id=user.id, email=user.email)
             return user
 
     async def update_user(self, user: User, requested_actions: typing.List[str] | None) -> User:
         """
-        Update User details
-        :param user:
+        Update User details, without reading the user first
+        :param user: Changed fields, with the version they are based on if the edits must not overwrite each other
         :param requested_actions:
         :return:
         """
         async with self.uow:
-            record = await self.uow.users.get(user.id)
             if await self.uow.users.check_user_exists(email=user.email, mobile=user.mobile, id_=user.id):
                 raise ApplicationError(
                     response_code=constants.HTTP_409_CONFLICT, message="User already exists with Email or Mobile."
                 )
-            user_rec = User.model_validate(record)
-            user_rec = user_rec + user.model_dump(exclude_unset=True, exclude_related=True)
-            data = user_rec.model_dump(exclude_unset=True, exclude_related=True)
-            await self.uow.users.update_by(values=data, where={"id": user.id})
+            changes = user.model_dump(mode="json", exclude_unset=True, exclude={"id", "version"}, exclude_related=True)
+            # Empty values do not override the stored ones, as when the domains are added
+            changes = {key: value for key, value in changes.items() if value}
+            record = await self.uow.users.update_version(user.id, changes, version=user.version)
+            if record is None:
+                if user.version is not None and await self.uow.users.get(user.id, eager_load=()):
+                    raise ApplicationError(
+                        response_code=constants.HTTP_409_CONFLICT,
+                        message="User is changed by another request, reload it and try again.",
+                    )
+                raise ApplicationError(response_code=constants.HTTP_404_NOT_FOUND, message="User not found")
 
-            if requested_actions:
-                allowed_actions = user_rec.user_actions
+            if requested_actions is None:
+                allowed_actions = await self.uow.user_actions.get_actions(user.id)
+            else:
+                # Changes are based on the actions in the transaction, the cached ones may be stale
+                allowed_actions = await self.uow.user_actions.load_actions(user.id)
                 user_actions_to_add = list(set(requested_actions) - set(allowed_actions))
                 user_actions_to_remove = list(set(allowed_actions) - set(requested_actions))
                 if user_actions_to_add:
@@ -88,12 +134,28 @@ class UserService(BaseService):
                 if user_actions_to_remove:
                     # Add the user remove
                     await self.uow.user_actions.remove_user_action(user_id=user.id, actions=user_actions_to_remove)
+                allowed_actions = sorted(set(requested_actions))
+
+            actions = sorted(requested_actions) if requested_actions is not None else None
+            self.uow.publish(
+                self.event_topic,
+                UserEventEnum.updated,
+                entity_id=user.id,
+                **changes,
+                actions=actions,
+                version=record["version"],
+            )
 
             self.uow.commit()
-            # Get Updated values
-            self.uow.users.refresh(record)
-            user_rec = User.model_validate(record)
-            return user_rec
+            self.uow.user_cache.invalidate(user.id)
+            if requested_actions is not None:
+                # Readers may have cached the old actions before the commit
+                self.uow.user_actions.invalidate(user.id)
+            await self.uow.audit.record(
+                AuditEventEnum.user_updated, entity_id=user.id, fields=sorted(changes), actions=actions
+            )
+            # Updated values are returned by the update itself
+            return User.model_validate({**record, "user_actions": allowed_actions})
 
     async def get_user(self, user_id: UUID4) -> User:
         """
@@ -102,9 +164,9 @@ class UserService(BaseService):
         :return:
         """
         async with self.uow:
-            record = await self.uow.users.get(user_id)
-            if record:
-                return User.model_validate(record)
+            user = await self.uow.get_user(user_id)
+            if user:
+                return user
             else:
                 raise ApplicationError(response_code=constants.HTTP_404_NOT_FOUND, message="User not found")
 
@@ -115,28 +177,31 @@ class UserService(BaseService):
         :return:
         """
         async with self.uow:
-            record = await self.uow.users.get(user_id)
+            record = await self.uow.users.soft_delete_returning(user_id, projection=("id", "version"))
             if not record:
                 raise ApplicationError(response_code=constants.HTTP_404_NOT_FOUND, message="User not found")
-            else:
-                await self.uow.users.delete(user_id)
-                self.uow.commit()
+            self.uow.publish(self.event_topic, UserEventEnum.deleted, entity_id=user_id, version=record["version"])
+            self.uow.commit()
+            self.uow.user_cache.invalidate(user_id)
+            await self.uow.audit.record(AuditEventEnum.user_deleted, entity_id=user_id)
 
     async def change_user_status(self, user_id: UUID4) -> User:
         """
         Toggle User Status
         from Active to Inactive or Inactive to Active
         :param user_id:
-        :return:
+        :return: Updated user, its actions are not loaded
         """
         async with self.uow:
-            record = await self.uow.users.get(user_id)
+            record = await self.uow.users.toggle_status(user_id)
             if not record:
                 raise ApplicationError(response_code=constants.HTTP_404_NOT_FOUND, message="User not found")
-            record = User.model_validate(record)
-            if record.status == UserStatusEnum.active:
-                await self.uow.users.update_by(values={"status": UserStatusEnum.inactive}, where={"id": user_id})
-            else:
-                await self.uow.users.update_by(values={"status": UserStatusEnum.active}, where={"id": user_id})
+            user = User.model_validate(record)
+            status = user.status.value
+            self.uow.publish(
+                self.event_topic, UserEventEnum.status_changed, entity_id=user_id, status=status, version=user.version
+            )
             self.uow.commit()
-            return record
+            self.uow.user_cache.invalidate(user_id)
+            await self.uow.audit.record(AuditEventEnum.user_status_changed, entity_id=user_id, status=status)
+            return user
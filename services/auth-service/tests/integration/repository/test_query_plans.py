@@ -0,0 +1,49 @@
+"""Query plan regression suite of the repositories.
+
+Runs on in-memory SQLite by default, set `QUERY_PLAN_DATABASE_URI` to a Postgres database
+to check the plans there as well. `QUERY_PLAN_ROWS` sets the number of seeded users (10k by default).
+"""
+import os
+
+import pytest
+from benchmarks.query_plans import check_shape
+from benchmarks.query_plans import create_plan_engine
+from benchmarks.query_plans import Expect
+from benchmarks.query_plans import seed
+from benchmarks.query_plans import SHAPES
+
+ROWS = int(os.environ.get("QUERY_PLAN_ROWS", 10_000))
+DATABASES = ["sqlite", os.environ.get("QUERY_PLAN_DATABASE_URI")]
+
+
+@pytest.fixture(scope="module", params=DATABASES, ids=["sqlite", "postgresql"])
+def seeded(request):
+    if request.param is None:
+        pytest.skip("QUERY_PLAN_DATABASE_URI is not set")
+    engine = create_plan_engine(None if request.param == "sqlite" else request.param)
+    sample = seed(engine, ROWS)
+    yield engine, sample
+    engine.dispose()
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("shape", SHAPES, ids=[shape.name for shape in SHAPES])
+async def test_query_plan(seeded, shape):
+    engine, sample = seeded
+    plans, _ = await check_shape(engine, shape, sample)
+    problems = [problem for plan, expect in zip(plans, shape.expects) for problem in plan.violations(expect)]
+    assert not problems, f"{shape.name}: {problems}"
+
+
+@pytest.mark.integration
+async def test_missing_index_is_detected(seeded):
+    engine, sample = seeded
+    shape = next(shape for shape in SHAPES if shape.name == "stream")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_demo_user_active_created_at_id")
+    try:
+        plans, _ = await check_shape(engine, shape, sample)
+        assert plans[0].violations(Expect(index="ix_demo_user_active_created_at_id"))
+    finally:
+        # Restore the seeded schema for the other tests of the module
+        seed(engine, ROWS)
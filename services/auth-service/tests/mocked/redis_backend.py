@@ -1,3 +1,5 @@
+import math
+import time
 from typing import Any
 from typing import Dict
 
@@ -16,7 +18,34 @@ class MockedRedisConnection:
         self.store[key] = value
 
     def get(self, key, **kwargs):
-        self.store.get(key)
+        return self.store.get(key)
+
+    def mget(self, keys, *args):
+        return [self.store.get(key) for key in keys]
+
+    def incr(self, key, amount=1):
+        value = int(self.store.get(key) or 0) + amount
+        # Read back as bytes, as from Redis
+        self.store[key] = str(value).encode()
+        return value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def register_script(self, script):
+        def gcra(keys, args):
+            # Same algorithm as the Lua script of `RedisBackend.rate_limit`
+            interval, tolerance = args
+            now = time.time() * 1000
+            arrivals = [max(self.store.get(key) or now, now) + interval for key in keys]
+            wait = max(arrival - tolerance - now for arrival in arrivals)
+            if wait > 0:
+                return math.ceil(wait)
+            self.store.update(zip(keys, arrivals))
+            return 0
+
+        return gcra
 
 
 class MockedRedisBackend(RedisBackend):
@@ -2,7 +2,9 @@ import uuid
 
 from faker import Faker
 from faker_sqlalchemy import SqlAlchemyProvider
+from metagrim_common.enums import UserActionEnum
 from metagrim_common.model.user import UserModel
+from metagrim_common.repository import UserActionsSqlAlchemyRepository
 from metagrim_common.repository import UserSqlAlchemyRepository
 
 
@@ -50,3 +52,25 @@ class MockedUserSqlAlchemyRepository(UserSqlAlchemyRepository):
             instance.actions = []
         instance.id = uuid.uuid4()
         return instance
+
+
+class MockedUserActionsSqlAlchemyRepository(UserActionsSqlAlchemyRepository):
+    """Mocked User Actions Repository."""
+
+    async def get_actions(self, user_id):
+        """Mocked Method
+        Original implementation can be seen `metagrim_common.repository.UserActionsSqlAlchemyRepository.get_actions`
+
+        :param user_id:
+        :return: Every user is allowed to list and read the users
+        """
+        return [UserActionEnum.user_list.value, UserActionEnum.user_read.value]
+
+    async def load_actions(self, user_id):
+        """Mocked Method
+        Original implementation can be seen `metagrim_common.repository.UserActionsSqlAlchemyRepository.load_actions`
+
+        :param user_id:
+        :return:
+        """
+        return await self.get_actions(user_id)
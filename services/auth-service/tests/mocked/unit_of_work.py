@@ -1,4 +1,5 @@
 from auth_service.service.unit_of_work import UnitOfWork
+from tests.mocked.repository.user import MockedUserActionsSqlAlchemyRepository
 from tests.mocked.repository.user import MockedUserSqlAlchemyRepository
 
 
@@ -6,10 +7,12 @@ class MockedUnitOfWork(UnitOfWork):
     """Mocked Unit of work, will hold the all mocked repositories."""
 
     users: MockedUserSqlAlchemyRepository
+    user_actions: MockedUserActionsSqlAlchemyRepository
 
     async def __aenter__(self):
         # Ass the mocked repositories, don't call the parent here, as we want to instantiate the mocked repos
         self.users = MockedUserSqlAlchemyRepository(self.session)
+        self.user_actions = MockedUserActionsSqlAlchemyRepository(self.session)
 
     def rollback(self):
         """Mocked function."""
@@ -0,0 +1,82 @@
+import httpx
+import inject
+import pytest
+from fastapi import Depends
+from metagrim_common.base import utils
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.deps import get_authorised_user
+from metagrim_common.base.deps import get_token_store
+from metagrim_common.base.deps import require_actions
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.scopes import compile_actions
+from metagrim_common.base.scopes import encode_scopes
+from metagrim_common.base.scopes import parse_scopes
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.enums import UserActionEnum
+
+
+def token(user_type: str = "CASHIER", actions=()) -> str:
+    payload = {"sub": "user-1", "id": "user-1", "name": "User", "email": "user@gc.com", "user_type": user_type}
+    return utils.create_access_token({**payload, "scopes": encode_scopes(actions)})
+
+
+@pytest.fixture(scope="function")
+async def client():
+    resources = ResourceRegistry()
+    resources.ready = True
+    api = create_app(inject.instance(CoreSettings), resources=resources)
+
+    async def list_users():
+        return {}
+
+    async def export_users(user_id: str = Depends(get_authorised_user)):
+        return {"user_id": user_id}
+
+    api.add_api_route("/users", list_users, dependencies=[Depends(require_actions(UserActionEnum.user_list))])
+    api.add_api_route(
+        "/export",
+        export_users,
+        dependencies=[Depends(require_actions(UserActionEnum.user_list, UserActionEnum.user_export, "master_data"))],
+    )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.unit
+def test_action_set_covers_required_actions():
+    granted = parse_scopes(encode_scopes(["USER_LIST", "USER_READ", "master_data"]))
+    assert granted.covers(compile_actions([UserActionEnum.user_list]))
+    assert granted.covers(compile_actions(["USER_READ", "master_data"]))
+    assert not granted.covers(compile_actions(["USER_LIST", "USER_EXPORT"]))
+    assert not granted.covers(compile_actions(["reports"]))
+    assert granted.names() == ["USER_LIST", "USER_READ", "master_data"]
+
+
+@pytest.mark.unit
+async def test_route_requires_actions_of_token(client):
+    headers = {"Authorization": f"Bearer {token(actions=['USER_LIST'])}"}
+    assert (await client.get("/users", headers=headers)).status_code == 200
+
+    response = await client.get("/users", headers={"Authorization": f"Bearer {token(actions=['USER_READ'])}"})
+    assert response.status_code == 403
+    assert (await client.get("/users")).status_code == 401
+
+
+@pytest.mark.unit
+async def test_admin_is_allowed_without_actions(client):
+    response = await client.get("/users", headers={"Authorization": f"Bearer {token('ADMIN')}"})
+    assert response.status_code == 200
+
+
+@pytest.mark.unit
+async def test_token_is_decoded_once_per_request(client, monkeypatch):
+    decoded = []
+    decode_token = utils.decode_token
+    monkeypatch.setattr(utils, "decode_token", lambda *args: decoded.append(1) or decode_token(*args))
+    get_token_store().backend.set_dict("user-1", {"t_type": "access"})
+    actions = ["USER_LIST", "USER_EXPORT", "master_data"]
+
+    response = await client.get("/export", headers={"Authorization": f"Bearer {token(actions=actions)}"})
+    assert response.status_code == 200
+    assert response.json() == {"user_id": "user-1"}
+    assert len(decoded) == 1
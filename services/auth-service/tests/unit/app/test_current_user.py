@@ -0,0 +1,58 @@
+import asyncio
+
+import httpx
+import inject
+import pytest
+from fastapi import Depends
+from fastapi.responses import StreamingResponse
+from metagrim_common.base import utils
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.context_vars import get_current_user_uuid
+from metagrim_common.base.deps import get_authorised_user
+from metagrim_common.base.deps import get_token_store
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+
+
+def login(user_id: str) -> dict:
+    get_token_store().backend.set_dict(user_id, {"t_type": "access"})
+    return {"Authorization": f"Bearer {utils.create_access_token({'sub': user_id})}"}
+
+
+@pytest.fixture(scope="function")
+async def client():
+    resources = ResourceRegistry()
+    resources.ready = True
+    api = create_app(inject.instance(CoreSettings), resources=resources)
+
+    async def whoami(user_id: str = Depends(get_authorised_user)):
+        # Concurrent requests interleave here
+        await asyncio.sleep(0.01)
+        return {"user_id": user_id, "current_user": get_current_user_uuid()}
+
+    async def export(user_id: str = Depends(get_authorised_user)):
+        async def rows():
+            await asyncio.sleep(0)
+            yield get_current_user_uuid()
+
+        return StreamingResponse(rows())
+
+    api.add_api_route("/whoami", whoami)
+    api.add_api_route("/export", export)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.unit
+async def test_current_user_is_scoped_to_request(client):
+    users = [f"user-{index}" for index in range(5)]
+    responses = await asyncio.gather(*[client.get("/whoami", headers=login(user)) for user in users])
+    assert [response.json() for response in responses] == [{"user_id": user, "current_user": user} for user in users]
+    # Nothing leaks to the caller
+    assert get_current_user_uuid() is None
+
+
+@pytest.mark.unit
+async def test_current_user_lasts_until_response_is_sent(client):
+    response = await client.get("/export", headers=login("user-1"))
+    assert response.text == "user-1"
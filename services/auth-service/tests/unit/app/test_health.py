@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+import inject
+import pytest
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.health import HealthCheck
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.enums import HealthStatusEnum
+
+
+class Probe:
+    def __init__(self, result=None, error: Exception | None = None, delay: float = 0.0):
+        self.result = result
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def create_registry(**probes) -> ResourceRegistry:
+    resources = ResourceRegistry()
+    for name, (probe, critical) in probes.items():
+        resources.register(name, probe=probe, critical=critical)
+    resources.ready = True
+    return resources
+
+
+@pytest.mark.unit
+async def test_dependency_states():
+    resources = create_registry(
+        database=(Probe({"checked_out": 15, "degraded": True}), True),
+        redis=(Probe(), True),
+        slow=(Probe(delay=0.05), True),
+        events=(Probe(error=ConnectionError("refused")), False),
+    )
+    result = await HealthCheck(resources, degraded_latency_ms=30).check()
+
+    statuses = {d.name: d.status for d in result.dependencies}
+    assert statuses == {
+        "database": HealthStatusEnum.degraded,
+        "redis": HealthStatusEnum.ok,
+        "slow": HealthStatusEnum.degraded,
+        "events": HealthStatusEnum.down,
+    }
+    assert result.dependencies[0].details == {"checked_out": 15}
+    assert result.dependencies[3].error == "refused"
+    # Non critical dependency being down only degrades the worker
+    assert result.status == HealthStatusEnum.degraded
+
+
+@pytest.mark.unit
+async def test_critical_dependency_timeout():
+    resources = create_registry(database=(Probe(delay=1), True), redis=(Probe(), True))
+    result = await HealthCheck(resources, probe_timeout=0.05).check()
+
+    assert result.status == HealthStatusEnum.down
+    assert result.dependencies[0].status == HealthStatusEnum.down
+    assert "timed out" in result.dependencies[0].error
+
+
+@pytest.mark.unit
+async def test_probes_are_cached_and_shared():
+    probe = Probe(delay=0.01)
+    health = HealthCheck(create_registry(database=(probe, True)), cache_ttl=60)
+
+    results = await asyncio.gather(*(health.check() for _ in range(10)))
+    await health.check()
+
+    assert probe.calls == 1
+    assert all(r is results[0] for r in results)
+
+
+@pytest.mark.unit
+async def test_readyz_and_livez():
+    probe = Probe(error=ConnectionError("refused"))
+    resources = ResourceRegistry()
+    resources.register("database", probe=probe)
+    api = create_app(inject.instance(CoreSettings), resources=resources)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+        # Not warmed up yet
+        response = await client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        assert probe.calls == 0
+
+        resources.ready = True
+        response = await client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["dependencies"][0]["status"] == "DOWN"
+
+        # Liveness does not depend on the dependencies
+        response = await client.get("/livez")
+        assert response.status_code == 200
+        assert response.json()["status"] == "OK"
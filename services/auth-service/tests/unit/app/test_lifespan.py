@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import inject
+import pytest
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+
+
+def create_registry(calls: list, warmup_started: asyncio.Event, warmup_release: asyncio.Event) -> ResourceRegistry:
+    async def warm_up_cache():
+        warmup_started.set()
+        await warmup_release.wait()
+        calls.append("warmup cache")
+
+    def failing_warmup():
+        calls.append("warmup redis")
+        raise ConnectionError("redis is down")
+
+    resources = ResourceRegistry()
+    resources.register(
+        "database", startup=lambda: calls.append("start database"), shutdown=lambda: calls.append("stop database")
+    )
+    resources.register("cache", warmup=warm_up_cache)
+    resources.register("redis", warmup=failing_warmup, shutdown=lambda: calls.append("stop redis"))
+    return resources
+
+
+@pytest.mark.unit
+async def test_healthz_waits_for_warmup():
+    calls = []
+    warmup_started, warmup_release = asyncio.Event(), asyncio.Event()
+    resources = create_registry(calls, warmup_started, warmup_release)
+    api = create_app(inject.instance(CoreSettings), resources=resources)
+
+    transport = httpx.ASGITransport(app=api)
+    async with resources.lifespan(api), httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert calls == ["start database"]
+        await warmup_started.wait()
+        # Cold replica is not ready
+        assert (await client.get("/healthz")).status_code == 503
+
+        warmup_release.set()
+        await resources.wait_until_ready()
+        assert (await client.get("/healthz")).status_code == 200
+        # Failed warmup is reported but does not keep the worker unready
+        assert resources.errors == {"redis": "redis is down"}
+        assert sorted(calls[1:]) == ["warmup cache", "warmup redis"]
+
+    assert not resources.ready
+    assert calls[-2:] == ["stop redis", "stop database"]
+
+
+@pytest.mark.unit
+async def test_shutdown_cancels_running_warmup():
+    calls = []
+    warmup_started, warmup_release = asyncio.Event(), asyncio.Event()
+    resources = create_registry(calls, warmup_started, warmup_release)
+
+    await resources.startup()
+    await warmup_started.wait()
+    await resources.shutdown()
+
+    assert "warmup cache" not in calls
+    assert calls[-2:] == ["stop redis", "stop database"]
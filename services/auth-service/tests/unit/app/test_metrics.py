@@ -0,0 +1,90 @@
+import httpx
+import inject
+import pytest
+from fastapi import FastAPI
+from metagrim_common.base import metrics
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.unit
+async def test_request_metrics_per_route():
+    resources = ResourceRegistry()
+    resources.ready = True
+    api = create_app(inject.instance(CoreSettings), resources=resources)
+    before = sample("http_requests_total", method="GET", route="/healthz", status="200")
+    unmatched = sample("http_requests_total", method="GET", route=metrics.UNMATCHED_ROUTE, status="404")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+        await client.get("/healthz")
+        await client.get("/healthz")
+        await client.get("/does-not-exist")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert sample("http_requests_total", method="GET", route="/healthz", status="200") == before + 2
+    assert sample("http_requests_total", method="GET", route=metrics.UNMATCHED_ROUTE, status="404") == unmatched + 1
+    assert 'http_request_duration_seconds_count{method="GET",route="/healthz"}' in response.text
+
+
+
+@pytest.mark.unit
+async def test_unmatched_methods_do_not_grow_the_table():
+    api = FastAPI()
+    table = metrics.RouteMetricsTable()
+    table.bind(api.routes)
+    size = len(table)
+    before = sample("http_requests_total", method="OTHER", route=metrics.UNMATCHED_ROUTE, status="404")
+
+    app = metrics.MetricsMiddleware(api, table=table)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for index in range(50):
+            await client.request(f"X{index}", "/nothing")
+
+    assert len(table) == size
+    assert sample("http_requests_total", method="OTHER", route=metrics.UNMATCHED_ROUTE, status="404") == before + 50
+
+@pytest.mark.unit
+def test_engine_queries_per_request():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    before = sample("db_query_duration_seconds_count")
+
+    stats = metrics.RequestStats()
+    token = metrics._request_stats_ctx_var.set(stats)
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+            connection.exec_driver_sql("SELECT 2")
+    finally:
+        metrics._request_stats_ctx_var.reset(token)
+
+    assert stats.queries == 2
+    assert stats.db_time > 0
+    assert sample("db_query_duration_seconds_count") == before + 2
+
+
+@pytest.mark.unit
+def test_timed_counts_errors():
+    histogram = metrics.REDIS_DURATION.labels("test_timed")
+    errors = metrics.REDIS_ERRORS.labels("test_timed")
+
+    @metrics.timed(histogram, errors)
+    def operation(fail: bool):
+        if fail:
+            raise ConnectionError("down")
+        return "ok"
+
+    assert operation(False) == "ok"
+    with pytest.raises(ConnectionError):
+        operation(True)
+
+    assert sample("redis_operation_duration_seconds_count", operation="test_timed") == 2
+    assert sample("redis_operation_errors_total", operation="test_timed") == 1
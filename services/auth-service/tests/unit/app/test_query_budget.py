@@ -0,0 +1,51 @@
+import httpx
+import inject
+import pytest
+from metagrim_common.base import app_context
+from metagrim_common.base import query_budget
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+from sqlalchemy import create_engine
+
+
+@pytest.fixture(scope="function")
+def engine():
+    engine = create_engine("sqlite://")
+    query_budget.watch(engine)
+    yield engine
+    query_budget.unwatch(engine)
+    engine.dispose()
+    # Settings of the other tests are resolved again from the injector
+    app_context.reset()
+
+
+@pytest.mark.unit
+async def test_route_over_budget_fails(engine):
+    settings = inject.instance(CoreSettings).model_copy(update={"query_budget_mode": "raise"})
+    resources = ResourceRegistry()
+    resources.ready = True
+    api = create_app(settings, resources=resources)
+
+    def run(statements: int):
+        with engine.connect() as connection:
+            for index in range(statements):
+                connection.exec_driver_sql(f"SELECT {index}")
+
+    @query_budget.query_budget(2)
+    async def within_budget():
+        run(2)
+        return {}
+
+    @query_budget.query_budget(1)
+    async def over_budget():
+        run(2)
+        return {}
+
+    api.add_api_route("/within-budget", within_budget)
+    api.add_api_route("/over-budget", over_budget)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+        assert (await client.get("/within-budget")).status_code == 200
+        with pytest.raises(query_budget.QueryBudgetExceeded, match="GET /over-budget ran 2 statements"):
+            await client.get("/over-budget")
@@ -0,0 +1,114 @@
+import httpx
+import inject
+import pytest
+from fastapi import Depends
+from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.adapter.redis_backend import GCRA_SCRIPT
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.rate_limit import client_ip
+from metagrim_common.base.rate_limit import login_identity
+from metagrim_common.base.rate_limit import RateLimit
+from metagrim_common.base.rate_limit import TokenBuckets
+from metagrim_common.base.settings import CoreSettings
+
+
+@pytest.fixture(scope="function")
+def backend():
+    backend = inject.instance(BaseBackend)
+    backend.conn.store.clear()
+    return backend
+
+
+def client(*limits: RateLimit, ip: str = "10.0.0.1") -> httpx.AsyncClient:
+    resources = ResourceRegistry()
+    resources.ready = True
+    api = create_app(inject.instance(CoreSettings), resources=resources)
+    verified = api.state.verified = []
+
+    async def login(payload: dict):
+        # Stands for the password verification the limit protects
+        verified.append(payload["email"])
+        return {}
+
+    api.add_api_route("/login", login, methods=["POST"], dependencies=[Depends(limit) for limit in limits])
+    transport = httpx.ASGITransport(app=api, client=(ip, 1234))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.unit
+def test_token_bucket_refills_with_time():
+    buckets = TokenBuckets(capacity=2, rate=0.5)
+    assert buckets.take(["a"], now=0) == 0
+    assert buckets.take(["a"], now=0) == 0
+    assert buckets.take(["a"], now=0) == pytest.approx(2)
+    assert buckets.take(["a", "b"], now=1) == pytest.approx(1)
+    # Nothing taken from the other key of a rejected request
+    assert buckets.take(["b"], now=1) == 0
+    assert buckets.take(["a"], now=2) == 0
+
+
+@pytest.mark.unit
+async def test_attempts_over_limit_are_rejected_before_the_endpoint(backend):
+    async with client(RateLimit("login", limit=2, period=60, keys=(client_ip, login_identity))) as http:
+        for email in ("first@gc.com", "second@gc.com"):
+            assert (await http.post("/login", json={"email": email})).status_code == 200
+        response = await http.post("/login", json={"email": "third@gc.com"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) == 30
+        assert http._transport.app.state.verified == ["first@gc.com", "second@gc.com"]
+
+
+@pytest.mark.unit
+async def test_identity_is_limited_across_clients(backend):
+    limit = RateLimit("login", limit=1, period=60, keys=(client_ip, login_identity))
+    async with client(limit, ip="10.0.0.1") as http:
+        assert (await http.post("/login", json={"email": "User@gc.com"})).status_code == 200
+    async with client(limit, ip="10.0.0.2") as http:
+        assert (await http.post("/login", json={"email": "user@gc.com "})).status_code == 429
+        assert (await http.post("/login", json={"email": "other@gc.com"})).status_code == 200
+
+
+@pytest.mark.unit
+async def test_local_prefilter_saves_backend_calls(backend, monkeypatch):
+    calls = []
+    rate_limit = backend.rate_limit
+    monkeypatch.setattr(backend, "rate_limit", lambda *args: calls.append(args) or rate_limit(*args))
+
+    async with client(RateLimit("login", limit=2, period=60)) as http:
+        statuses = [(await http.post("/login", json={"email": "user@gc.com"})).status_code for _ in range(10)]
+    assert statuses == [200, 200] + [429] * 8
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+async def test_limit_is_shared_by_the_workers(backend):
+    # Each worker has its own local buckets, the backend holds the shared limit
+    async with client(RateLimit("login", limit=2, period=60)) as worker:
+        assert (await worker.post("/login", json={"email": "user@gc.com"})).status_code == 200
+        assert (await worker.post("/login", json={"email": "user@gc.com"})).status_code == 200
+    async with client(RateLimit("login", limit=2, period=60)) as worker:
+        assert (await worker.post("/login", json={"email": "user@gc.com"})).status_code == 429
+
+
+@pytest.mark.unit
+async def test_local_limit_applies_without_backend(backend, monkeypatch):
+    def unavailable(*args):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(backend, "rate_limit", unavailable)
+    async with client(RateLimit("login", limit=1, period=60)) as http:
+        assert (await http.post("/login", json={"email": "user@gc.com"})).status_code == 200
+        assert (await http.post("/login", json={"email": "user@gc.com"})).status_code == 429
+
+
+@pytest.mark.unit
+def test_gcra_script_on_redis():
+    pytest.importorskip("lupa")
+    fakeredis = pytest.importorskip("fakeredis")
+    script = fakeredis.FakeStrictRedis().register_script(GCRA_SCRIPT)
+    keys = ["rate-limit:{login}:client_ip:a", "rate-limit:{login}:login_identity:b"]
+    assert script(keys=keys, args=[30000, 60000]) == 0
+    assert script(keys=keys, args=[30000, 60000]) == 0
+    assert 29000 < script(keys=keys, args=[30000, 60000]) <= 30000
+    assert script(keys=keys[1:], args=[30000, 60000]) > 0
@@ -0,0 +1,169 @@
+import json
+import typing
+import uuid
+
+import httpx
+import inject
+import pytest
+from auth_service.api import deps
+from auth_service.api import login  # noqa: F401 registers the routes
+from auth_service.api import user  # noqa: F401 registers the routes
+from auth_service.service.unit_of_work import UnitOfWork
+from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.base import app_context
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base.utils import get_password_hash
+from metagrim_common.model import UserActionModel
+from metagrim_common.model import UserModel
+from metagrim_common.model.base import Base
+from metagrim_common.repository import UserCacheRedisRepository
+from metagrim_common.service.audit import AuditTrail
+from metagrim_common.service.user_cache import UserReadCache
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+ADMIN_ID = uuid.uuid4()
+ADMIN = {"email": "admin@gc.com", "password": "admin@123"}
+
+
+class Api:
+    """Real routes over SQLite and fakeredis, each request fails if it runs more statements than its budget"""
+
+    def __init__(self, client: httpx.AsyncClient, backend: BaseBackend, settings: CoreSettings, session_factory):
+        self.client = client
+        self.backend = backend
+        self.settings = settings
+        self.session_factory = session_factory
+        self.audit = AuditTrail(config=settings, session_factory=session_factory)
+        self.user_cache = self.new_user_cache()
+        self.headers: typing.Dict[str, str] = {}
+
+    async def unit_of_work(self) -> UnitOfWork:
+        return UnitOfWork(
+            session_factory=self.session_factory,
+            tokens=deps.get_token_repository(),
+            user_cache=self.user_cache,
+            audit=self.audit,
+        )
+
+    def new_user_cache(self) -> UserReadCache:
+        return UserReadCache(config=self.settings, repository=UserCacheRedisRepository(backend=self.backend))
+
+    def cool_down(self) -> None:
+        """Drop the cached users and actions, in Redis and in the process, the tokens are kept"""
+        self.user_cache = self.new_user_cache()
+        for prefix in ("user-cache", "user-actions"):
+            for key in self.backend.conn.scan_iter(f"{prefix}:*"):
+                self.backend.conn.delete(key)
+
+    async def warm_up(self, *user_ids: uuid.UUID) -> None:
+        """Cache the users and their actions, outside of a request so without a budget"""
+        async with await self.unit_of_work() as uow:
+            for user_id in user_ids:
+                await uow.get_user(user_id)
+                await uow.user_actions.get_actions(user_id)
+
+    async def login(self) -> None:
+        response = await self.client.post("/auth", json=ADMIN)
+        assert response.status_code == 200, response.text
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def send(self, method: str, url: str, status: int = 200, **kwargs) -> httpx.Response:
+        response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        assert response.status_code == status, response.text
+        return response
+
+
+@pytest.fixture(scope="function")
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def user_ids(session_factory) -> typing.List[uuid.UUID]:
+    ids = [uuid.uuid4() for _ in range(2)]
+    with session_factory() as session:
+        admin = UserModel(id=ADMIN_ID, email=ADMIN["email"], first_name="Admin", user_type="ADMIN", status="ACTIVE")
+        admin.password_hash = get_password_hash(ADMIN["password"])
+        session.add(admin)
+        for index, id_ in enumerate(ids):
+            session.add(
+                UserModel(id=id_, email=f"user{index}@gc.com", first_name="User", user_type="CASHIER", status="ACTIVE")
+            )
+            session.add_all([UserActionModel(user_id=id_, action=action) for action in ("USER_LIST", "USER_READ")])
+        session.commit()
+    return ids
+
+
+@pytest.fixture(scope="function")
+def backend(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = inject.instance(BaseBackend)
+    monkeypatch.setattr(backend, "conn", fakeredis.FakeStrictRedis())
+    return backend
+
+
+@pytest.fixture(scope="function")
+async def api(session_factory, backend):
+    settings = inject.instance(CoreSettings).model_copy(update={"query_budget_mode": "raise"})
+    resources = ResourceRegistry()
+    resources.ready = True
+    app = create_app(settings, resources=resources)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        api = Api(client, backend, settings, session_factory)
+        app.dependency_overrides[deps.get_unit_of_work] = api.unit_of_work
+        yield api
+    # Settings of the other tests are resolved again from the injector
+    app_context.reset()
+
+
+def requests(user_id: uuid.UUID, index: int) -> typing.List[typing.Tuple[str, str, int, dict]]:
+    """Every route of /auth and /user, those changing the user are sent for the given one"""
+    changes = {"email": f"user{index}@gc.com", "first_name": "Changed", "allowed_actions": ["USER_READ", "USER_EXPORT"]}
+    credentials = {"username": ADMIN["email"], "password": ADMIN["password"]}
+    return [
+        ("GET", "/me", 200, {}),
+        ("GET", "/user", 200, {"params": {"page_size": 2}}),
+        ("GET", "/user/export", 200, {}),
+        ("POST", "/user", 201, {"json": {"email": f"new{index}@gc.com", "first_name": "New", "password": "p"}}),
+        ("GET", f"/user/{user_id}", 200, {}),
+        # Adds and removes an action
+        ("PATCH", f"/user/{user_id}", 200, {"json": changes}),
+        ("PATCH", f"/user/{user_id}/status", 200, {}),
+        ("DELETE", f"/user/{user_id}", 200, {}),
+        ("POST", "/token", 200, {"data": credentials}),
+        ("POST", "/auth", 200, {"json": ADMIN}),
+        ("DELETE", "/auth", 200, {}),
+    ]
+
+
+@pytest.mark.unit
+async def test_routes_within_budget_with_cold_caches(api, user_ids):
+    await api.login()
+    for method, url, status, kwargs in requests(user_ids[0], 0):
+        api.cool_down()
+        await api.send(method, url, status, **kwargs)
+
+
+@pytest.mark.unit
+async def test_routes_within_budget_with_warm_caches(api, user_ids):
+    await api.login()
+    for method, url, status, kwargs in requests(user_ids[1], 1):
+        await api.warm_up(ADMIN_ID, user_ids[1])
+        await api.send(method, url, status, **kwargs)
+
+
+@pytest.mark.unit
+async def test_export_is_sorted_by_exported_columns_only(api, user_ids):
+    await api.login()
+    response = await api.send("GET", "/user/export", params={"order_by": "email", "order": "ASC"})
+    assert [row["email"] for row in map(json.loads, response.text.splitlines())] == ["user0@gc.com", "user1@gc.com"]
+    # Rejected before the response is started
+    await api.send("GET", "/user/export", 422, params={"order_by": "password_hash"})
+    await api.send("GET", "/user/export", 422, params={"order_by": "unknown"})
@@ -0,0 +1,56 @@
+import json
+
+import httpx
+import inject
+import pytest
+from metagrim_common.base.bootstrap import create_app
+from metagrim_common.base.lifespan import ResourceRegistry
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.base.tracing import flush_tracing
+from metagrim_common.base.tracing import outgoing_headers
+from metagrim_common.base.tracing import traced
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class Repository:
+    @traced()
+    async def lookup(self):
+        return outgoing_headers()
+
+
+@pytest.mark.unit
+async def test_trace_is_continued_and_propagated(tmp_path):
+    trace_file = tmp_path / "traces.jsonl"
+    settings = inject.instance(CoreSettings).model_copy(
+        update={"tracing_exporter": "file", "tracing_file": str(trace_file)}
+    )
+    resources = ResourceRegistry()
+    resources.ready = True
+    api = create_app(settings, resources=resources)
+
+    async def call_other_service():
+        return await Repository().lookup()
+
+    api.add_api_route("/trace-test", call_other_service)
+
+    headers = {"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01", "X-Request-ID": "request-1"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+        response = await client.get("/trace-test", headers=headers)
+    flush_tracing()
+
+    # Outgoing request continues the trace from within the repository span
+    sent = response.json()
+    assert sent["traceparent"].startswith(f"00-{TRACE_ID}-")
+    assert sent["X-Request-ID"] == "request-1"
+    assert response.headers["X-Request-ID"] == "request-1"
+
+    spans = {span["name"]: span for span in map(json.loads, trace_file.read_text().splitlines())}
+    server, lookup = spans["GET /trace-test"], spans["Repository.lookup"]
+    assert server["context"]["trace_id"] == f"0x{TRACE_ID}"
+    assert server["parent_id"] == f"0x{PARENT_ID}"
+    assert server["attributes"]["http.status_code"] == 200
+    assert server["attributes"]["http.request_id"] == "request-1"
+    assert lookup["parent_id"] == server["context"]["span_id"]
+    assert sent["traceparent"].split("-")[2] == lookup["context"]["span_id"][2:]
@@ -0,0 +1,38 @@
+"""tests.unit.repository.configtest.
+Will hold only Repository related fixtures
+"""
+import pytest
+from metagrim_common.model.base import Base
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture(scope="function")
+def sqlite_engine():
+    # In memory SQLite database with all the tables created
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def sqlite_session(sqlite_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="function")
+def statements(sqlite_engine):
+    # Collects the SQL statements executed on the engine
+    executed = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", _before_cursor_execute)
+    yield executed
+    event.remove(sqlite_engine, "before_cursor_execute", _before_cursor_execute)
@@ -0,0 +1,15 @@
+import pytest
+from metagrim_common.base.context_vars import current_user
+from metagrim_common.base.context_vars import get_current_user_uuid
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+
+
+@pytest.mark.unit
+async def test_audit_fields_use_current_user(sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    with current_user("b5d1c1f6-1a2b-4c3d-9e8f-001122334455"):
+        record = await repository.add(UserModel(email="audited@gc.com", user_type="ADMIN"))
+    assert str(record.created_by) == "b5d1c1f6-1a2b-4c3d-9e8f-001122334455"
+    assert record.modified_by == record.created_by
+    assert get_current_user_uuid() is None
@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+from metagrim_common.base.context_vars import reset_identity_map
+from metagrim_common.base.context_vars import set_identity_map
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+
+
+@pytest.fixture(scope="function")
+def identity_map():
+    token = set_identity_map()
+    yield
+    reset_identity_map(token)
+
+
+@pytest.fixture(scope="function")
+def user_id(sqlite_session):
+    id_ = uuid.uuid4()
+    sqlite_session.add(UserModel(id=id_, email="first.user@gc.com", user_type="ADMIN", status="ACTIVE"))
+    sqlite_session.commit()
+    return id_
+
+
+@pytest.mark.unit
+async def test_repeated_get_is_served_from_identity_map(identity_map, user_id, sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    first = await repository.get(user_id)
+    executed = len(statements)
+    second = await repository.get(user_id)
+    assert first is second
+    assert len(statements) == executed
+
+
+@pytest.mark.unit
+async def test_write_drops_record_from_identity_map(identity_map, user_id, sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    await repository.get(user_id)
+    await repository.update_by(values={"first_name": "Changed"}, where={"id": user_id})
+    executed = len(statements)
+    record = await repository.get(user_id)
+    assert record.first_name == "Changed"
+    # User and its actions
+    assert len(statements) == executed + 2
+
+
+@pytest.mark.unit
+async def test_get_without_request_scope_always_queries(user_id, sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    await repository.get(user_id)
+    executed = len(statements)
+    await repository.get(user_id)
+    assert len(statements) == executed + 2
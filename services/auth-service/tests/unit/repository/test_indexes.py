@@ -0,0 +1,29 @@
+import logging
+
+import pytest
+from metagrim_common.adapter.base import check_repository_indexes
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+from sqlalchemy import create_engine
+
+
+@pytest.mark.unit
+def test_declared_indexes_exist_in_metadata(sqlite_engine):
+    assert UserSqlAlchemyRepository.missing_indexes(sqlite_engine) == []
+    assert check_repository_indexes(sqlite_engine) == {}
+
+
+@pytest.mark.unit
+def test_missing_indexes_are_reported(caplog):
+    engine = create_engine("sqlite://")
+    # Table created without the indexes, as by the migrations which are not applied yet
+    UserModel.__table__.create(engine, checkfirst=False)
+    with engine.begin() as conn:
+        for index in UserModel.__table__.indexes:
+            if index.name in UserSqlAlchemyRepository.indexes:
+                index.drop(conn)
+
+    with caplog.at_level(logging.WARNING):
+        missing = check_repository_indexes(engine)
+    assert missing["demo_user"] == list(UserSqlAlchemyRepository.indexes)
+    assert "ix_demo_user_active_created_at_id" in caplog.text
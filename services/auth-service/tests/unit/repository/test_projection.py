@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+from metagrim_common.domains import User
+from metagrim_common.model import UserModel
+from metagrim_common.model.base import CoreModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+
+
+@pytest.mark.unit
+def test_columns_are_cached_per_model():
+    columns = UserModel.get_columns()
+    assert columns is UserModel.get_columns()
+    assert "email" in columns and "id" in columns
+    assert "id" not in UserModel.get_column_set(updatable=True)
+    assert CoreModel._columns is None
+
+
+@pytest.mark.unit
+def test_projection_keeps_only_mapped_columns():
+    values = {"email": "projected@gc.com", "unknown": 1, "id": "some-id"}
+    assert UserModel.project(values) == {"email": "projected@gc.com", "id": "some-id"}
+    assert UserModel.project(values, updatable=True) == {"email": "projected@gc.com"}
+
+    user = User(email="projected@gc.com", user_type="ADMIN", first_name="First")
+    dumped = user.model_dump(include=UserModel.get_column_set())
+    assert set(dumped) <= UserModel.get_column_set()
+    assert dumped["first_name"] == "First"
+
+
+@pytest.mark.unit
+async def test_paginated_read_loads_only_projected_columns(sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    for index in range(3):
+        sqlite_session.add(
+            UserModel(id=uuid.uuid4(), email=f"user{index}@gc.com", user_type="ADMIN", password_hash="secret")
+        )
+    sqlite_session.commit()
+    sqlite_session.expunge_all()
+    statements.clear()
+
+    paginated = await repository.get_paginated_result(page_size=2, projection=("id", "email"))
+    assert paginated["total_count"] == 3
+    assert len(paginated["data"]) == 2
+    assert all(set(item) == {"id", "email"} for item in paginated["data"])
+    assert not any("password_hash" in statement for statement in statements)
+    # Rows of a projected query are not tracked by the session
+    assert len(sqlite_session.identity_map) == 0
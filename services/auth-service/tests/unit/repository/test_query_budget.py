@@ -0,0 +1,75 @@
+import uuid
+
+import pytest
+from metagrim_common.base import app_context
+from metagrim_common.base import query_budget
+from metagrim_common.model import UserActionModel
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+from metagrim_common.service.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@pytest.fixture(scope="function")
+def users_with_actions(sqlite_session):
+    for index in range(4):
+        user = UserModel(id=uuid.uuid4(), email=f"user{index}@gc.com", user_type="ADMIN", status="ACTIVE")
+        sqlite_session.add(user)
+        sqlite_session.add(UserActionModel(id=uuid.uuid4(), user_id=user.id, action="USER_READ", is_deleted=False))
+    sqlite_session.commit()
+
+
+@pytest.fixture(scope="function")
+def query_log(sqlite_engine):
+    query_budget.watch(sqlite_engine)
+    token = query_budget.set_query_log()
+    yield query_budget.get_query_log()
+    query_budget.reset_query_log(token)
+
+
+@pytest.mark.unit
+def test_statement_shape_collapses_in_lists():
+    assert query_budget.statement_shape("SELECT id\n  FROM t WHERE id IN (?, ?, ?)") == (
+        "SELECT id FROM t WHERE id IN (?)"
+    )
+    assert query_budget.statement_shape("SELECT id FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == (
+        "SELECT id FROM t WHERE id IN (?)"
+    )
+
+
+@pytest.mark.unit
+async def test_lazy_loads_are_reported_as_n_plus_one(users_with_actions, sqlite_session, query_log):
+    users = UserSqlAlchemyRepository(sqlite_session).filter(eager_load=())
+    assert all(len(user.actions) == 1 for user in users)
+
+    assert query_log.count == 5
+    [(shape, count)] = query_log.repeated(threshold=3)
+    assert count == 4 and "FROM demo_user_action" in shape
+    with pytest.raises(query_budget.QueryBudgetExceeded, match="N\\+1, 4 times"):
+        query_budget.report(query_log, "GET /user", "raise", budget=10)
+
+
+@pytest.mark.unit
+async def test_actions_are_eager_loaded_with_single_statement(users_with_actions, sqlite_session, query_log):
+    users = UserSqlAlchemyRepository(sqlite_session).filter()
+    assert all(len(user.actions) == 1 for user in users)
+
+    assert query_log.count == 2
+    assert query_log.repeated(threshold=2) == []
+    assert query_log.violations(budget=2, threshold=3) == []
+    assert query_log.violations(budget=1, threshold=3) == ["2 statements over the budget of 1"]
+
+
+@pytest.mark.unit
+async def test_unit_of_work_checks_its_statements(users_with_actions, sqlite_session, monkeypatch):
+    monkeypatch.setattr(app_context.current.settings, "query_budget_mode", "raise")
+    uow = SqlAlchemyUnitOfWork(session=sqlite_session)
+
+    async with uow:
+        users = uow.users.filter()
+        assert all(user.actions for user in users)
+
+    with pytest.raises(query_budget.QueryBudgetExceeded, match="SqlAlchemyUnitOfWork ran 5 statements"):
+        async with uow:
+            for user in uow.users.filter(eager_load=()):
+                assert user.actions
+    assert query_budget.get_query_log() is None
@@ -0,0 +1,67 @@
+import uuid
+from unittest import mock
+
+import pytest
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+from sqlalchemy.dialects import postgresql
+
+
+@pytest.fixture(scope="function")
+def user_id(sqlite_session):
+    id_ = uuid.uuid4()
+    sqlite_session.add(UserModel(id=id_, email="first.user@gc.com", user_type="ADMIN", status="ACTIVE"))
+    sqlite_session.commit()
+    return id_
+
+
+@pytest.mark.unit
+async def test_insert_returns_the_generated_values(sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    record = await repository.insert_returning({"email": "new.user@gc.com", "user_type": "ADMIN", "unknown": 1})
+    assert isinstance(record["id"], uuid.UUID)
+    assert record["created_at"] is not None
+    assert (record["email"], record["status"], record["version"]) == ("new.user@gc.com", "INACTIVE", 1)
+    # Inserted with the statement, not at the flush of the session
+    assert statements[-2].startswith("INSERT INTO demo_user")
+
+
+@pytest.mark.unit
+async def test_soft_delete_returns_only_live_records(user_id, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    assert await repository.soft_delete_returning(str(user_id), projection=("id", "version")) == {
+        "id": user_id,
+        "version": 2,
+    }
+    assert await repository.soft_delete_returning(str(user_id)) is None
+    assert await repository.get(user_id) is None
+
+
+@pytest.mark.unit
+async def test_toggle_status_without_reading_the_user(user_id, sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    executed = len(statements)
+    assert (await repository.toggle_status(user_id, projection=("status",))) == {"status": "INACTIVE"}
+    # Switched by the database, the user is not read first
+    assert statements[executed].startswith("UPDATE demo_user")
+    assert "status=CASE" in statements[executed]
+    assert (await repository.toggle_status(user_id))["status"] == "ACTIVE"
+    assert await repository.toggle_status(uuid.uuid4()) is None
+
+
+@pytest.mark.unit
+async def test_returning_is_used_when_supported(user_id, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    executed = []
+    result = mock.Mock(**{"first.return_value": ("INACTIVE", 2)})
+    with mock.patch.object(repository, "_returning_supported", return_value=True), mock.patch.object(
+        sqlite_session, "execute", side_effect=lambda statement: executed.append(statement) or result
+    ):
+        record = await repository.toggle_status(user_id, projection=("status", "version"))
+
+    assert record == {"status": "INACTIVE", "version": 2}
+    # Single statement
+    (statement,) = executed
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE demo_user SET")
+    assert sql.endswith("RETURNING demo_user.status, demo_user.version")
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+import uuid
+
+import pytest
+from metagrim_common.base.export import encode_csv
+from metagrim_common.base.export import encode_ndjson
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+
+PROJECTION = ("id", "email", "status")
+
+
+@pytest.fixture(scope="function")
+def users(sqlite_session):
+    for index in range(5):
+        sqlite_session.add(UserModel(id=uuid.uuid4(), email=f"user{index}@gc.com", user_type="ADMIN", status="ACTIVE"))
+    sqlite_session.add(UserModel(id=uuid.uuid4(), email="deleted@gc.com", user_type="ADMIN", is_deleted=True))
+    sqlite_session.commit()
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+@pytest.mark.unit
+async def test_stream_yields_batches_of_projected_rows(users, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    batches = await collect(repository.stream(PROJECTION, batch_size=2, order_by="email", order="asc"))
+    assert [len(rows) for rows in batches] == [2, 2, 1]
+    assert [row[1] for rows in batches for row in rows] == [f"user{index}@gc.com" for index in range(5)]
+    assert len(sqlite_session.identity_map) == 0
+
+
+@pytest.mark.unit
+async def test_encoders_write_one_chunk_per_batch(users, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    chunks = await collect(encode_ndjson(repository.stream(PROJECTION, batch_size=2), PROJECTION))
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert len(records) == 5
+    assert all(set(record) == set(PROJECTION) for record in records)
+
+    chunks = await collect(encode_csv(repository.stream(PROJECTION, batch_size=2), PROJECTION))
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == list(PROJECTION)
+    assert len(rows) == 6
@@ -0,0 +1,99 @@
+import uuid
+
+import pytest
+from metagrim_common.domains import User
+from metagrim_common.model import UserActionModel
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserActionsRedisRepository
+from metagrim_common.repository import UserActionsSqlAlchemyRepository
+from metagrim_common.repository import UserSqlAlchemyRepository
+from tests.mocked.redis_backend import MockedRedisBackend
+
+
+@pytest.fixture(scope="function")
+def user_ids(sqlite_session):
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    for index, id_ in enumerate(ids):
+        sqlite_session.add(UserModel(id=id_, email=f"user{index}@gc.com", user_type="ADMIN", status="ACTIVE"))
+    sqlite_session.commit()
+    return ids
+
+
+@pytest.mark.unit
+async def test_action_set_is_cached_until_changed(user_ids, sqlite_session, statements):
+    repository = UserActionsSqlAlchemyRepository(sqlite_session)
+    user_id = user_ids[0]
+    await repository.add_user_action(user_id, ["USER_READ", "USER_LIST"])
+    sqlite_session.commit()
+
+    assert await repository.get_actions(user_id) == ["USER_LIST", "USER_READ"]
+    executed = len(statements)
+    assert await repository.get_actions(user_id) == ["USER_LIST", "USER_READ"]
+    assert len(statements) == executed
+
+    await repository.remove_user_action(user_id, ["USER_LIST"])
+    sqlite_session.commit()
+    assert await repository.get_actions(user_id) == ["USER_READ"]
+
+
+@pytest.mark.unit
+async def test_actions_written_by_racing_reader_are_never_served(user_ids, sqlite_session):
+    cache = UserActionsRedisRepository(backend=MockedRedisBackend())
+    repository = UserActionsSqlAlchemyRepository(sqlite_session, cache=cache)
+    user_id = user_ids[0]
+    await repository.add_user_action(user_id, ["USER_READ", "USER_LIST"])
+    sqlite_session.commit()
+
+    set_actions = cache.set_actions
+
+    def racing_set_actions(key, actions, version):
+        # Writer commits and invalidates after the reader loaded the old actions, before it writes them
+        sqlite_session.query(UserActionModel).filter(UserActionModel.action == "USER_LIST").delete()
+        sqlite_session.commit()
+        repository.invalidate(user_id)
+        set_actions(key, actions, version)
+
+    cache.set_actions = racing_set_actions
+    assert await repository.get_actions(user_id) == ["USER_LIST", "USER_READ"]
+    cache.set_actions = set_actions
+    assert await repository.get_actions(user_id) == ["USER_READ"]
+
+
+@pytest.mark.unit
+async def test_actions_are_loaded_from_database_for_changes(user_ids, sqlite_session):
+    cache = UserActionsRedisRepository(backend=MockedRedisBackend())
+    repository = UserActionsSqlAlchemyRepository(sqlite_session, cache=cache)
+    user_id = user_ids[0]
+    await repository.add_user_action(user_id, ["USER_READ"])
+    sqlite_session.commit()
+    _, version = cache.get_actions(str(user_id))
+    cache.set_actions(str(user_id), ["USER_LIST"], version)
+
+    assert await repository.get_actions(user_id) == ["USER_LIST"]
+    assert await repository.load_actions(user_id) == ["USER_READ"]
+
+
+@pytest.mark.unit
+async def test_actions_of_page_are_read_with_single_statement(user_ids, sqlite_session, statements):
+    repository = UserActionsSqlAlchemyRepository(sqlite_session)
+    await repository.add_user_action(user_ids[0], ["USER_READ"])
+    sqlite_session.commit()
+
+    executed = len(statements)
+    actions = await repository.get_actions_by_users(user_ids)
+    assert actions == {str(user_ids[0]): ["USER_READ"], str(user_ids[1]): []}
+    assert len(statements) == executed + 1
+
+
+@pytest.mark.unit
+async def test_user_domain_carries_actions(user_ids, sqlite_session):
+    await UserActionsSqlAlchemyRepository(sqlite_session).add_user_action(user_ids[0], ["USER_READ", "USER_EXPORT"])
+    sqlite_session.commit()
+    sqlite_session.expire_all()
+
+    record = await UserSqlAlchemyRepository(sqlite_session).get(user_ids[0])
+    user = User.model_validate(record)
+    assert user.user_actions == ["USER_EXPORT", "USER_READ"]
+    # Cached domains are restored from their dump
+    assert User.model_validate(user.model_dump(mode="json")).user_actions == user.user_actions
+    assert "user_actions" not in user.model_dump(exclude_related=True)
@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+
+
+@pytest.fixture(scope="function")
+def user_ids(sqlite_session):
+    ids = []
+    for index, status in enumerate(["ACTIVE", "INACTIVE"]):
+        id_ = uuid.uuid4()
+        sqlite_session.add(
+            UserModel(id=id_, email=f"user{index}@gc.com", mobile=f"98000{index}", user_type="ADMIN", status=status)
+        )
+        ids.append(id_)
+    sqlite_session.commit()
+    return ids
+
+
+@pytest.mark.unit
+async def test_hot_lookups(user_ids, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    active_id, inactive_id = user_ids
+
+    assert (await repository.find_by_email("user0@gc.com")).id == active_id
+    assert await repository.find_by_email("missing@gc.com") is None
+
+    assert await repository.check_user_exists(email="user1@gc.com")
+    assert await repository.check_user_exists(mobile="980001")
+    assert await repository.check_user_exists(email="missing@gc.com", mobile="980001")
+    assert not await repository.check_user_exists(email="user1@gc.com", id_=inactive_id)
+
+    assert await repository.is_user_active(active_id)
+    assert not await repository.is_user_active(inactive_id)
+    assert not await repository.is_user_active(uuid.uuid4())
+
+    info = await repository.get_user_info(inactive_id)
+    assert info.first_name is None and info.id == inactive_id
+
+
+@pytest.mark.unit
+async def test_hot_lookups_reuse_compiled_statements(user_ids, sqlite_engine, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    await repository.find_by_email("user0@gc.com")
+    await repository.check_user_exists(email="user0@gc.com")
+    await repository.is_user_active(user_ids[0])
+    compiled = len(sqlite_engine._compiled_cache)
+
+    await repository.find_by_email("user1@gc.com")
+    await repository.check_user_exists(email="user1@gc.com")
+    await repository.is_user_active(user_ids[1])
+    assert len(sqlite_engine._compiled_cache) == compiled
@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+from metagrim_common.model import UserModel
+from metagrim_common.repository import UserSqlAlchemyRepository
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+
+@pytest.fixture(scope="function")
+def user_id(sqlite_session):
+    id_ = uuid.uuid4()
+    sqlite_session.add(UserModel(id=id_, email="first.user@gc.com", user_type="ADMIN", status="ACTIVE"))
+    sqlite_session.commit()
+    return id_
+
+
+@pytest.mark.unit
+async def test_update_returns_the_updated_record(user_id, sqlite_session, statements):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    executed = len(statements)
+    record = await repository.update_version(user_id, {"first_name": "Changed"}, version=1)
+    assert record["first_name"] == "Changed"
+    assert record["email"] == "first.user@gc.com"
+    assert record["version"] == 2
+    # RETURNING is not rendered by the SQLite dialect, the record is selected again
+    assert len(statements) == executed + 2
+    assert "version = ?" in statements[executed]
+
+
+@pytest.mark.unit
+async def test_update_of_changed_record_is_rejected(user_id, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    assert await repository.update_version(user_id, {"first_name": "First"}, version=1)
+    assert await repository.update_version(user_id, {"first_name": "Second"}, version=1) is None
+    sqlite_session.commit()
+
+    record = await repository.get(user_id)
+    assert (record.first_name, record.version) == ("First", 2)
+    # Without version the changes are applied whatever the version
+    assert (await repository.update_version(user_id, {"first_name": "Third"}))["version"] == 3
+
+
+@pytest.mark.unit
+async def test_update_of_deleted_record_is_rejected(user_id, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    await repository.delete(str(user_id))
+    assert await repository.update_version(user_id, {"first_name": "Changed"}) is None
+
+
+@pytest.mark.unit
+async def test_loaded_record_is_refreshed_after_update(user_id, sqlite_session):
+    repository = UserSqlAlchemyRepository(sqlite_session)
+    record = await repository.get(user_id)
+    await repository.update_version(str(user_id), {"first_name": "Changed"}, version=record.version)
+    assert (record.first_name, record.version) == ("Changed", 2)
+    # Flush of the loaded record checks the new version
+    record.last_name = "User"
+    sqlite_session.commit()
+    assert record.version == 3
+
+
+@pytest.mark.unit
+async def test_flush_of_stale_record_fails(user_id, sqlite_engine, sqlite_session):
+    record = await UserSqlAlchemyRepository(sqlite_session).get(user_id)
+    other = sessionmaker(bind=sqlite_engine)()
+    await UserSqlAlchemyRepository(other).update_by(values={"first_name": "Other"}, where={"id": user_id})
+    other.commit()
+    other.close()
+
+    record.first_name = "Changed"
+    with pytest.raises(StaleDataError):
+        sqlite_session.commit()
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import inject
+import pytest
+from metagrim_common.base.context_vars import current_user
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.enums import AuditEventEnum
+from metagrim_common.model import AuditLogModel
+from metagrim_common.model.base import Base
+from metagrim_common.service.audit import AuditTrail
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture(scope="function")
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def inserts(engine):
+    # Rows of each INSERT sent to the database
+    executed = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            executed.append(len(parameters) if executemany else 1)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    return executed
+
+
+def audit_trail(engine, **settings) -> AuditTrail:
+    config = inject.instance(CoreSettings).model_copy(update=settings)
+    return AuditTrail(config=config, session_factory=sessionmaker(bind=engine))
+
+
+def audit_rows(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(AuditLogModel.__table__)).mappings().all()
+
+
+@pytest.mark.unit
+async def test_events_are_written_in_batches(engine, inserts):
+    audit = audit_trail(engine, audit_batch_size=100, audit_flush_interval=5)
+    await audit.start()
+    for index in range(250):
+        await audit.record(AuditEventEnum.login, entity_id=index)
+    await asyncio.sleep(0.05)
+    # Full batches are written without waiting for the flush interval
+    assert inserts == [100, 100]
+
+    await audit.stop()
+    assert inserts == [100, 100, 50]
+    assert len(audit_rows(engine)) == 250
+
+
+@pytest.mark.unit
+async def test_incomplete_batch_is_written_after_flush_interval(engine, inserts):
+    audit = audit_trail(engine, audit_batch_size=100, audit_flush_interval=0.05)
+    await audit.start()
+    await audit.record(AuditEventEnum.logout)
+    await audit.record(AuditEventEnum.login)
+    await asyncio.sleep(0.2)
+    assert inserts == [2]
+    await audit.stop()
+
+
+@pytest.mark.unit
+async def test_event_carries_current_user(engine):
+    audit = audit_trail(engine)
+    await audit.start()
+    with current_user("c2f5a3b4-1111-4c3d-9e8f-001122334455"):
+        await audit.record(AuditEventEnum.user_status_changed, entity_id="user-1", status="INACTIVE")
+    await audit.stop()
+
+    (row,) = audit_rows(engine)
+    assert row["event"] == "USER_STATUS_CHANGED"
+    assert row["entity_id"] == "user-1"
+    assert row["created_by"] == "c2f5a3b4-1111-4c3d-9e8f-001122334455"
+    assert row["data"] == {"status": "INACTIVE"}
+    assert row["created_at"] is not None
+
+
+@pytest.mark.unit
+async def test_recording_waits_when_queue_is_full(engine):
+    audit = audit_trail(engine, audit_batch_size=1, audit_queue_size=1)
+    written = threading.Event()
+    insert = audit._insert
+    audit._insert = lambda rows: written.wait(5) and insert(rows)
+    await audit.start()
+
+    await audit.record(AuditEventEnum.login)  # Being written
+    await asyncio.sleep(0.05)
+    await audit.record(AuditEventEnum.login)  # Queued
+    blocked = asyncio.ensure_future(audit.record(AuditEventEnum.login))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    written.set()
+    await asyncio.wait_for(blocked, 1)
+    await audit.stop()
+    assert len(audit_rows(engine)) == 3
+
+
+@pytest.mark.unit
+async def test_events_without_writer_are_written_by_flush(engine, inserts):
+    audit = audit_trail(engine, audit_batch_size=3)
+    await audit.record(AuditEventEnum.login)
+    await audit.record(AuditEventEnum.login)
+    assert inserts == []
+    await audit.record(AuditEventEnum.login)
+    assert inserts == [3]
+
+    await audit.record(AuditEventEnum.logout)
+    assert await audit.flush() == 1
+    assert len(audit_rows(engine)) == 4
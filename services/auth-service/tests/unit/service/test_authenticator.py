@@ -4,7 +4,11 @@ from typing import Type
 import pytest
 from auth_service.api.schema.login import AuthResponse
 from auth_service.service.authenticator import AuthenticatorService
+from metagrim_common.base import app_context
 from metagrim_common.base.error import ApplicationError
+from metagrim_common.base.utils import decode_token
+from metagrim_common.enums import UserActionEnum
+from metagrim_common.schema import JWTUser
 
 
 @pytest.mark.unit
@@ -26,3 +30,25 @@ async def test_verify_password(email, password, expected_result: Type[Exception]
     else:
         result = await service.verify_password(email, password)
         assert type(result) == expected_class_
+
+
+@pytest.mark.unit
+async def test_token_scopes_carry_user_actions():
+    result = await AuthenticatorService().verify_password("first.user@gc.com", "admin@123")
+    token = JWTUser(**decode_token(result.access_token, app_context.current.settings))
+    # Actions of the enum are packed into a single bitmask scope
+    assert token.scopes == ["mask:3"]
+    assert token.computed_actions == [UserActionEnum.user_list.value, UserActionEnum.user_read.value]
+
+
+@pytest.mark.unit
+async def test_login_attempts_are_audited():
+    service = AuthenticatorService()
+    result = await service.verify_password("first.user@gc.com", "admin@123")
+    with pytest.raises(ApplicationError):
+        await service.verify_password("first.user@gc.com", "wrong_pass")
+
+    # No writer in the tests, the events wait for the flush
+    pending = service.uow.audit._pending[-2:]
+    assert [audit_event.event for audit_event in pending] == ["LOGIN", "LOGIN_FAILED"]
+    assert pending[0].actor_id == pending[0].entity_id == str(result.id)
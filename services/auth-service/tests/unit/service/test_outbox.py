@@ -0,0 +1,131 @@
+import asyncio
+
+import inject
+import pytest
+from metagrim_common.adapter.base import BaseBackend
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.enums import UserEventEnum
+from metagrim_common.model import OutboxEventModel
+from metagrim_common.model.base import Base
+from metagrim_common.service.outbox import EventConsumer
+from metagrim_common.service.outbox import OutboxRelay
+from metagrim_common.service.unit_of_work import SqlAlchemyUnitOfWork
+from sqlalchemy import create_engine
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture(scope="function")
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def backend(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = inject.instance(BaseBackend)
+    monkeypatch.setattr(backend, "conn", fakeredis.FakeStrictRedis())
+    return backend
+
+
+def outbox_relay(session_factory, **settings) -> OutboxRelay:
+    config = inject.instance(CoreSettings).model_copy(update=settings)
+    return OutboxRelay(config=config, session_factory=session_factory)
+
+
+def outbox_size(session_factory) -> int:
+    with session_factory() as session:
+        return session.execute(select(func.count()).select_from(OutboxEventModel)).scalar()
+
+
+async def publish_users(session_factory, *user_ids: str, commit: bool = True) -> None:
+    async with SqlAlchemyUnitOfWork(session_factory=session_factory) as uow:
+        for user_id in user_ids:
+            uow.publish("user", UserEventEnum.created, entity_id=user_id, email=f"{user_id}@gc.com")
+        if commit:
+            uow.commit()
+
+
+@pytest.mark.unit
+async def test_events_are_written_by_the_commit(session_factory):
+    await publish_users(session_factory, "user-1", commit=False)
+    assert outbox_size(session_factory) == 0
+
+    await publish_users(session_factory, "user-1", "user-2")
+    assert outbox_size(session_factory) == 2
+
+
+@pytest.mark.unit
+async def test_relay_publishes_batches_to_the_stream(session_factory, backend):
+    await publish_users(session_factory, *[f"user-{index}" for index in range(5)])
+    consumer = EventConsumer("user", group="event-service", consumer="worker-1")
+    consumer.create_group()
+
+    relay = outbox_relay(session_factory, outbox_batch_size=3)
+    assert await relay.relay() == 3
+    assert await relay.relay() == 2
+    assert await relay.relay() == 0
+    assert outbox_size(session_factory) == 0
+
+    events = consumer.read(count=10)
+    assert [event.entity_id for event in events] == [f"user-{index}" for index in range(5)]
+    assert events[0].event == "USER_CREATED"
+    assert events[0].payload == {"email": "user-0@gc.com"}
+    assert events[0].stream == "events:user"
+
+    assert consumer.ack(*events) == 5
+    assert consumer.read(pending=True) == []
+
+
+@pytest.mark.unit
+async def test_events_stay_in_outbox_until_published(session_factory, backend, monkeypatch):
+    await publish_users(session_factory, "user-1")
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis is down")
+
+    stream_add = backend.stream_add
+    monkeypatch.setattr(backend, "stream_add", unavailable)
+    relay = outbox_relay(session_factory)
+    assert await relay.relay() == 0
+    assert outbox_size(session_factory) == 1
+
+    monkeypatch.setattr(backend, "stream_add", stream_add)
+    assert await relay.relay() == 1
+    assert outbox_size(session_factory) == 0
+
+
+@pytest.mark.unit
+async def test_commit_wakes_the_relay(session_factory, backend):
+    relay = outbox_relay(session_factory, outbox_poll_interval=10)
+    await relay.start()
+    await asyncio.sleep(0.05)
+
+    await publish_users(session_factory, "user-1")
+    await asyncio.sleep(0.1)
+    await relay.stop()
+    assert outbox_size(session_factory) == 0
+    assert backend.conn.xlen("events:user") == 1
+
+
+@pytest.mark.unit
+async def test_unacknowledged_events_are_claimed_by_another_consumer(session_factory, backend):
+    await publish_users(session_factory, "user-1", "user-2")
+    await outbox_relay(session_factory).relay()
+
+    stopped = EventConsumer("user", group="event-service", consumer="worker-1")
+    assert stopped.create_group()
+    assert not stopped.create_group()
+    assert len(stopped.read()) == 2
+
+    other = EventConsumer("user", group="event-service", consumer="worker-2")
+    assert other.read() == []
+    claimed = other.claim(min_idle_ms=0)
+    assert [event.entity_id for event in claimed] == ["user-1", "user-2"]
+    other.ack(*claimed)
+    assert stopped.read(pending=True) == []
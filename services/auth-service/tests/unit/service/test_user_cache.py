@@ -0,0 +1,70 @@
+import uuid
+
+import inject
+import pytest
+from metagrim_common.base.settings import CoreSettings
+from metagrim_common.domains import User
+from metagrim_common.repository import UserCacheRedisRepository
+from metagrim_common.service.user_cache import UserReadCache
+from tests.mocked.redis_backend import MockedRedisBackend
+
+
+@pytest.fixture(scope="function")
+def backend():
+    backend = MockedRedisBackend()
+    backend.conn.store.clear()
+    return backend
+
+
+def get_cache(backend, local_ttl: float = 5.0) -> UserReadCache:
+    config = inject.instance(CoreSettings).model_copy(update={"user_cache_local_ttl": local_ttl})
+    return UserReadCache(config=config, repository=UserCacheRedisRepository(backend=backend))
+
+
+class Loader:
+    def __init__(self, user: User):
+        self.user = user
+        self.calls = 0
+
+    async def __call__(self, user_id):
+        self.calls += 1
+        return self.user
+
+
+@pytest.mark.unit
+async def test_second_read_is_a_local_hit(backend):
+    cache = get_cache(backend)
+    loader = Loader(User(id=uuid.uuid4(), email="first.user@gc.com"))
+    assert await cache.get_or_load(loader.user.id, loader) == loader.user
+    assert await cache.get_or_load(loader.user.id, loader) == loader.user
+    assert loader.calls == 1
+    assert cache.stats()["local_hits"] == 1
+    assert cache.hit_ratio == 0.5
+
+
+@pytest.mark.unit
+async def test_read_is_served_from_redis_when_local_entry_expired(backend):
+    cache = get_cache(backend, local_ttl=0)
+    loader = Loader(User(id=uuid.uuid4(), email="first.user@gc.com"))
+    await cache.get_or_load(loader.user.id, loader)
+    user = await cache.get_or_load(loader.user.id, loader)
+    assert loader.calls == 1
+    assert cache.redis_hits == 1
+    assert user.email == "first.user@gc.com"
+
+
+@pytest.mark.unit
+async def test_entry_written_by_racing_reader_is_never_served(backend):
+    cache = get_cache(backend)
+    user_id = uuid.uuid4()
+
+    async def racing_loader(id_):
+        # Writer commits and invalidates while the reader is still loading the old record
+        cache.invalidate(id_)
+        return User(id=id_, email="old@gc.com")
+
+    await cache.get_or_load(user_id, racing_loader)
+    loader = Loader(User(id=user_id, email="new@gc.com"))
+    user = await cache.get_or_load(user_id, loader)
+    assert loader.calls == 1
+    assert user.email == "new@gc.com"